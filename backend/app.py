@@ -14,8 +14,19 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from dotenv import load_dotenv
 
-from config import SECRET_KEY, MAX_CONTENT_LENGTH, CORS_ALLOWED_ORIGINS
-from services.database import connection_pool
+from config import (
+    SECRET_KEY, MAX_CONTENT_LENGTH, CORS_ALLOWED_ORIGINS, RUN_MIGRATIONS_ON_STARTUP,
+    PURGE_INTERVAL_SECONDS, PROGRESS_WRITE_MODE, ATTEMPT_EVENT_FLUSH_SECONDS, ROLLUP_INTERVAL_SECONDS,
+    LEADERBOARD_INTERVAL_SECONDS,
+)
+from services.attempt_log import flush_attempt_events
+from services.compression import compress_response
+from services.database import cleanup_connection_pool
+from services.json_provider import init_json_provider, msgpack_response
+from services.leaderboard import refresh_leaderboard
+from services.reaper import purge_deleted_sets
+from services.rollup import run_rollup
+from services.scheduler import start_periodic, stop_periodic
 
 # Import route blueprints
 from routes.health import health_bp, is_server_warming_up
@@ -24,6 +35,7 @@ from routes.drive import drive_bp
 from routes.sets import sets_bp
 from routes.questions import questions_bp
 from routes.stats import stats_bp
+from routes.batch import batch_bp
 
 # Configure logging
 logging.basicConfig(
@@ -34,8 +46,14 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Apply pending schema migrations (serialized across workers by an advisory lock)
+if RUN_MIGRATIONS_ON_STARTUP:
+    from migrate import run_migrations
+    run_migrations()
+
 # Create Flask app
 app = Flask(__name__)
+init_json_provider(app)
 app.config['SECRET_KEY'] = SECRET_KEY
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 app.config['MAX_CONTENT_PATH'] = None
@@ -59,6 +77,12 @@ def add_warming_header(response):
     return response
 
 
+# Compress large responses for clients that accept it (gzip, br, zstd)
+app.after_request(compress_response)
+# MessagePack for clients that ask for it; registered last so it runs before compression
+app.after_request(msgpack_response)
+
+
 # Rate limiting configuration
 def get_rate_limit_key():
     """
@@ -99,6 +123,7 @@ app.register_blueprint(drive_bp)
 app.register_blueprint(sets_bp)
 app.register_blueprint(questions_bp)
 app.register_blueprint(stats_bp)
+app.register_blueprint(batch_bp)
 
 # Apply rate limiting to specific routes after registration
 limiter.limit("100 per hour")(app.view_functions['sets.upload_tsv'])
@@ -106,25 +131,28 @@ limiter.limit("100 per hour")(app.view_functions['drive.import_drive_file'])
 
 logger.info("All route blueprints registered successfully")
 
-
-# Cleanup handler
-def cleanup_connection_pool():
-    """Close connection pool on shutdown to prevent connection leaks."""
-    if connection_pool:
-        try:
-            connection_pool.closeall()
-            logger.info("Database connection pool closed successfully")
-        except Exception as e:
-            logger.error(f"Error closing connection pool: {str(e)}")
+# Background jobs
+if PURGE_INTERVAL_SECONDS > 0:
+    start_periodic('set-reaper', PURGE_INTERVAL_SECONDS, purge_deleted_sets)
+if PROGRESS_WRITE_MODE == 'events':
+    start_periodic('attempt-event-flush', ATTEMPT_EVENT_FLUSH_SECONDS, flush_attempt_events)
+if ROLLUP_INTERVAL_SECONDS > 0:
+    start_periodic('attempt-rollup', ROLLUP_INTERVAL_SECONDS, run_rollup)
+if LEADERBOARD_INTERVAL_SECONDS > 0:
+    start_periodic('leaderboard-refresh', LEADERBOARD_INTERVAL_SECONDS, refresh_leaderboard)
 
 
 # Register cleanup handlers
 atexit.register(cleanup_connection_pool)
+atexit.register(flush_attempt_events)
+atexit.register(stop_periodic)
 
 
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully."""
     logger.info(f"Received signal {signum}, shutting down gracefully...")
+    stop_periodic()
+    flush_attempt_events()
     cleanup_connection_pool()
     exit(0)
 
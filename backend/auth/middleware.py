@@ -5,12 +5,11 @@ Handles JWT token verification and user authentication using Supabase.
 """
 import logging
 import jwt
-import psycopg2
 from functools import wraps
-from flask import request, jsonify
+from flask import g, request, jsonify
 
 from config import SUPABASE_JWT_SECRET
-from services.database import get_db, return_db
+from services.database import get_db, return_db, DB_ERRORS
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +55,13 @@ def token_required(f):
     """
     @wraps(f)
     def decorated(*args, **kwargs):
+        # Sub-requests of /api/batch (routes/batch.py) run as the user the
+        # batch request authenticated
+        batch_user = g.get('batch_user')
+        if batch_user is not None:
+            request.current_user = batch_user
+            return f(*args, **kwargs)
+
         token = request.headers.get('Authorization')
         if not token:
             logger.warning("Missing authorization header")
@@ -119,7 +125,7 @@ def token_required(f):
                 'error': 'Invalid token',
                 'message': 'Token verification failed'
             }), 401
-        except psycopg2.Error as e:
+        except DB_ERRORS as e:
             logger.error(f"Database error in auth: {str(e)}")
             if conn:
                 conn.rollback()
@@ -33,6 +33,82 @@ if frontend_url:
 DB_POOL_MIN_CONN = 1
 DB_POOL_MAX_CONN = 10
 
+# Apply pending schema migrations when the app starts (see migrate.py)
+RUN_MIGRATIONS_ON_STARTUP = os.getenv('RUN_MIGRATIONS_ON_STARTUP', 'false').lower() == 'true'
+
+# Read replicas (optional): comma-separated DSNs used by read-only endpoints
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '5'))  # Staler replicas are skipped
+REPLICA_LAG_CHECK_INTERVAL = 5  # Seconds between replication lag probes per replica
+
+# Database driver: 'psycopg2' (default) or 'psycopg3'
+# psycopg3 enables server-side prepared statements and pipeline mode
+DB_BACKEND = os.getenv('DB_BACKEND', 'psycopg2').strip().lower()
+
+# psycopg3 only: prepare a query server-side once it has run this many times on a
+# connection. Set to 'off' when connecting through a transaction-mode pooler
+# (e.g. Supabase pooler on port 6543), which cannot keep prepared statements.
+_prepare_threshold = os.getenv('DB_PREPARE_THRESHOLD', '2').strip().lower()
+DB_PREPARE_THRESHOLD = None if _prepare_threshold in ('off', 'none', '') else int(_prepare_threshold)
+
+# Purging soft-deleted question sets (services/reaper.py)
+PURGE_GRACE_PERIOD_DAYS = float(os.getenv('PURGE_GRACE_PERIOD_DAYS', '7'))  # Keep deleted sets this long
+PURGE_INTERVAL_SECONDS = int(os.getenv('PURGE_INTERVAL_SECONDS', '0'))  # In-process reaper interval; 0 disables
+PURGE_BATCH_SIZE = 500  # Questions deleted per transaction
+PURGE_LOCK_TIMEOUT_MS = 2000  # Give up on a batch rather than queue behind user traffic
+PURGE_BATCH_PAUSE_SECONDS = 0.1  # Pause between batches so purges never hog the database
+
+# Answer recording (services/attempt_log.py, services/rollup.py)
+# 'direct': update user_progress in the request and log the event (default)
+# 'events': only log the event (buffered, batched inserts); the rollup job
+#           applies it to user_progress and daily_activity
+PROGRESS_WRITE_MODE = os.getenv('PROGRESS_WRITE_MODE', 'direct').strip().lower()
+ATTEMPT_EVENT_BATCH_SIZE = 200  # Buffered events written per INSERT
+ATTEMPT_EVENT_FLUSH_SECONDS = 1  # Maximum time an event waits in the buffer
+ATTEMPT_EVENT_BUFFER_LIMIT = 10000  # Events kept in memory while the database is unreachable
+ROLLUP_INTERVAL_SECONDS = int(os.getenv('ROLLUP_INTERVAL_SECONDS', '30'))  # In-process rollup interval; 0 disables
+ROLLUP_BATCH_SIZE = 10000  # Events folded per rollup transaction
+
+# Leaderboard snapshot (services/leaderboard.py)
+LEADERBOARD_INTERVAL_SECONDS = int(os.getenv('LEADERBOARD_INTERVAL_SECONDS', '60'))  # How often to check if a refresh is due; 0 disables
+LEADERBOARD_MAX_AGE_SECONDS = int(os.getenv('LEADERBOARD_MAX_AGE_SECONDS', '900'))  # Refresh at least this often
+LEADERBOARD_REFRESH_EVENTS = int(os.getenv('LEADERBOARD_REFRESH_EVENTS', '1000'))  # ...or after this many answers
+LEADERBOARD_MIN_ATTEMPTED = 20  # Questions attempted before a user is ranked for accuracy
+
+# How /api/question-sets/<id>/questions builds its response
+# 'cache': set content from services/set_content.py plus a per-user overlay query (default)
+# 'sql': one statement renders the whole JSON document in Postgres (no Python-side encoding;
+# MessagePack requests still use 'cache')
+QUESTIONS_RENDER_MODE = os.getenv('QUESTIONS_RENDER_MODE', 'cache').strip().lower()
+
+# Rows fetched from a server-side cursor per chunk of a streamed (NDJSON) response
+STREAM_BATCH_SIZE = 500
+
+# How long a request waits for an identical one's computation (services/single_flight.py)
+# before running its own; bounds the wait when the first request hangs on the database
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv('SINGLE_FLIGHT_WAIT_SECONDS', '10'))
+
+# Sub-requests accepted by one /api/batch request
+BATCH_MAX_REQUESTS = 20
+
+# Encoded question set content kept in memory per process (services/set_content.py); 0 disables
+SET_CONTENT_CACHE_BYTES = int(os.getenv('SET_CONTENT_CACHE_BYTES', str(64 * 1024 * 1024)))
+
+# Set content and public catalog payloads shared by all workers on the host through
+# memory-mapped files (services/shared_store.py); empty disables. Use tmpfs, e.g. /dev/shm/pushups
+SHARED_STORE_DIR = os.getenv('SHARED_STORE_DIR', '').strip()
+SHARED_STORE_MAX_BYTES = int(os.getenv('SHARED_STORE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Response compression (services/compression.py). Levels apply to bodies compressed
+# per request; cacheable bodies are compressed once at the maximum level and kept
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))  # Smaller bodies go out as-is
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))  # 1-9
+COMPRESSION_BROTLI_LEVEL = int(os.getenv('COMPRESSION_BROTLI_LEVEL', '4'))  # 0-11
+COMPRESSION_ZSTD_LEVEL = int(os.getenv('COMPRESSION_ZSTD_LEVEL', '3'))  # 1-22
+COMPRESSION_CACHE_BYTES = int(os.getenv('COMPRESSION_CACHE_BYTES', str(32 * 1024 * 1024)))  # Compressed variants kept per process; 0 disables
+
 # Upload Configuration
 ALLOWED_MIME_TYPES = [
     'text/tab-separated-values',
@@ -67,5 +143,20 @@ def validate_config():
                 f"📄 See .env.example for required variables"
             )
 
+    if DB_BACKEND not in ('psycopg2', 'psycopg3'):
+        raise ValueError(
+            f"❌ DB_BACKEND must be 'psycopg2' or 'psycopg3' (got '{DB_BACKEND}')"
+        )
+
+    if PROGRESS_WRITE_MODE not in ('direct', 'events'):
+        raise ValueError(
+            f"❌ PROGRESS_WRITE_MODE must be 'direct' or 'events' (got '{PROGRESS_WRITE_MODE}')"
+        )
+
+    if QUESTIONS_RENDER_MODE not in ('cache', 'sql'):
+        raise ValueError(
+            f"❌ QUESTIONS_RENDER_MODE must be 'cache' or 'sql' (got '{QUESTIONS_RENDER_MODE}')"
+        )
+
 # Run validation on import
 validate_config()
@@ -0,0 +1,350 @@
+"""
+Schema Migration Runner
+
+Applies the versioned SQL files in migrations/ in order and records each one
+in the schema_migrations table.
+
+Migration files:
+- Named NNNN_description.sql; NNNN is the version and sets the order
+- Run inside a single transaction by default
+- Files starting with the line `-- migrate:no-transaction` run one statement
+  at a time in autocommit mode, which CREATE INDEX CONCURRENTLY requires.
+  Statements in these files must end with `;` at the end of a line and be
+  safe to re-run (IF NOT EXISTS / IF EXISTS), since a failure part-way
+  leaves earlier statements applied.
+
+Optional migrations live in migrations/optional/ and are never applied by
+`up`; an operator enables them by name. Their versions start at 1001 so
+they cannot collide with the main sequence.
+
+A session-level advisory lock makes concurrent runs (e.g. several gunicorn
+workers starting at once) wait for each other instead of racing. Waiters
+poll for it outside any transaction: a waiter blocked in pg_advisory_lock
+would hold a snapshot, which the holder's CREATE INDEX CONCURRENTLY waits
+for, and Postgres would abort one of them as a deadlock.
+
+Usage:
+    python migrate.py                 # apply pending migrations
+    python migrate.py status          # list applied and pending migrations
+    python migrate.py enable <name>   # apply an optional migration
+"""
+import hashlib
+import logging
+import re
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+OPTIONAL_MIGRATIONS_DIR = MIGRATIONS_DIR / 'optional'
+MIGRATION_LOCK_ID = 72_611_001  # Arbitrary key for pg_advisory_lock
+MIGRATION_LOCK_POLL_SECONDS = 0.5  # Pause between attempts to take the lock
+NO_TRANSACTION_DIRECTIVE = '-- migrate:no-transaction'
+
+_FILENAME_PATTERN = re.compile(r'^(\d+)_(\w+)\.sql$')
+_STATEMENT_END = re.compile(r';[ \t]*$', re.MULTILINE)
+_CONCURRENT_INDEX = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)',
+    re.IGNORECASE
+)
+
+
+class Migration:
+    """A migration file on disk."""
+
+    def __init__(self, path):
+        match = _FILENAME_PATTERN.match(path.name)
+        self.path = path
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.sql = path.read_text()
+        self.checksum = hashlib.sha256(self.sql.encode('utf-8')).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(NO_TRANSACTION_DIRECTIVE)
+
+    def statements(self):
+        """Split the file into individual statements (no-transaction files only)."""
+        statements = []
+        for chunk in _STATEMENT_END.split(self.sql):
+            code = '\n'.join(
+                line for line in chunk.splitlines() if not line.strip().startswith('--')
+            ).strip()
+            if code:
+                statements.append(code)
+        return statements
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """
+    Load migration files sorted by version.
+
+    Args:
+        directory (Path): Directory containing NNNN_description.sql files
+
+    Returns:
+        list[Migration]: Migrations in the order they must be applied
+
+    Raises:
+        ValueError: If two files share a version number
+    """
+    migrations = [
+        Migration(path) for path in sorted(directory.iterdir())
+        if _FILENAME_PATTERN.match(path.name)
+    ]
+    migrations.sort(key=lambda m: m.version)
+
+    versions = [m.version for m in migrations]
+    duplicates = sorted({v for v in versions if versions.count(v) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate migration versions: {duplicates}")
+    return migrations
+
+
+def _ensure_migrations_table(conn):
+    cur = conn.cursor()
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMPTZ DEFAULT now()
+        )
+    ''')
+    conn.commit()
+    cur.close()
+
+
+def _applied_migrations(conn):
+    cur = conn.cursor()
+    cur.execute('SELECT version, checksum FROM schema_migrations')
+    applied = dict(cur.fetchall())
+    conn.commit()
+    cur.close()
+    return applied
+
+
+def _prepare_concurrent_index(cur, index_name):
+    """
+    Check on an index before running its CREATE INDEX CONCURRENTLY.
+
+    Drops the index if an interrupted build left it INVALID; otherwise
+    `IF NOT EXISTS` would skip it and the index would never be usable.
+
+    Returns:
+        bool: True if a valid index with this name already exists and the
+            statement can be skipped (Postgres rejects CONCURRENTLY on
+            partitioned tables even when IF NOT EXISTS makes it a no-op)
+    """
+    cur.execute('''
+        SELECT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s
+    ''', (index_name,))
+    row = cur.fetchone()
+    if row is None:
+        return False
+    if row[0]:
+        return True
+    logger.warning(f"Dropping invalid index {index_name} left by an earlier failed build")
+    cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}')
+    return False
+
+
+def _apply(conn, migration):
+    """Apply a single migration and record it."""
+    cur = conn.cursor()
+    if migration.transactional:
+        try:
+            cur.execute(migration.sql)
+            cur.execute(
+                'INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)',
+                (migration.version, migration.name, migration.checksum)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+        return
+
+    conn.autocommit = True
+    try:
+        for statement in migration.statements():
+            index_match = _CONCURRENT_INDEX.search(statement)
+            if index_match and _prepare_concurrent_index(cur, index_match.group(1)):
+                continue
+            cur.execute(statement)
+        cur.execute(
+            'INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)',
+            (migration.version, migration.name, migration.checksum)
+        )
+    finally:
+        conn.autocommit = False
+        cur.close()
+
+
+@contextmanager
+def _migration_lock(conn):
+    """Hold the migration advisory lock (and make sure the table exists)."""
+    cur = conn.cursor()
+    try:
+        # Autocommit: no transaction (or snapshot) is left open between attempts
+        conn.autocommit = True
+        try:
+            cur.execute('SELECT pg_try_advisory_lock(%s)', (MIGRATION_LOCK_ID,))
+            while not cur.fetchone()[0]:
+                time.sleep(MIGRATION_LOCK_POLL_SECONDS)
+                cur.execute('SELECT pg_try_advisory_lock(%s)', (MIGRATION_LOCK_ID,))
+        finally:
+            conn.autocommit = False
+        try:
+            _ensure_migrations_table(conn)
+            yield
+        finally:
+            conn.rollback()
+            cur.execute('SELECT pg_advisory_unlock(%s)', (MIGRATION_LOCK_ID,))
+            conn.commit()
+    finally:
+        cur.close()
+
+
+def run_migrations(conn=None):
+    """
+    Apply all pending migrations under an advisory lock.
+
+    Args:
+        conn: Dedicated (non-pooled) connection to use; one is opened from
+            DATABASE_URL and closed afterwards if not given
+
+    Returns:
+        list[Migration]: Migrations applied by this call
+    """
+    own_connection = conn is None
+    if own_connection:
+        conn = get_db_connection()
+
+    applied_now = []
+    try:
+        with _migration_lock(conn):
+            applied = _applied_migrations(conn)
+
+            for migration in load_migrations():
+                if migration.version in applied:
+                    if applied[migration.version].strip() != migration.checksum:
+                        logger.warning(f"Migration {migration} changed after it was applied")
+                    continue
+
+                logger.info(f"Applying migration {migration}")
+                _apply(conn, migration)
+                applied_now.append(migration)
+
+            if applied_now:
+                logger.info(f"Applied {len(applied_now)} migration(s)")
+            else:
+                logger.info("Database schema is up to date")
+    finally:
+        if own_connection:
+            conn.close()
+
+    return applied_now
+
+
+def enable_optional(name, conn=None):
+    """
+    Apply an optional migration from migrations/optional/.
+
+    Pending regular migrations are applied first, since optional ones are
+    written against the latest schema.
+
+    Args:
+        name (str): Migration name without the version prefix
+            (e.g. 'partition_user_tables')
+        conn: Dedicated (non-pooled) connection, as for run_migrations()
+
+    Returns:
+        bool: True if applied now, False if it was already applied
+
+    Raises:
+        ValueError: If no optional migration has that name
+    """
+    migration = next((m for m in load_migrations(OPTIONAL_MIGRATIONS_DIR) if m.name == name), None)
+    if migration is None:
+        raise ValueError(f"Unknown optional migration: {name}")
+
+    own_connection = conn is None
+    if own_connection:
+        conn = get_db_connection()
+    try:
+        run_migrations(conn)
+        with _migration_lock(conn):
+            if migration.version in _applied_migrations(conn):
+                logger.info(f"Optional migration {migration} is already applied")
+                return False
+            logger.info(f"Applying optional migration {migration}")
+            _apply(conn, migration)
+            return True
+    finally:
+        if own_connection:
+            conn.close()
+
+
+def migration_status(conn=None):
+    """
+    List every migration with the time it was applied.
+
+    Returns:
+        list[tuple]: (migration, applied_at or None) in version order, regular
+            migrations first, then optional ones
+    """
+    own_connection = conn is None
+    if own_connection:
+        conn = get_db_connection()
+    try:
+        _ensure_migrations_table(conn)
+        cur = conn.cursor()
+        cur.execute('SELECT version, applied_at FROM schema_migrations')
+        applied_at = dict(cur.fetchall())
+        cur.close()
+        migrations = load_migrations() + load_migrations(OPTIONAL_MIGRATIONS_DIR)
+        return [(m, applied_at.get(m.version)) for m in migrations]
+    finally:
+        if own_connection:
+            conn.close()
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'up'
+
+    if command == 'up':
+        run_migrations()
+    elif command == 'status':
+        for migration, applied_at in migration_status():
+            if applied_at:
+                state = f"applied {applied_at:%Y-%m-%d %H:%M}"
+            elif migration.path.parent == OPTIONAL_MIGRATIONS_DIR:
+                state = 'optional, not enabled'
+            else:
+                state = 'pending'
+            print(f"{migration}  {state}")
+    elif command == 'enable' and len(sys.argv) == 3:
+        try:
+            enable_optional(sys.argv[2])
+        except ValueError as e:
+            print(str(e))
+            sys.exit(1)
+    else:
+        print(f"Unknown command: {command}\nUsage: python migrate.py [up|status|enable <name>]")
+        sys.exit(1)
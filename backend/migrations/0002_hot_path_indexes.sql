@@ -0,0 +1,24 @@
+-- migrate:no-transaction
+-- Indexes for the hot read paths, built without blocking writes.
+-- Verify with: python plan_check.py
+
+-- Set listings: WHERE is_deleted = false ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_question_sets_active_created
+    ON question_sets (created_at DESC) WHERE is_deleted = false;
+
+-- Duplicate upload check: content_hash + uploaded_by among active sets
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_question_sets_active_hash_owner
+    ON question_sets (content_hash, uploaded_by) WHERE is_deleted = false;
+
+-- Missed questions list: per user, not exported, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_missed_questions_user_pending
+    ON missed_questions (user_id, added_at DESC) WHERE exported_to_anki = false;
+
+-- Questions of a set in id order; also answers counts and id lookups
+-- with index-only scans
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_set_id_id
+    ON questions (set_id, id);
+
+-- Superseded by the indexes above
+DROP INDEX CONCURRENTLY IF EXISTS idx_questions_set_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_question_sets_hash;
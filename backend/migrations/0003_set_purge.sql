@@ -0,0 +1,22 @@
+-- Support for purging soft-deleted question sets (services/reaper.py).
+
+-- When a set was soft-deleted; the grace period before purging counts from here
+ALTER TABLE question_sets ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+
+-- Sets deleted before this column existed start their grace period now
+UPDATE question_sets SET deleted_at = now() WHERE is_deleted = true AND deleted_at IS NULL;
+
+-- Reaper candidates: WHERE is_deleted = true ORDER BY deleted_at
+CREATE INDEX IF NOT EXISTS idx_question_sets_deleted_at
+    ON question_sets (deleted_at) WHERE is_deleted = true;
+
+-- One row per purged set with the number of rows removed from each table
+CREATE TABLE IF NOT EXISTS set_purges (
+    id SERIAL PRIMARY KEY,
+    set_id INTEGER NOT NULL,
+    set_name VARCHAR(255),
+    uploaded_by INTEGER,
+    deleted_at TIMESTAMPTZ,
+    purged_at TIMESTAMPTZ DEFAULT now(),
+    rows_deleted JSONB NOT NULL
+);
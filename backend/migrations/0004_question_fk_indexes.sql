@@ -0,0 +1,10 @@
+-- migrate:no-transaction
+-- Deleting questions (directly or via ON DELETE CASCADE) looks up dependent
+-- rows by question_id; without these indexes every batch the set reaper
+-- deletes scans missed_questions and bookmarks in full.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_missed_questions_question_id
+    ON missed_questions (question_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookmarks_question_id
+    ON bookmarks (question_id);
@@ -0,0 +1,32 @@
+-- Append-only log of every answer, folded into aggregates by services/rollup.py.
+
+CREATE TABLE IF NOT EXISTS attempt_events (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    attempted BOOLEAN NOT NULL DEFAULT TRUE,
+    correct BOOLEAN,
+    -- TRUE if user_progress/daily_activity were already updated when it was recorded
+    applied BOOLEAN NOT NULL DEFAULT FALSE,
+    recorded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Time-range scans for analytics; BRIN stays tiny on an append-only table
+CREATE INDEX IF NOT EXISTS idx_attempt_events_recorded_at
+    ON attempt_events USING brin (recorded_at);
+
+-- How far each rollup has folded the event log
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name VARCHAR(64) PRIMARY KEY,
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+-- Answers per user per day
+CREATE TABLE IF NOT EXISTS user_daily_stats (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    stat_date DATE NOT NULL,
+    attempted INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, stat_date)
+);
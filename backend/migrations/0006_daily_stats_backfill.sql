@@ -0,0 +1,28 @@
+-- Answers recorded before attempt_events existed, for /api/stats/history.
+--
+-- daily_activity counted every answer but not whether it was correct.
+-- The part of each day's count not covered by logged events goes into
+-- legacy_attempted, which has no matching correct count. Events count as
+-- covered once they are in daily_activity: applied in the request, or
+-- folded in by the rollup.
+
+ALTER TABLE user_daily_stats ADD COLUMN IF NOT EXISTS legacy_attempted INTEGER NOT NULL DEFAULT 0;
+
+WITH watermark AS (
+    SELECT COALESCE(MAX(last_event_id), 0) AS last_event_id
+    FROM rollup_state WHERE name = 'attempt_events'
+),
+logged AS (
+    SELECT e.user_id, e.recorded_at::date AS activity_date, COUNT(*) AS events
+    FROM attempt_events e, watermark w
+    WHERE e.applied OR e.id <= w.last_event_id
+    GROUP BY e.user_id, e.recorded_at::date
+)
+INSERT INTO user_daily_stats (user_id, stat_date, legacy_attempted)
+SELECT da.user_id, da.activity_date, da.questions_practiced - COALESCE(l.events, 0)
+FROM daily_activity da
+JOIN users u ON u.id = da.user_id
+LEFT JOIN logged l ON l.user_id = da.user_id AND l.activity_date = da.activity_date
+WHERE da.questions_practiced > COALESCE(l.events, 0)
+ON CONFLICT (user_id, stat_date)
+DO UPDATE SET legacy_attempted = EXCLUDED.legacy_attempted;
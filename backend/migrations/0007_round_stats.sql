@@ -0,0 +1,26 @@
+-- Per user accuracy by question set and round, for /api/stats/breakdown.
+-- Kept current by update_progress and the rollup; rebuild with
+-- python rebuild_round_stats.py.
+
+CREATE TABLE IF NOT EXISTS user_set_round_stats (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    set_id INTEGER NOT NULL REFERENCES question_sets(id) ON DELETE CASCADE,
+    round_no VARCHAR(100) NOT NULL,  -- '' for questions without a round
+    attempted INTEGER NOT NULL DEFAULT 0,  -- Questions attempted
+    correct INTEGER NOT NULL DEFAULT 0,  -- Attempted questions whose latest answer was correct
+    PRIMARY KEY (user_id, set_id, round_no)
+);
+
+-- Set purges delete by set_id
+CREATE INDEX IF NOT EXISTS idx_user_set_round_stats_set_id ON user_set_round_stats (set_id);
+
+-- Initial build from existing progress
+INSERT INTO user_set_round_stats (user_id, set_id, round_no, attempted, correct)
+SELECT up.user_id, q.set_id, COALESCE(q.round_no, ''),
+       COUNT(*) FILTER (WHERE up.attempted),
+       COUNT(*) FILTER (WHERE up.attempted AND up.correct)
+FROM user_progress up
+JOIN questions q ON q.id = up.question_id
+WHERE up.user_id IS NOT NULL
+GROUP BY up.user_id, q.set_id, COALESCE(q.round_no, '')
+ON CONFLICT (user_id, set_id, round_no) DO NOTHING;
@@ -0,0 +1,20 @@
+-- Answers to each question across all users, folded in by the rollup.
+-- difficulty is the share of wrong answers, smoothed towards 0.5 for
+-- questions with few answers: 1 - (correct + 1) / (attempts + 2).
+
+CREATE TABLE IF NOT EXISTS question_stats (
+    question_id INTEGER PRIMARY KEY REFERENCES questions(id) ON DELETE CASCADE,
+    attempts BIGINT NOT NULL DEFAULT 0,
+    correct BIGINT NOT NULL DEFAULT 0,
+    difficulty REAL GENERATED ALWAYS AS (round(1 - (correct + 1)::numeric / (attempts + 2), 4)) STORED
+);
+
+-- Seed from existing progress: each user's latest answer counts once
+INSERT INTO question_stats (question_id, attempts, correct)
+SELECT up.question_id,
+       COUNT(*) FILTER (WHERE up.attempted),
+       COUNT(*) FILTER (WHERE up.attempted AND up.correct)
+FROM user_progress up
+JOIN questions q ON q.id = up.question_id
+GROUP BY up.question_id
+ON CONFLICT (question_id) DO NOTHING;
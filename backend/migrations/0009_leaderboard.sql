@@ -0,0 +1,20 @@
+-- Ranked leaderboard snapshot, one row per user, rebuilt periodically by
+-- services/leaderboard.py. Requests only read it: the top N through the
+-- rank indexes, the caller's own row through the primary key.
+
+CREATE TABLE IF NOT EXISTS leaderboard (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    streak INTEGER NOT NULL DEFAULT 0,  -- Consecutive days practiced, ending today or yesterday
+    practiced_week INTEGER NOT NULL DEFAULT 0,  -- Questions practiced since Monday
+    attempted INTEGER NOT NULL DEFAULT 0,  -- Questions attempted in active sets
+    correct INTEGER NOT NULL DEFAULT 0,
+    accuracy REAL,  -- Percentage correct; NULL without attempts
+    -- Ranks (1 = best, ties share a rank); NULL when not on that board
+    streak_rank INTEGER,
+    week_rank INTEGER,
+    accuracy_rank INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_leaderboard_streak_rank ON leaderboard (streak_rank, user_id);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_week_rank ON leaderboard (week_rank, user_id);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_accuracy_rank ON leaderboard (accuracy_rank, user_id);
@@ -0,0 +1,13 @@
+-- Version counters for ETags (services/etags.py). Responses built from the
+-- data a counter covers can be revalidated without running their queries.
+
+-- Bumped by mark_user_write() with every change to a user's own data
+ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0;
+
+-- Shared data; 'catalog' is bumped when a set is created, renamed, deleted or purged
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_versions (name) VALUES ('catalog') ON CONFLICT (name) DO NOTHING;
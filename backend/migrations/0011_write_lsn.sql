@@ -0,0 +1,8 @@
+-- Read-your-writes routing compares a user's latest write with the WAL a
+-- replica has replayed (services/database.py). The position is recorded by
+-- commit_user_write() after the write commits, as bytes since '0/0'.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS last_write_lsn BIGINT;
+
+-- Superseded by last_write_lsn (a transaction's now() is its start, not its
+-- commit); only databases migrated while 0001 still created it have this column
+ALTER TABLE users DROP COLUMN IF EXISTS last_write_at;
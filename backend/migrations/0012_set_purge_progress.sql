@@ -0,0 +1,35 @@
+-- Purges record their row counts batch by batch (services/reaper.py), so a
+-- purge interrupted and resumed later keeps the counts of every run.
+
+-- The reaper before this migration wrote one row per run, so a set purged in
+-- several runs can have several rows: merge them into the oldest, summing the
+-- counts per table, before the unique index is built
+UPDATE set_purges p
+SET rows_deleted = merged.rows_deleted,
+    purged_at = merged.purged_at
+FROM (
+    SELECT set_id,
+           MIN(id) AS keep_id,
+           MAX(purged_at) AS purged_at,
+           (
+               SELECT jsonb_object_agg(counts.key, counts.total)
+               FROM (
+                   SELECT c.key, SUM(c.value::bigint) AS total
+                   FROM set_purges d, jsonb_each_text(d.rows_deleted) AS c
+                   WHERE d.set_id = s.set_id
+                   GROUP BY c.key
+               ) counts
+           ) AS rows_deleted
+    FROM set_purges s
+    GROUP BY set_id
+    HAVING COUNT(*) > 1
+) merged
+WHERE p.id = merged.keep_id;
+
+DELETE FROM set_purges p
+USING set_purges kept
+WHERE kept.set_id = p.set_id AND kept.id < p.id;
+
+-- One row per set, created by its first batch; purged_at is set when the purge completes
+CREATE UNIQUE INDEX IF NOT EXISTS idx_set_purges_set_id ON set_purges (set_id);
+ALTER TABLE set_purges ALTER COLUMN purged_at DROP DEFAULT;
@@ -0,0 +1,18 @@
+-- question_stats counts every logged answer (attempt_events), the way the
+-- rollup adds them. The seed in 0008 counted each user's latest answer
+-- once instead; rebuild the counters from the events the rollup has
+-- already passed, so every answer is counted once and the same way.
+
+-- Waits for a running rollup and keeps the next one out until commit
+SELECT pg_advisory_xact_lock(72611004);
+
+DELETE FROM question_stats;
+
+INSERT INTO question_stats (question_id, attempts, correct)
+SELECT e.question_id,
+       COUNT(*) FILTER (WHERE e.attempted),
+       COUNT(*) FILTER (WHERE e.attempted AND e.correct)
+FROM attempt_events e
+JOIN questions q ON q.id = e.question_id
+WHERE e.id <= (SELECT COALESCE(MAX(last_event_id), 0) FROM rollup_state WHERE name = 'attempt_events')
+GROUP BY e.question_id;
@@ -0,0 +1,114 @@
+-- Hash-partition the per-user tables on user_id (16 partitions each).
+--
+-- Opt-in: python migrate.py enable partition_user_tables
+--
+-- Rows are copied into new partitioned tables which then replace the
+-- originals, all in one transaction. Writes to these tables wait for the
+-- copy to finish (reads keep working), so run it at a quiet time.
+--
+-- Partitioned tables need the partition key in every unique constraint:
+-- primary keys become (user_id, id), and the UNIQUE (user_id, question_id)
+-- upsert targets are unchanged. Queries filter on user_id so only one
+-- partition is read. Rows without a user_id are unreachable and are dropped.
+
+LOCK TABLE user_progress, missed_questions, bookmarks IN EXCLUSIVE MODE;
+
+-- user_progress
+CREATE TABLE user_progress_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('user_progress_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    question_id INTEGER REFERENCES questions(id) ON DELETE CASCADE,
+    attempted BOOLEAN DEFAULT FALSE,
+    correct BOOLEAN DEFAULT NULL,
+    last_attempted TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    attempt_count INTEGER DEFAULT 0,
+    CONSTRAINT user_progress_partitioned_pkey PRIMARY KEY (user_id, id),
+    CONSTRAINT user_progress_partitioned_user_question_key UNIQUE (user_id, question_id)
+) PARTITION BY HASH (user_id);
+
+-- missed_questions
+CREATE TABLE missed_questions_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('missed_questions_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    question_id INTEGER REFERENCES questions(id) ON DELETE CASCADE,
+    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    exported_to_anki BOOLEAN DEFAULT FALSE,
+    CONSTRAINT missed_questions_partitioned_pkey PRIMARY KEY (user_id, id),
+    CONSTRAINT missed_questions_partitioned_user_question_key UNIQUE (user_id, question_id)
+) PARTITION BY HASH (user_id);
+
+-- bookmarks
+CREATE TABLE bookmarks_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('bookmarks_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    question_id INTEGER REFERENCES questions(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT bookmarks_partitioned_pkey PRIMARY KEY (user_id, id),
+    CONSTRAINT bookmarks_partitioned_user_question_key UNIQUE (user_id, question_id)
+) PARTITION BY HASH (user_id);
+
+DO $$
+DECLARE
+    parent TEXT;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['user_progress', 'missed_questions', 'bookmarks'] LOOP
+        FOR remainder IN 0..15 LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+                parent || '_p' || remainder, parent || '_partitioned', remainder
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- Copy rows
+INSERT INTO user_progress_partitioned
+    (id, user_id, question_id, attempted, correct, last_attempted, attempt_count)
+SELECT id, user_id, question_id, attempted, correct, last_attempted, attempt_count
+FROM user_progress WHERE user_id IS NOT NULL;
+
+INSERT INTO missed_questions_partitioned
+    (id, user_id, question_id, added_at, exported_to_anki)
+SELECT id, user_id, question_id, added_at, exported_to_anki
+FROM missed_questions WHERE user_id IS NOT NULL;
+
+INSERT INTO bookmarks_partitioned (id, user_id, question_id, created_at)
+SELECT id, user_id, question_id, created_at
+FROM bookmarks WHERE user_id IS NOT NULL;
+
+-- Secondary indexes (user_id lookups are served by the unique constraints)
+CREATE INDEX idx_user_progress_partitioned_question_id ON user_progress_partitioned (question_id);
+CREATE INDEX idx_missed_questions_partitioned_question_id ON missed_questions_partitioned (question_id);
+CREATE INDEX idx_missed_questions_partitioned_user_pending
+    ON missed_questions_partitioned (user_id, added_at DESC) WHERE exported_to_anki = false;
+CREATE INDEX idx_bookmarks_partitioned_question_id ON bookmarks_partitioned (question_id);
+
+-- Keep the id sequences when the original tables are dropped
+ALTER SEQUENCE user_progress_id_seq OWNED BY user_progress_partitioned.id;
+ALTER SEQUENCE missed_questions_id_seq OWNED BY missed_questions_partitioned.id;
+ALTER SEQUENCE bookmarks_id_seq OWNED BY bookmarks_partitioned.id;
+
+-- Swap the partitioned tables in under the original names
+DROP TABLE user_progress;
+DROP TABLE missed_questions;
+DROP TABLE bookmarks;
+
+ALTER TABLE user_progress_partitioned RENAME TO user_progress;
+ALTER TABLE user_progress RENAME CONSTRAINT user_progress_partitioned_pkey TO user_progress_pkey;
+ALTER TABLE user_progress RENAME CONSTRAINT user_progress_partitioned_user_question_key TO user_progress_user_id_question_id_key;
+ALTER INDEX idx_user_progress_partitioned_question_id RENAME TO idx_user_progress_question_id;
+
+ALTER TABLE missed_questions_partitioned RENAME TO missed_questions;
+ALTER TABLE missed_questions RENAME CONSTRAINT missed_questions_partitioned_pkey TO missed_questions_pkey;
+ALTER TABLE missed_questions RENAME CONSTRAINT missed_questions_partitioned_user_question_key TO missed_questions_user_id_question_id_key;
+ALTER INDEX idx_missed_questions_partitioned_question_id RENAME TO idx_missed_questions_question_id;
+ALTER INDEX idx_missed_questions_partitioned_user_pending RENAME TO idx_missed_questions_user_pending;
+
+ALTER TABLE bookmarks_partitioned RENAME TO bookmarks;
+ALTER TABLE bookmarks RENAME CONSTRAINT bookmarks_partitioned_pkey TO bookmarks_pkey;
+ALTER TABLE bookmarks RENAME CONSTRAINT bookmarks_partitioned_user_question_key TO bookmarks_user_id_question_id_key;
+ALTER INDEX idx_bookmarks_partitioned_question_id RENAME TO idx_bookmarks_question_id;
+
+ANALYZE user_progress;
+ANALYZE missed_questions;
+ANALYZE bookmarks;
@@ -0,0 +1,196 @@
+"""
+Query Plan Check
+
+Runs EXPLAIN on the SQL behind the hot routes and fails if any of them
+reads question_sets, questions or missed_questions with a sequential scan,
+i.e. if the supporting index is missing or unusable.
+
+Plans depend on table statistics, so run this against a database with a
+realistic amount of data. --seed fills an EMPTY database with synthetic
+users, sets, questions and progress first.
+
+Usage:
+    python plan_check.py           # check plans against DATABASE_URL
+    python plan_check.py --seed    # seed an empty database, then check
+
+Exit status is 1 if any check fails.
+"""
+import json
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import get_db_connection  # noqa: E402
+from routes.public import PUBLIC_QUESTION_SETS_QUERY, PUBLIC_QUESTION_OVERLAY_QUERY  # noqa: E402
+from routes.questions import (  # noqa: E402
+    PROGRESS_OVERLAY_QUERY, QUESTION_OVERLAY_QUERY, QUESTION_ROWS_COLUMNS, QUESTION_ROWS_QUERY,
+    QUESTIONS_DOCUMENT_QUERY,
+)
+from routes.sets import QUESTION_SETS_COLUMNS, QUESTION_SETS_QUERY  # noqa: E402
+from routes.stats import MISSED_QUESTIONS_QUERY  # noqa: E402
+from services.set_content import SET_QUESTIONS_QUERY, INSTRUCTIONS_QUERY  # noqa: E402
+from services.tsv_parser import DUPLICATE_SET_QUERY  # noqa: E402
+
+# Tables that must never be read with a sequential scan on these paths
+WATCHED_TABLES = {'question_sets', 'questions', 'missed_questions'}
+
+# Page size used for the paginated list queries
+PAGE_SIZE = 20
+
+SEED_SQL = '''
+    INSERT INTO users (supabase_user_id, email, username)
+    SELECT gen_random_uuid(), 'seed' || n || '@example.com', 'seed' || n
+    FROM generate_series(1, 200) n;
+
+    INSERT INTO question_sets (name, uploaded_by, created_at, total_questions, is_deleted, content_hash)
+    SELECT 'Seed set ' || n,
+           (SELECT min(id) FROM users) + (n % 200),
+           now() - n * interval '1 hour',
+           50,
+           n % 10 = 0,
+           md5(n::text) || md5((n * 7)::text)
+    FROM generate_series(1, 5000) n;
+
+    INSERT INTO questions (set_id, round_no, question_no, question_text, answer_text)
+    SELECT qs.id, 'Round ' || (n % 5), 'Q' || n, 'Question ' || n, 'Answer ' || n
+    FROM question_sets qs, generate_series(1, 50) n;
+
+    INSERT INTO set_instructions (set_id, instruction_text, display_order)
+    SELECT id, 'Seed instructions', 0 FROM question_sets;
+
+    INSERT INTO user_progress (user_id, question_id, attempted, correct, attempt_count)
+    SELECT DISTINCT ON (u.id, q.id) u.id, q.id, true, random() < 0.7, 1
+    FROM users u
+    JOIN questions q ON q.id % 250 = u.id % 250
+    WHERE random() < 0.5;
+
+    INSERT INTO missed_questions (user_id, question_id, exported_to_anki)
+    SELECT user_id, question_id, random() < 0.3
+    FROM user_progress WHERE NOT correct;
+
+    INSERT INTO bookmarks (user_id, question_id)
+    SELECT user_id, question_id FROM user_progress WHERE random() < 0.05;
+
+    INSERT INTO set_opens (user_id, set_id)
+    SELECT DISTINCT u.id, qs.id
+    FROM users u JOIN question_sets qs ON qs.id % 100 = u.id % 100;
+'''
+
+
+def seed(conn):
+    """Fill an empty database with synthetic data and refresh statistics."""
+    cur = conn.cursor()
+    cur.execute('SELECT COUNT(*) FROM question_sets')
+    if cur.fetchone()[0] > 0:
+        raise SystemExit("Refusing to seed: question_sets is not empty. Use a scratch database.")
+
+    print("Seeding synthetic data...")
+    cur.execute(SEED_SQL)
+    conn.commit()
+
+    conn.autocommit = True
+    cur.execute('ANALYZE')
+    conn.autocommit = False
+    cur.close()
+
+
+def _sample_params(cur):
+    """Pick representative ids from the data for the query parameters."""
+    cur.execute('''
+        SELECT user_id FROM missed_questions
+        WHERE exported_to_anki = false
+        GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1
+    ''')
+    row = cur.fetchone()
+    user_id = row[0] if row else 0
+
+    cur.execute('''
+        SELECT id, content_hash, uploaded_by FROM question_sets
+        WHERE is_deleted = false ORDER BY total_questions DESC LIMIT 1
+    ''')
+    row = cur.fetchone() or (0, '', 0)
+    set_id, content_hash, owner_id = row
+    return user_id, set_id, content_hash, owner_id
+
+
+def build_checks(cur):
+    """
+    Build the (name, sql, params) list to EXPLAIN.
+
+    List queries are checked in their paginated form; an unpaginated list of
+    every active set is legitimately a full scan.
+    """
+    user_id, set_id, content_hash, owner_id = _sample_params(cur)
+    page = ' LIMIT %s OFFSET %s'
+    return [
+        ('get_question_sets', QUESTION_SETS_QUERY.format(columns=QUESTION_SETS_COLUMNS) + page,
+         (user_id, user_id, PAGE_SIZE, 0)),
+        ('get_public_question_sets', PUBLIC_QUESTION_SETS_QUERY + page, (PAGE_SIZE, 0)),
+        ('parse_and_save_set duplicate check', DUPLICATE_SET_QUERY, (content_hash, owner_id)),
+        ('set content questions', SET_QUESTIONS_QUERY, (set_id,)),
+        ('set content instructions', INSTRUCTIONS_QUERY, (set_id,)),
+        ('get_questions overlay', QUESTION_OVERLAY_QUERY.format(order_by='q.id'), (user_id, user_id, user_id, set_id)),
+        ('get_questions rows', QUESTION_ROWS_QUERY.format(columns=QUESTION_ROWS_COLUMNS, order_by='q.id'),
+         (user_id, user_id, user_id, set_id)),
+        ('get_questions document (QUESTIONS_RENDER_MODE=sql)', QUESTIONS_DOCUMENT_QUERY.format(order_by='q.id'),
+         (set_id, user_id, user_id, user_id, set_id)),
+        ('get_progress_overlay', PROGRESS_OVERLAY_QUERY, (user_id, user_id, user_id, set_id)),
+        ('get_public_questions overlay', PUBLIC_QUESTION_OVERLAY_QUERY.format(order_by='q.id'), (set_id,)),
+        ('get_missed_questions', MISSED_QUESTIONS_QUERY, (user_id,)),
+    ]
+
+
+def find_seq_scans(plan, tables=WATCHED_TABLES):
+    """
+    Walk an EXPLAIN (FORMAT JSON) plan tree for sequential scans.
+
+    Args:
+        plan (dict): Plan node
+        tables (set): Relation names to report
+
+    Returns:
+        list[str]: Names of watched tables read with a Seq Scan
+    """
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in tables:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found.extend(find_seq_scans(child, tables))
+    return found
+
+
+def run_checks(conn):
+    """
+    EXPLAIN every check and report sequential scans on watched tables.
+
+    Returns:
+        bool: True if every plan passed
+    """
+    cur = conn.cursor()
+    all_passed = True
+    for name, sql, params in build_checks(cur):
+        cur.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        result = cur.fetchone()[0]
+        plan = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+        seq_scans = find_seq_scans(plan)
+        if seq_scans:
+            all_passed = False
+            print(f"FAIL  {name}: sequential scan on {', '.join(sorted(set(seq_scans)))}")
+        else:
+            print(f"OK    {name} (cost {plan['Total Cost']:.0f})")
+    conn.rollback()
+    cur.close()
+    return all_passed
+
+
+if __name__ == '__main__':
+    conn = get_db_connection()
+    try:
+        if '--seed' in sys.argv[1:]:
+            seed(conn)
+        passed = run_checks(conn)
+    finally:
+        conn.close()
+    sys.exit(0 if passed else 1)
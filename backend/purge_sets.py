@@ -0,0 +1,43 @@
+"""
+Purge Soft-Deleted Question Sets
+
+Permanently deletes sets that were deleted more than PURGE_GRACE_PERIOD_DAYS
+ago, with their questions, progress, missed questions, bookmarks,
+instructions and opens. See services/reaper.py.
+
+Usage:
+    python purge_sets.py                  # purge sets past the grace period
+    python purge_sets.py --dry-run        # list the sets that would be purged
+    python purge_sets.py --grace-days 30  # override the grace period
+    python purge_sets.py --max-sets 10    # purge at most 10 sets
+"""
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import PURGE_GRACE_PERIOD_DAYS  # noqa: E402
+from services.database import get_db, return_db  # noqa: E402
+from services.reaper import find_purgeable_sets, purge_deleted_sets  # noqa: E402
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Purge soft-deleted question sets')
+    parser.add_argument('--dry-run', action='store_true', help='list sets without deleting')
+    parser.add_argument('--grace-days', type=float, default=PURGE_GRACE_PERIOD_DAYS)
+    parser.add_argument('--max-sets', type=int, default=100)
+    args = parser.parse_args()
+
+    if args.dry_run:
+        conn = get_db()
+        try:
+            for question_set in find_purgeable_sets(conn.cursor(), args.grace_days, args.max_sets):
+                print(f"{question_set['id']}  {question_set['name']}  deleted {question_set['deleted_at']:%Y-%m-%d %H:%M}")
+        finally:
+            return_db(conn)
+    else:
+        purged = purge_deleted_sets(args.grace_days, args.max_sets)
+        print(f"Purged {len(purged)} set(s)")
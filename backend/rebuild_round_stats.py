@@ -0,0 +1,25 @@
+"""
+Rebuild Round Stats
+
+Recomputes user_set_round_stats (accuracy per set and round) from
+user_progress, one transaction per user. Only needed after changing
+progress data by hand. See services/round_stats.py.
+
+Usage:
+    python rebuild_round_stats.py             # every user
+    python rebuild_round_stats.py 12 34       # only these user IDs
+"""
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.round_stats import rebuild_round_stats  # noqa: E402
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    user_ids = [int(arg) for arg in sys.argv[1:]] or None
+    print(f"Wrote {rebuild_round_stats(user_ids)} row(s)")
@@ -0,0 +1,27 @@
+"""
+Refresh Leaderboard
+
+Rebuilds the ranked leaderboard snapshot (streaks, questions practiced
+this week, accuracy). See services/leaderboard.py.
+
+Usage:
+    python refresh_leaderboard.py           # rebuild now
+    python refresh_leaderboard.py --if-due  # only if the snapshot is stale
+"""
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.leaderboard import refresh_leaderboard  # noqa: E402
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    ranked = refresh_leaderboard(force='--if-due' not in sys.argv[1:])
+    if ranked is None:
+        print("Leaderboard not refreshed (still fresh, or another process is refreshing it)")
+    else:
+        print(f"Ranked {ranked} user(s)")
@@ -0,0 +1,22 @@
+"""
+Roll Up Attempt Events
+
+Folds attempt_events recorded since the last run into user_daily_stats
+(and, for PROGRESS_WRITE_MODE=events, into user_progress and
+daily_activity). See services/rollup.py.
+
+Usage:
+    python rollup_events.py
+"""
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.rollup import run_rollup  # noqa: E402
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    print(f"Rolled up {run_rollup()} event(s)")
@@ -0,0 +1,195 @@
+"""
+Batch Route
+
+Runs several GET requests to the API in one HTTP request, e.g. the home
+screen's set list, stats and missed questions: one round trip, one
+authentication and one database connection instead of one each.
+
+Only the cheap reads of the user's own data in BATCH_ENDPOINTS can be
+batched. Question lists are too large to hold a shared connection for,
+Google Drive calls leave the database altogether, and public routes fill
+single-flight results and shared caches that must not come from a batch's
+connection or snapshot.
+"""
+import logging
+
+from flask import Blueprint, current_app, g, request, jsonify
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RoutingException
+from werkzeug.test import EnvironBuilder
+
+from auth import token_required
+from config import BATCH_MAX_REQUESTS
+from services.database import shared_connection
+from services.json_provider import MSGPACK_MIMETYPE, response_mimetype, msgpack_map_header, msgpack_array_header
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch', __name__, url_prefix='/api')
+
+BATCH_PATH = '/api/batch'
+
+# Endpoints a sub-request may be routed to
+BATCH_ENDPOINTS = frozenset({
+    'sets.get_question_sets',
+    'questions.get_progress_overlay',
+    'stats.get_stats',
+    'stats.get_stats_history',
+    'stats.get_stats_breakdown',
+    'stats.get_leaderboard',
+    'stats.get_missed_questions',
+})
+
+
+def _batch_endpoint(path):
+    """Endpoint a sub-request path routes to for GET, or None."""
+    adapter = current_app.url_map.bind('localhost')
+    try:
+        endpoint, _ = adapter.match(path.split('?', 1)[0], method='GET')
+    except (HTTPException, RoutingException):
+        return None
+    return endpoint
+
+
+def _parse_batch(payload):
+    """
+    Validate a batch request body.
+
+    Args:
+        payload: Decoded JSON body
+
+    Returns:
+        tuple: ([{'path': str, 'etag': str or None}, ...], snapshot)
+
+    Raises:
+        ValueError: If the body is not a valid batch, or a path does not
+            route to one of BATCH_ENDPOINTS
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get('requests'), list):
+        raise ValueError("Body must be an object with a 'requests' list")
+    items = payload['requests']
+    if not 1 <= len(items) <= BATCH_MAX_REQUESTS:
+        raise ValueError(f'requests must list between 1 and {BATCH_MAX_REQUESTS} sub-requests')
+
+    sub_requests = []
+    for item in items:
+        if isinstance(item, str):
+            item = {'path': item}
+        path = item.get('path') if isinstance(item, dict) else None
+        etag = item.get('etag') if isinstance(item, dict) else None
+        if not isinstance(path, str) or not path.startswith('/api/'):
+            raise ValueError("Each sub-request needs a 'path' starting with /api/")
+        if path.split('?', 1)[0].rstrip('/') == BATCH_PATH:
+            raise ValueError('Batches cannot be nested')
+        if _batch_endpoint(path) not in BATCH_ENDPOINTS:
+            raise ValueError(f"'{path}' cannot be batched")
+        if etag is not None and not isinstance(etag, str):
+            raise ValueError("'etag' must be a string")
+        sub_requests.append({'path': path, 'etag': etag})
+    return sub_requests, bool(payload.get('snapshot', False))
+
+
+def _dispatch(path, etag, mimetype):
+    """
+    Run one GET sub-request through its route.
+
+    Args:
+        path (str): Path and query string of the sub-request
+        etag (str): ETag the client holds for it, sent as If-None-Match
+        mimetype (str): Format the batch is answered in, sent as Accept
+
+    Returns:
+        flask.Response: The route's response (not compressed or transcoded);
+        status 500 with {"error": ...} if the route raised
+    """
+    headers = {'Accept': mimetype}
+    if etag:
+        headers['If-None-Match'] = etag
+    environ = EnvironBuilder(path=path, method='GET', headers=headers,
+                             environ_base={'REMOTE_ADDR': request.remote_addr}).get_environ()
+    with current_app.request_context(environ):
+        try:
+            # before_request hooks, so the route's rate limits count each sub-request
+            response = current_app.preprocess_request()
+            if response is None:
+                response = current_app.dispatch_request()
+            response = current_app.make_response(response)
+        except HTTPException as e:
+            response = current_app.make_response((jsonify({'error': e.description}), e.code))
+        except Exception as e:
+            # One failing sub-request does not cost the others their results
+            logger.error(f"Batch sub-request error ({path}): {str(e)}")
+            response = current_app.make_response((jsonify({'error': str(e)}), 500))
+        response.close()
+        return response
+
+
+def _render_result(path, response, mimetype):
+    """Encode one sub-response as an object of the batch's format, splicing its body in as-is."""
+    if mimetype == MSGPACK_MIMETYPE:
+        dumps = current_app.json.dumps_msgpack
+        null = dumps(None)
+    else:
+        dumps = current_app.json.dumps_bytes
+        null = b'null'
+    if response.status_code != 304 and response.mimetype == mimetype:
+        body = response.get_data()
+    else:
+        body = null
+    values = (('body', body), ('etag', dumps(response.headers.get('ETag'))),
+              ('path', dumps(path)), ('status', dumps(response.status_code)))
+    if mimetype == MSGPACK_MIMETYPE:
+        return b''.join([msgpack_map_header(len(values))] + [dumps(key) + value for key, value in values])
+    return b''.join((b'{', b','.join([dumps(key) + b':' + value for key, value in values]), b'}'))
+
+
+@batch_bp.route('/batch', methods=['POST'])
+@token_required
+def batch():
+    """
+    Run several GET requests to the API in one request.
+
+    Sub-requests run in order as the authenticated user, on one database
+    connection, and are answered as if requested on their own (with
+    ETags, 304s and rate limits), without compression. A sub-request that
+    fails gets its own error status; the others still run.
+
+    Request Body:
+        requests (list): Sub-requests: a path routed to one of
+            BATCH_ENDPOINTS, such as "/api/stats" or
+            "/api/question-sets?fields=name", or an object
+            {"path": ..., "etag": ...} where etag is the ETag the client
+            holds (a match is answered with status 304 and a null body)
+        snapshot (bool, optional): Read every sub-request from one database
+            snapshot (REPEATABLE READ), so they are consistent with each other
+
+    Returns:
+        JSON (or MessagePack) response {"responses": [{"path", "status", "etag", "body"}, ...]},
+        in request order; 400 if a path cannot be batched
+    """
+    try:
+        sub_requests, snapshot = _parse_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # Authenticated once, here; token_required lets sub-requests through as this user
+        g.batch_user = request.current_user
+        # Sub-requests answer in the batch's format, so their bodies are spliced in unchanged
+        mimetype = response_mimetype()
+        results = []
+        with shared_connection(request.current_user, snapshot=snapshot):
+            for sub_request in sub_requests:
+                response = _dispatch(sub_request['path'], sub_request['etag'], mimetype)
+                results.append(_render_result(sub_request['path'], response, mimetype))
+        if mimetype == MSGPACK_MIMETYPE:
+            dumps = current_app.json.dumps_msgpack
+            body = b''.join((msgpack_map_header(1), dumps('responses'), msgpack_array_header(len(results)), *results))
+        else:
+            body = b''.join((b'{"responses":[', b','.join(results), b']}'))
+        return current_app.response_class(body, mimetype=mimetype)
+    except Exception as e:
+        logger.error(f"Batch request error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        g.pop('batch_user', None)
@@ -6,6 +6,8 @@ Simple health check endpoint to verify the service is running.
 from datetime import datetime
 from flask import Blueprint, jsonify
 
+from services.single_flight import single_flight_stats
+
 health_bp = Blueprint('health', __name__)
 
 # Track when the server started (set once per process lifetime)
@@ -30,12 +32,14 @@ def health_check():
     Health check endpoint.
 
     Returns:
-        JSON response with status and timestamp
+        JSON response with status, timestamp and this worker's request
+        coalescing metrics (services/single_flight.py)
     """
     response = jsonify({
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
-        'warming_up': is_server_warming_up()
+        'warming_up': is_server_warming_up(),
+        'single_flight': single_flight_stats(),
     })
 
     # Add custom header if server is warming up
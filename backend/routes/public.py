@@ -5,14 +5,52 @@ Unauthenticated endpoints that allow guest users to browse and practice question
 without creating an account. No user-specific progress tracking.
 """
 import logging
-from flask import Blueprint, request, jsonify
+from functools import partial
 
-from services.database import get_db, return_db
+from flask import Blueprint, current_app, request, jsonify
+
+from services.compression import compress_cached
+from services.database import get_primary_db, get_read_db, return_db, tuple_cursor, server_cursor, fetch_rows
+from services.etags import PUBLIC_CACHE_CONTROL, get_data_versions, make_etag, not_modified, with_etag
+from services.json_provider import JSON_FORMAT_VERSION, response_mimetype
+from services.layout import ROWS_LAYOUT, COLUMNS_LAYOUT, parse_layout, question_columns
+from services.question_stats import DIFFICULTY_COLUMNS, DIFFICULTY_JOIN, difficulty_order_by
+from services.set_content import find_set_key, load_set_content, render_questions, render_set_content
+from services.shared_store import shared_store_enabled, current_generation, get_payload, put_payload
+from services.single_flight import single_flight
+from services.streaming import wants_ndjson, stream_rows
 
 logger = logging.getLogger(__name__)
 
 public_bp = Blueprint('public', __name__, url_prefix='/api/public')
 
+# Active sets, newest first, without user-specific joins
+PUBLIC_QUESTION_SETS_QUERY = '''
+    SELECT qs.id, qs.name, qs.description, qs.tags, qs.created_at, qs.content_hash,
+           u.username as uploaded_by_username,
+           (SELECT COUNT(*) FROM questions q WHERE q.set_id = qs.id) as total_questions
+    FROM question_sets qs
+    LEFT JOIN users u ON qs.uploaded_by = u.id
+    WHERE qs.is_deleted = false
+    ORDER BY qs.created_at DESC
+'''
+
+# Global difficulty of one set's questions, in response order; the question
+# content comes from services/set_content.py.
+# Format with order_by (see difficulty_order_by; default 'q.id'). Params: set_id
+PUBLIC_QUESTION_OVERLAY_QUERY = f'''
+    SELECT q.id,
+           {DIFFICULTY_COLUMNS}
+    FROM questions q
+    {DIFFICULTY_JOIN}
+    WHERE q.set_id = %s
+    ORDER BY {{order_by}}
+'''
+
+# Cache-Control for set content: requested by content_hash it never changes
+VERSIONED_CONTENT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+UNVERSIONED_CONTENT_CACHE_CONTROL = 'public, max-age=300'
+
 
 @public_bp.route('/question-sets', methods=['GET'])
 def get_public_question_sets():
@@ -32,21 +70,50 @@ def get_public_question_sets():
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', default=0, type=int)
 
-        conn = get_db()
+        conn = get_read_db()
         cur = conn.cursor()
+        catalog = get_data_versions(cur)['catalog']
+        etag = make_etag('public-question-sets', catalog)
+        unchanged = not_modified(etag, PUBLIC_CACHE_CONTROL)
+        if unchanged:
+            cur.close()
+            return unchanged
+
+        # Shared across workers until a set is created, renamed or deleted;
+        # the catalog version also covers changes made through other hosts
+        generation = current_generation()
+        catalog_key = f'public-question-sets:{JSON_FORMAT_VERSION}:{generation}:{catalog}:{limit}:{offset}'
+        cached = get_payload(catalog_key)
+        cur.close()
+        if cached is not None:
+            body = bytes(cached)
+        else:
+            # Concurrent misses wait for one query instead of holding a connection each
+            return_db(conn)
+            conn = None
+            body = single_flight('public-question-sets', catalog_key,
+                                 partial(_load_public_question_sets, catalog_key, generation, limit, offset))
+
+        response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+        return compress_cached(with_etag(response, etag, PUBLIC_CACHE_CONTROL), catalog_key, generation)
+    except Exception as e:
+        logger.error(f"Error fetching public question sets: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            return_db(conn)
+
+
+def _load_public_question_sets(catalog_key, generation, limit, offset):
+    """Query and encode a page of the public set list, and share it."""
+    conn = None
+    try:
+        # The shared copy is filled from the primary: a lagging replica could
+        # store an outdated list for the whole generation
+        conn = get_primary_db() if shared_store_enabled() else get_read_db()
 
         # Build query without user-specific joins
-        query = '''
-            SELECT qs.id, qs.name, qs.description, qs.tags, qs.created_at,
-                   u.username as uploaded_by_username,
-                   COUNT(q.id) as total_questions
-            FROM question_sets qs
-            LEFT JOIN users u ON qs.uploaded_by = u.id
-            LEFT JOIN questions q ON q.set_id = qs.id
-            WHERE qs.is_deleted = false
-            GROUP BY qs.id, u.username
-            ORDER BY qs.created_at DESC
-        '''
+        query = PUBLIC_QUESTION_SETS_QUERY
         params = []
 
         # Add pagination if limit is specified
@@ -54,13 +121,13 @@ def get_public_question_sets():
             query += ' LIMIT %s OFFSET %s'
             params.extend([limit, offset])
 
+        cur = tuple_cursor(conn)
         cur.execute(query, params)
-        sets = cur.fetchall()
+        sets = fetch_rows(cur)
         cur.close()
-        return jsonify({'sets': sets})
-    except Exception as e:
-        logger.error(f"Error fetching public question sets: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        body = current_app.json.dumps_bytes({'sets': sets})
+        put_payload(catalog_key, body, generation)
+        return body
     finally:
         if conn:
             return_db(conn)
@@ -74,39 +141,41 @@ def get_public_questions(set_id):
     Args:
         set_id (int): ID of the question set
 
+    Query Parameters:
+        order (str, optional): 'hardest' or 'easiest' to sort by global
+            difficulty (default: question order)
+
     Returns:
         JSON response with questions and instructions for the set
     """
+    order = request.args.get('order')
+    try:
+        order_by = difficulty_order_by(order, 'q.id')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     conn = None
     try:
-        conn = get_db()
+        conn = get_read_db()
         cur = conn.cursor()
-
-        # Fetch instructions for this set
-        instructions = []
-        try:
-            cur.execute('''
-                SELECT instruction_text
-                FROM set_instructions
-                WHERE set_id = %s
-                ORDER BY display_order
-            ''', (set_id,))
-            instructions = [row['instruction_text'] for row in cur.fetchall()]
-        except Exception as inst_error:
-            logger.warning(f"Could not fetch instructions for set {set_id}: {str(inst_error)}")
-            instructions = []
-
-        # Fetch questions without user progress
-        cur.execute('''
-            SELECT q.id, q.set_id, q.round_no, q.question_no,
-                   q.question_text, q.answer_text, q.image_url
-            FROM questions q
-            WHERE q.set_id = %s
-            ORDER BY q.id
-        ''', (set_id,))
-        questions = cur.fetchall()
+        versions = get_data_versions(cur)
+        etag = make_etag('public-questions', set_id, order, versions['catalog'], versions['answers'])
+        unchanged = not_modified(etag, PUBLIC_CACHE_CONTROL)
         cur.close()
-        return jsonify({'questions': questions, 'instructions': instructions})
+        if unchanged:
+            return unchanged
+
+        # A shared set draws many guests at once: concurrent identical
+        # requests wait for one rendering instead of holding a connection each
+        return_db(conn)
+        conn = None
+        # The body is rendered in the format of the request that computes it
+        mimetype = response_mimetype()
+        body = single_flight('public-questions',
+                             f'{set_id}:{order}:{versions["catalog"]}:{versions["answers"]}:{mimetype}',
+                             partial(_load_public_questions, set_id, order_by))
+        response = current_app.response_class(body, mimetype=mimetype)
+        return with_etag(response, etag, PUBLIC_CACHE_CONTROL)
     except Exception as e:
         logger.error(f"Error fetching public questions for set {set_id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -115,36 +184,119 @@ def get_public_questions(set_id):
             return_db(conn)
 
 
+def _load_public_questions(set_id, order_by):
+    """Render a set's questions with their global difficulty, as JSON (or MessagePack) bytes."""
+    conn = None
+    try:
+        conn = get_read_db()
+        cur = conn.cursor()
+        content = load_set_content(cur, set_id)
+        cur.close()
+
+        cur = tuple_cursor(conn)
+        cur.execute(PUBLIC_QUESTION_OVERLAY_QUERY.format(order_by=order_by), (set_id,))
+        overlay = fetch_rows(cur)
+        cur.close()
+        return render_questions(content, overlay).get_data()
+    finally:
+        if conn:
+            return_db(conn)
+
+
+@public_bp.route('/question-sets/<int:set_id>/content', methods=['GET'])
+def get_set_content(set_id):
+    """
+    Get a set's questions and instructions, identical for every user.
+
+    Combine with /api/question-sets/<set_id>/overlay for the user's progress.
+    Request it as ?v=<content_hash> (from the set list) and the response
+    can be kept by browsers and CDNs indefinitely.
+
+    Args:
+        set_id (int): ID of the question set
+
+    Query Parameters:
+        v (str, optional): The set's content_hash
+
+    Returns:
+        JSON response with set_id, content_hash, questions and instructions
+        (404 if the set does not exist)
+    """
+    conn = None
+    try:
+        conn = get_read_db()
+        cur = conn.cursor()
+        set_key = find_set_key(cur, set_id)
+        if set_key is None:
+            cur.close()
+            return jsonify({'error': 'Question set not found'}), 404
+
+        version = request.args.get('v')
+        if version is not None and version == set_key['content_hash']:
+            cache_control = VERSIONED_CONTENT_CACHE_CONTROL
+        else:
+            cache_control = UNVERSIONED_CONTENT_CACHE_CONTROL
+        etag = make_etag('set-content', set_id, set_key['content_hash'])
+        unchanged = not_modified(etag, cache_control)
+        if unchanged:
+            cur.close()
+            return unchanged
+
+        content = load_set_content(cur, set_id, set_key)
+        cur.close()
+        response = with_etag(render_set_content(set_id, content), etag, cache_control)
+        return compress_cached(response, f'set-content:{JSON_FORMAT_VERSION}:{set_id}:{set_key["content_hash"]}')
+    except Exception as e:
+        logger.error(f"Error fetching content for set {set_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            return_db(conn)
+
+
 @public_bp.route('/questions/mixed', methods=['GET'])
 def get_public_mixed_questions():
     """
     Get random mixed questions without user progress (for guest users).
 
     Query Parameters:
+        order (str, optional): 'hardest' or 'easiest' to sort by global
+            difficulty, random among equals (default: random)
         limit (int, optional): Maximum number of questions to return
         offset (int, optional): Number of questions to skip (default: 0)
+        layout (str, optional): 'columns' to send the questions column by
+            column (see services/layout.py; default: 'rows')
 
     Returns:
-        JSON response with random questions from all sets
+        JSON response with random questions from all sets. With
+        `Accept: application/x-ndjson` (and the rows layout), streamed
+        NDJSON: one question per line.
     """
+    try:
+        order_by = difficulty_order_by(request.args.get('order'), 'RANDOM()')
+        layout = parse_layout(request.args.get('layout'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     conn = None
     try:
         # Guest users get all questions randomly - no filtering by unattempted/missed/bookmarks
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', default=0, type=int)
 
-        conn = get_db()
-        cur = conn.cursor()
+        conn = get_read_db()
 
         # Base query without user-specific joins
-        query = '''
+        query = f'''
             SELECT q.id, q.set_id, q.round_no, q.question_no,
                    q.question_text, q.answer_text, q.image_url,
-                   qs.name as set_name
+                   qs.name as set_name,
+                   {DIFFICULTY_COLUMNS}
             FROM questions q
             JOIN question_sets qs ON q.set_id = qs.id
+            {DIFFICULTY_JOIN}
             WHERE qs.is_deleted = false
-            ORDER BY RANDOM()
+            ORDER BY {order_by}
         '''
         params = []
 
@@ -153,10 +305,23 @@ def get_public_mixed_questions():
             query += ' LIMIT %s OFFSET %s'
             params.extend([limit, offset])
 
+        if layout == ROWS_LAYOUT and wants_ndjson():
+            cur = server_cursor(conn)
+            cur.execute(query, params)
+            response = stream_rows(conn, cur, current_app.json.dumps_lines)
+            conn = None  # Returned to the pool by the stream
+            return response
+
+        cur = tuple_cursor(conn)
         cur.execute(query, params)
-        questions = cur.fetchall()
+        questions = fetch_rows(cur)
         cur.close()
-        return jsonify({'questions': questions})
+        if layout == COLUMNS_LAYOUT:
+            response = jsonify(question_columns(questions))
+        else:
+            response = jsonify({'questions': questions})
+        response.vary.add('Accept')
+        return response
     except Exception as e:
         logger.error(f"Error fetching public mixed questions: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -3,16 +3,222 @@ Questions and Progress Routes
 
 Handles fetching questions, tracking user progress, managing missed questions, and bookmarks.
 """
+import json
 import logging
-from flask import Blueprint, request, jsonify
+from functools import partial
+
+from flask import Blueprint, current_app, request, jsonify
 
 from auth import token_required
-from services.database import get_db, return_db
+from config import PROGRESS_WRITE_MODE, QUESTIONS_RENDER_MODE
+from services.attempt_log import append_attempt_event, record_attempt
+from services.database import (
+    get_db, get_read_db, return_db, pipeline, mark_user_write, commit_user_write,
+    tuple_cursor, server_cursor, fetch_rows,
+)
+from services.etags import get_data_versions, user_etag, not_modified, with_etag
+from services.fields import parse_fields, select_list
+from services.json_provider import wants_msgpack
+from services.layout import ROWS_LAYOUT, COLUMNS_LAYOUT, parse_layout, question_columns
+from services.question_stats import (
+    DIFFICULTY_COLUMNS, DIFFICULTY_EXPRESSION, DIFFICULTY_FIELDS, DIFFICULTY_JOIN, difficulty_order_by,
+)
+from services.set_content import (
+    CONTENT_FIELD_NAMES, INSTRUCTIONS_QUERY, load_set_content, render_questions, render_instructions_line,
+    render_question_lines,
+)
+from services.streaming import wants_ndjson, stream_rows
 
 logger = logging.getLogger(__name__)
 
 questions_bp = Blueprint('questions', __name__, url_prefix='/api')
 
+# Per-user fields and global difficulty of one set's questions, in response
+# order; the question content comes from services/set_content.py.
+# Format with order_by (see difficulty_order_by; default 'q.id').
+# Params: user_id (progress), user_id (missed), user_id (bookmarks), set_id
+QUESTION_OVERLAY_QUERY = f'''
+    SELECT q.id,
+           up.attempted, up.correct, up.attempt_count, up.last_attempted,
+           mq.id IS NOT NULL as is_missed,
+           b.id IS NOT NULL as is_bookmarked,
+           {DIFFICULTY_COLUMNS}
+    FROM questions q
+    LEFT JOIN user_progress up ON up.question_id = q.id AND up.user_id = %s
+    LEFT JOIN missed_questions mq ON mq.question_id = q.id AND mq.user_id = %s
+    LEFT JOIN bookmarks b ON b.question_id = q.id AND b.user_id = %s
+    {DIFFICULTY_JOIN}
+    WHERE q.set_id = %s
+    ORDER BY {{order_by}}
+'''
+
+# Fields offered by the `fields` parameter (services/fields.py) of question
+# lists, as expressions over the aliases of QUESTION_ROWS_QUERY
+QUESTION_FIELDS = {
+    'id': 'q.id',
+    'set_id': 'q.set_id',
+    'round_no': 'q.round_no',
+    'question_no': 'q.question_no',
+    'question_text': 'q.question_text',
+    'image_url': 'q.image_url',
+    'answer_text': 'q.answer_text',
+    'created_at': 'q.created_at',
+    'attempted': 'up.attempted',
+    'correct': 'up.correct',
+    'attempt_count': 'up.attempt_count',
+    'last_attempted': 'up.last_attempted',
+    'is_missed': 'mq.id IS NOT NULL',
+    'is_bookmarked': 'b.id IS NOT NULL',
+    **DIFFICULTY_FIELDS,
+}
+
+# Mixed lists also name each question's set
+MIXED_QUESTION_FIELDS = {**QUESTION_FIELDS, 'set_name': 'qs.name'}
+
+# Select list of QUESTION_ROWS_QUERY without `fields`
+QUESTION_ROWS_COLUMNS = f'''q.*,
+           up.attempted, up.correct, up.attempt_count, up.last_attempted,
+           mq.id IS NOT NULL as is_missed,
+           b.id IS NOT NULL as is_bookmarked,
+           {DIFFICULTY_COLUMNS}'''
+
+# A set's questions with the per-user fields and global difficulty, as one
+# row each (layout=columns and `fields`, which need plain values rather than
+# the cached encoded content). Format with columns (QUESTION_ROWS_COLUMNS or a
+# select_list of QUESTION_FIELDS) and order_by (see difficulty_order_by).
+# Params: user_id (progress), user_id (missed), user_id (bookmarks), set_id
+QUESTION_ROWS_QUERY = f'''
+    SELECT {{columns}}
+    FROM questions q
+    LEFT JOIN user_progress up ON up.question_id = q.id AND up.user_id = %s
+    LEFT JOIN missed_questions mq ON mq.question_id = q.id AND mq.user_id = %s
+    LEFT JOIN bookmarks b ON b.question_id = q.id AND b.user_id = %s
+    {DIFFICULTY_JOIN}
+    WHERE q.set_id = %s
+    ORDER BY {{order_by}}
+'''
+
+# Keys of a question object in the order cache mode writes them: content
+# (CONTENT_FIELD_NAMES), then overlay, each sorted by the JSON provider (sort_keys)
+DOCUMENT_FIELD_NAMES = (sorted(CONTENT_FIELD_NAMES)
+                        + sorted(name for name in QUESTION_FIELDS if name not in CONTENT_FIELD_NAMES))
+
+# SQL for a value's JSON text exactly as the JSON provider encodes it. Format with the column
+_JSON_TEXT = {
+    'value': "COALESCE(to_json({0})::text, 'null')",
+    # http_date(): TIMESTAMP columns are taken as UTC
+    'timestamp': "COALESCE(to_json(to_char({0}, 'Dy, DD Mon YYYY HH24:MI:SS \"GMT\"'))::text, 'null')",
+    # Python floats keep a fractional part (0.0, not 0)
+    'float': "COALESCE(CASE WHEN {0} = trunc({0}) THEN trunc({0})::text || '.0' ELSE to_json({0})::text END, 'null')",
+}
+_DOCUMENT_FIELD_KINDS = {'created_at': 'timestamp', 'last_attempted': 'timestamp', 'difficulty': 'float'}
+
+
+def _json_object_sql(alias, names, kinds):
+    """
+    SQL building a compact JSON object from alias's columns, keys in the given order.
+
+    Braces are doubled: the result goes into a query that is str.format()ted.
+    """
+    parts = []
+    for index, name in enumerate(names):
+        key = ('{' if index == 0 else ',') + json.dumps(name) + ':'
+        parts.append(f"'{key}' || " + _JSON_TEXT[kinds.get(name, 'value')].format(f'{alias}.{name}'))
+    return (' || '.join(parts) + " || '}'").replace('{', '{{').replace('}', '}}')
+
+
+# The whole get_questions response (QUESTIONS_RENDER_MODE=sql), rendered as
+# JSON text by Postgres byte for byte as cache mode renders it, so both
+# modes share ETags. Both select the question columns of CONTENT_FIELD_NAMES.
+# Format with order_by (see difficulty_order_by; default 'q.id').
+# Params: set_id (instructions), user_id (progress), user_id (missed), user_id (bookmarks), set_id
+QUESTIONS_DOCUMENT_QUERY = f'''
+    SELECT '{{{{"instructions":' || COALESCE((
+            SELECT '[' || string_agg(COALESCE(to_json(si.instruction_text)::text, 'null'), ','
+                                     ORDER BY si.display_order) || ']'
+            FROM set_instructions si
+            WHERE si.set_id = %s
+        ), '[]')
+        || ',"questions":' || COALESCE((
+            SELECT '[' || string_agg({_json_object_sql('q', DOCUMENT_FIELD_NAMES, _DOCUMENT_FIELD_KINDS)}, ','
+                                     ORDER BY {{order_by}}) || ']'
+            FROM (
+                SELECT q.*,
+                       up.attempted, up.correct, up.attempt_count, up.last_attempted,
+                       mq.id IS NOT NULL as is_missed,
+                       b.id IS NOT NULL as is_bookmarked,
+                       {DIFFICULTY_COLUMNS}
+                FROM questions q
+                LEFT JOIN user_progress up ON up.question_id = q.id AND up.user_id = %s
+                LEFT JOIN missed_questions mq ON mq.question_id = q.id AND mq.user_id = %s
+                LEFT JOIN bookmarks b ON b.question_id = q.id AND b.user_id = %s
+                {DIFFICULTY_JOIN}
+                WHERE q.set_id = %s
+            ) q
+        ), '[]')
+        || '}}}}' AS document
+'''
+
+
+# Per-user state of the questions of one set that have any.
+# Params: user_id (progress), user_id (missed), user_id (bookmarks), set_id
+PROGRESS_OVERLAY_QUERY = '''
+    SELECT q.id, up.attempted, up.correct,
+           mq.id IS NOT NULL as missed,
+           b.id IS NOT NULL as bookmarked
+    FROM questions q
+    LEFT JOIN user_progress up ON up.question_id = q.id AND up.user_id = %s
+    LEFT JOIN missed_questions mq ON mq.question_id = q.id AND mq.user_id = %s
+    LEFT JOIN bookmarks b ON b.question_id = q.id AND b.user_id = %s
+    WHERE q.set_id = %s
+    AND (up.id IS NOT NULL OR mq.id IS NOT NULL OR b.id IS NOT NULL)
+'''
+
+# Create (if needed) and lock the user_set_round_stats row of a question's
+# set and round. Params: user_id, question_id
+LOCK_ROUND_STATS_QUERY = '''
+    INSERT INTO user_set_round_stats (user_id, set_id, round_no)
+    SELECT %s, q.set_id, COALESCE(q.round_no, '')
+    FROM questions q
+    WHERE q.id = %s
+    ON CONFLICT (user_id, set_id, round_no)
+    DO UPDATE SET attempted = user_set_round_stats.attempted
+'''
+
+# Record an answer and apply the change to the round stats. Returns the progress row.
+# Params: user_id, question_id (previous state), user_id, question_id, attempted, correct
+PROGRESS_UPSERT_QUERY = '''
+    WITH previous AS (
+        SELECT attempted, correct
+        FROM user_progress
+        WHERE user_id = %s AND question_id = %s
+    ),
+    progress AS (
+        INSERT INTO user_progress (user_id, question_id, attempted, correct, attempt_count, last_attempted)
+        VALUES (%s, %s, %s, %s, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id, question_id)
+        DO UPDATE SET
+            attempted = EXCLUDED.attempted,
+            correct = EXCLUDED.correct,
+            attempt_count = user_progress.attempt_count + 1,
+            last_attempted = CURRENT_TIMESTAMP
+        RETURNING *
+    ),
+    round_stats AS (
+        UPDATE user_set_round_stats s
+        SET attempted = s.attempted + (p.attempted IS TRUE)::int
+                        - COALESCE((SELECT (attempted IS TRUE)::int FROM previous), 0),
+            correct = s.correct + ((p.attempted AND p.correct) IS TRUE)::int
+                      - COALESCE((SELECT ((attempted AND correct) IS TRUE)::int FROM previous), 0)
+        FROM progress p
+        JOIN questions q ON q.id = p.question_id
+        WHERE s.user_id = p.user_id
+        AND s.set_id = q.set_id
+        AND s.round_no = COALESCE(q.round_no, '')
+    )
+    SELECT * FROM progress
+'''
+
 
 @questions_bp.route('/question-sets/<int:set_id>/questions', methods=['GET'])
 @token_required
@@ -23,45 +229,102 @@ def get_questions(set_id):
     Args:
         set_id (int): ID of the question set
 
+    Query Parameters:
+        order (str, optional): 'hardest' or 'easiest' to sort by global
+            difficulty (default: question order)
+        layout (str, optional): 'columns' to send the questions column by
+            column (see services/layout.py; default: 'rows')
+        fields (str, optional): Comma-separated question fields to return
+            (see QUESTION_FIELDS; default: all)
+
     Returns:
-        JSON response with questions and instructions
+        JSON response with questions and instructions. With
+        `Accept: application/x-ndjson` (and the rows layout), streamed
+        NDJSON instead: a first line {"instructions": [...]}, then one
+        question per line.
     """
+    order = request.args.get('order')
+    try:
+        fields = parse_fields(request.args.get('fields'), QUESTION_FIELDS)
+        # Projections may leave out the difficulty column
+        order_by = difficulty_order_by(order, 'q.id',
+                                       'difficulty' if fields is None else DIFFICULTY_EXPRESSION)
+        layout = parse_layout(request.args.get('layout'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    ndjson = layout == ROWS_LAYOUT and wants_ndjson()
+
     conn = None
     try:
-        conn = get_db()
+        conn = get_read_db(request.current_user)
         cur = conn.cursor()
-
-        # Fetch instructions for this set (gracefully handle if table doesn't exist)
-        instructions = []
-        try:
-            cur.execute('''
-                SELECT instruction_text
-                FROM set_instructions
-                WHERE set_id = %s
-                ORDER BY display_order
-            ''', (set_id,))
+        versions = get_data_versions(cur)
+        etag = user_etag('questions', request.current_user, versions['catalog'], versions['answers'],
+                         order, layout, 'ndjson' if ndjson else 'json', fields)
+        unchanged = not_modified(etag)
+        if unchanged:
+            cur.close()
+            return unchanged
+
+        user_id = request.current_user['id']
+        if layout == COLUMNS_LAYOUT or fields is not None:
+            cur.execute(INSTRUCTIONS_QUERY, (set_id,))
             instructions = [row['instruction_text'] for row in cur.fetchall()]
-        except Exception as inst_error:
-            # Table might not exist yet (migration not run) - continue without instructions
-            logger.warning(f"Could not fetch instructions for set {set_id}: {str(inst_error)}")
-            instructions = []
+            cur.close()
+            columns = QUESTION_ROWS_COLUMNS if fields is None else select_list(fields, QUESTION_FIELDS)
+            rows_query = QUESTION_ROWS_QUERY.format(columns=columns, order_by=order_by)
+            rows_params = (user_id, user_id, user_id, set_id)
+            if ndjson:
+                cur = server_cursor(conn)
+                cur.execute(rows_query, rows_params)
+                response = stream_rows(conn, cur, current_app.json.dumps_lines,
+                                       head=current_app.json.dumps_bytes({'instructions': instructions}) + b'\n')
+                conn = None  # Returned to the pool by the stream
+                return with_etag(response, etag)
+
+            cur = tuple_cursor(conn)
+            cur.execute(rows_query, rows_params)
+            questions = fetch_rows(cur)
+            cur.close()
+            if layout == COLUMNS_LAYOUT:
+                response = jsonify({'instructions': instructions, **question_columns(questions)})
+            else:
+                response = jsonify({'instructions': instructions, 'questions': questions})
+            response.vary.add('Accept')
+            return with_etag(response, etag)
+
+        # MessagePack clients get the spliced cache path: a JSON document from
+        # Postgres would have to be decoded and packed again on every request
+        if QUESTIONS_RENDER_MODE == 'sql' and not ndjson and not wants_msgpack():
+            cur.execute(QUESTIONS_DOCUMENT_QUERY.format(order_by=order_by),
+                        (set_id, user_id, user_id, user_id, set_id))
+            document = cur.fetchone()['document']
+            cur.close()
+            # Already JSON: sent as-is, never decoded in Python
+            response = current_app.response_class(document, mimetype=current_app.json.mimetype)
+            response.vary.add('Accept')
+            return with_etag(response, etag)
+
+        content = load_set_content(cur, set_id)
+        cur.close()
 
-        # Fetch questions
-        cur.execute('''
-            SELECT q.*,
-                   up.attempted, up.correct, up.attempt_count, up.last_attempted,
-                   mq.id IS NOT NULL as is_missed,
-                   b.id IS NOT NULL as is_bookmarked
-            FROM questions q
-            LEFT JOIN user_progress up ON up.question_id = q.id AND up.user_id = %s
-            LEFT JOIN missed_questions mq ON mq.question_id = q.id AND mq.user_id = %s
-            LEFT JOIN bookmarks b ON b.question_id = q.id AND b.user_id = %s
-            WHERE q.set_id = %s
-            ORDER BY q.id
-        ''', (request.current_user['id'], request.current_user['id'], request.current_user['id'], set_id))
-        questions = cur.fetchall()
+        overlay_query = QUESTION_OVERLAY_QUERY.format(order_by=order_by)
+        overlay_params = (user_id, user_id, user_id, set_id)
+        if ndjson:
+            cur = server_cursor(conn)
+            cur.execute(overlay_query, overlay_params)
+            response = stream_rows(conn, cur, partial(render_question_lines, content),
+                                   head=render_instructions_line(content))
+            conn = None  # Returned to the pool by the stream
+            return with_etag(response, etag)
+
+        cur = tuple_cursor(conn)
+        cur.execute(overlay_query, overlay_params)
+        overlay = fetch_rows(cur)
         cur.close()
-        return jsonify({'questions': questions, 'instructions': instructions})
+        response = render_questions(content, overlay)
+        response.vary.add('Accept')
+        return with_etag(response, etag)
     except Exception as e:
         logger.error(f"Error fetching questions for set {set_id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -70,6 +333,56 @@ def get_questions(set_id):
             return_db(conn)
 
 
+@questions_bp.route('/question-sets/<int:set_id>/overlay', methods=['GET'])
+@token_required
+def get_progress_overlay(set_id):
+    """
+    Get the current user's state for the questions of a set.
+
+    Complements the shared /api/public/question-sets/<set_id>/content, so
+    repeat visits only download this small per-user part.
+
+    Args:
+        set_id (int): ID of the question set
+
+    Returns:
+        JSON response with set_id and `overlay`, mapping question IDs to
+        attempted, correct, missed and bookmarked. Questions the user has
+        never touched are left out.
+    """
+    # Only the user's own data goes into the overlay: no query needed to revalidate
+    etag = user_etag('progress-overlay', request.current_user)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    conn = None
+    try:
+        conn = get_read_db(request.current_user)
+        cur = conn.cursor()
+        cur.execute(PROGRESS_OVERLAY_QUERY,
+                    (request.current_user['id'], request.current_user['id'], request.current_user['id'], set_id))
+        rows = cur.fetchall()
+        cur.close()
+
+        overlay = {
+            row['id']: {
+                'attempted': row['attempted'],
+                'correct': row['correct'],
+                'missed': row['missed'],
+                'bookmarked': row['bookmarked'],
+            }
+            for row in rows
+        }
+        return with_etag(jsonify({'set_id': set_id, 'overlay': overlay}), etag)
+    except Exception as e:
+        logger.error(f"Error fetching progress overlay for set {set_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            return_db(conn)
+
+
 @questions_bp.route('/questions/<int:question_id>/progress', methods=['POST'])
 @token_required
 def update_progress(question_id):
@@ -84,37 +397,48 @@ def update_progress(question_id):
         correct (bool, optional): Whether the answer was correct
 
     Returns:
-        JSON response with updated progress
+        JSON response with updated progress. With PROGRESS_WRITE_MODE=events the
+        answer is only queued (202, progress is null) and reaches user_progress
+        at the next rollup.
     """
     conn = None
     try:
         data = request.json
         attempted = data.get('attempted', True)
         correct = data.get('correct', None)
+
+        if PROGRESS_WRITE_MODE == 'events':
+            record_attempt(request.current_user['id'], question_id, attempted, correct)
+            return jsonify({'success': True, 'progress': None}), 202
+
         conn = get_db()
         cur = conn.cursor()
-        cur.execute('''
-            INSERT INTO user_progress (user_id, question_id, attempted, correct, attempt_count, last_attempted)
-            VALUES (%s, %s, %s, %s, 1, CURRENT_TIMESTAMP)
-            ON CONFLICT (user_id, question_id)
-            DO UPDATE SET
-                attempted = EXCLUDED.attempted,
-                correct = EXCLUDED.correct,
-                attempt_count = user_progress.attempt_count + 1,
-                last_attempted = CURRENT_TIMESTAMP
-            RETURNING *
-        ''', (request.current_user['id'], question_id, attempted, correct))
-        progress = cur.fetchone()
+        activity_cur = conn.cursor()
+
+        # All statements and the commit go out in one round trip on psycopg3
+        with pipeline(conn):
+            # Lock the question's round stats so concurrent answers apply their deltas in turn
+            activity_cur.execute(LOCK_ROUND_STATS_QUERY, (request.current_user['id'], question_id))
+
+            cur.execute(PROGRESS_UPSERT_QUERY, (
+                request.current_user['id'], question_id,
+                request.current_user['id'], question_id, attempted, correct
+            ))
+
+            # Record daily activity for streak tracking
+            activity_cur.execute('''
+                INSERT INTO daily_activity (user_id, activity_date, questions_practiced)
+                VALUES (%s, CURRENT_DATE, 1)
+                ON CONFLICT (user_id, activity_date)
+                DO UPDATE SET questions_practiced = daily_activity.questions_practiced + 1
+            ''', (request.current_user['id'],))
+
+            append_attempt_event(activity_cur, request.current_user['id'], question_id, attempted, correct)
+            mark_user_write(activity_cur, request.current_user['id'])
+            commit_user_write(conn, request.current_user['id'])
 
-        # Record daily activity for streak tracking
-        cur.execute('''
-            INSERT INTO daily_activity (user_id, activity_date, questions_practiced)
-            VALUES (%s, CURRENT_DATE, 1)
-            ON CONFLICT (user_id, activity_date)
-            DO UPDATE SET questions_practiced = daily_activity.questions_practiced + 1
-        ''', (request.current_user['id'],))
-
-        conn.commit()
+        progress = cur.fetchone()
+        activity_cur.close()
         cur.close()
         return jsonify({'success': True, 'progress': progress})
     except Exception as e:
@@ -147,7 +471,8 @@ def mark_missed(question_id):
             RETURNING *
         ''', (request.current_user['id'], question_id))
         result = cur.fetchone()
-        conn.commit()
+        mark_user_write(cur, request.current_user['id'])
+        commit_user_write(conn, request.current_user['id'])
         cur.close()
         return jsonify({'success': True, 'missed': result})
     except Exception as e:
@@ -175,7 +500,8 @@ def unmark_missed(question_id):
         cur = conn.cursor()
         cur.execute('DELETE FROM missed_questions WHERE user_id = %s AND question_id = %s',
                     (request.current_user['id'], question_id))
-        conn.commit()
+        mark_user_write(cur, request.current_user['id'])
+        commit_user_write(conn, request.current_user['id'])
         cur.close()
         return jsonify({'success': True})
     except Exception as e:
@@ -208,8 +534,9 @@ def toggle_bookmark(question_id):
         existing = cur.fetchone()
 
         if existing:
-            # Remove
-            cur.execute('DELETE FROM bookmarks WHERE id = %s', (existing['id'],))
+            # Remove (user_id lets a partitioned bookmarks table prune to one partition)
+            cur.execute('DELETE FROM bookmarks WHERE user_id = %s AND id = %s',
+                        (request.current_user['id'], existing['id']))
             action = 'removed'
             is_bookmarked = False
         else:
@@ -219,7 +546,8 @@ def toggle_bookmark(question_id):
             action = 'added'
             is_bookmarked = True
 
-        conn.commit()
+        mark_user_write(cur, request.current_user['id'])
+        commit_user_write(conn, request.current_user['id'])
         cur.close()
 
         return jsonify({'success': True, 'action': action, 'is_bookmarked': is_bookmarked})
@@ -241,12 +569,29 @@ def get_mixed_questions():
 
     Query Parameters:
         filter (str): Filter type - 'all', 'unattempted', 'missed', or 'bookmarks' (default: 'all')
+        order (str, optional): 'hardest' or 'easiest' to sort by global
+            difficulty, random among equals (default: random)
         limit (int, optional): Maximum number of questions to return
         offset (int, optional): Number of questions to skip (default: 0)
+        layout (str, optional): 'columns' to send the questions column by
+            column (see services/layout.py; default: 'rows')
+        fields (str, optional): Comma-separated question fields to return
+            (see MIXED_QUESTION_FIELDS; default: all)
 
     Returns:
-        JSON response with random questions matching the filter
+        JSON response with random questions matching the filter. With
+        `Accept: application/x-ndjson` (and the rows layout), streamed
+        NDJSON: one question per line.
     """
+    order = request.args.get('order')
+    try:
+        fields = parse_fields(request.args.get('fields'), MIXED_QUESTION_FIELDS)
+        # Projections may leave out the difficulty column
+        order_by = difficulty_order_by(order, 'RANDOM()', 'difficulty' if fields is None else DIFFICULTY_EXPRESSION)
+        layout = parse_layout(request.args.get('layout'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     conn = None
     try:
         filter_type = request.args.get('filter', 'all')
@@ -254,44 +599,69 @@ def get_mixed_questions():
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', default=0, type=int)
 
-        conn = get_db()
-        cur = conn.cursor()
+        conn = get_read_db(request.current_user)
 
-        # Base query now includes is_bookmarked
-        base_query = '''
-            SELECT q.*, up.attempted, up.correct, up.attempt_count, up.last_attempted,
+        if fields is None:
+            columns = f'''q.*, up.attempted, up.correct, up.attempt_count, up.last_attempted,
                    mq.id IS NOT NULL as is_missed,
                    b.id IS NOT NULL as is_bookmarked,
-                   qs.name as set_name
+                   qs.name as set_name,
+                   {DIFFICULTY_COLUMNS}'''
+        else:
+            columns = select_list(fields, MIXED_QUESTION_FIELDS)
+
+        # Base query now includes is_bookmarked
+        base_query = f'''
+            SELECT {columns}
             FROM questions q
             JOIN question_sets qs ON q.set_id = qs.id
             LEFT JOIN user_progress up ON up.question_id = q.id AND up.user_id = %s
             LEFT JOIN missed_questions mq ON mq.question_id = q.id AND mq.user_id = %s
             LEFT JOIN bookmarks b ON b.question_id = q.id AND b.user_id = %s
+            {DIFFICULTY_JOIN}
             WHERE qs.is_deleted = false
         '''
 
         params = [request.current_user['id'], request.current_user['id'], request.current_user['id']]
 
         if filter_type == 'unattempted':
-            query = base_query + ' AND (up.id IS NULL OR up.attempted = false) ORDER BY RANDOM()'
+            query = base_query + ' AND (up.id IS NULL OR up.attempted = false)'
         elif filter_type == 'missed':
-            query = base_query + ' AND mq.id IS NOT NULL ORDER BY RANDOM()'
+            query = base_query + ' AND mq.id IS NOT NULL'
         elif filter_type == 'bookmarks':
-            query = base_query + ' AND b.id IS NOT NULL ORDER BY RANDOM()'
+            query = base_query + ' AND b.id IS NOT NULL'
         else:
-            query = base_query + ' ORDER BY RANDOM()'
+            query = base_query
+
+        if order is None:
+            query += ' ORDER BY RANDOM()'
+        else:
+            # Random order among equally difficult questions
+            query += f' ORDER BY {order_by}'
 
         # Add pagination if limit is specified
         if limit is not None:
             query += ' LIMIT %s OFFSET %s'
             params.extend([limit, offset])
 
+        if layout == ROWS_LAYOUT and wants_ndjson():
+            cur = server_cursor(conn)
+            cur.execute(query, params)
+            response = stream_rows(conn, cur, current_app.json.dumps_lines)
+            conn = None  # Returned to the pool by the stream
+            return response
+
+        cur = tuple_cursor(conn)
         cur.execute(query, params)
-        questions = cur.fetchall()
+        questions = fetch_rows(cur)
         cur.close()
 
-        return jsonify({'questions': questions, 'filter_type': filter_type, 'total': len(questions)})
+        if layout == COLUMNS_LAYOUT:
+            response = jsonify({**question_columns(questions), 'filter_type': filter_type, 'total': len(questions)})
+        else:
+            response = jsonify({'questions': questions, 'filter_type': filter_type, 'total': len(questions)})
+        response.vary.add('Accept')
+        return response
     except Exception as e:
         logger.error(f"Get mixed questions error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -7,13 +7,62 @@ import logging
 from flask import Blueprint, request, jsonify
 
 from auth import token_required
-from services.database import get_db, return_db
+from services.database import get_db, get_read_db, return_db, mark_user_write, commit_user_write
+from services.etags import get_data_versions, bump_data_version, user_etag, not_modified, with_etag
+from services.fields import parse_fields, select_list
+from services.shared_store import bump_generation
 from services.tsv_parser import parse_and_save_set
 
 logger = logging.getLogger(__name__)
 
 sets_bp = Blueprint('sets', __name__, url_prefix='/api')
 
+# Fields offered by the `fields` parameter (services/fields.py) of the set
+# list, as expressions over the aliases of QUESTION_SETS_QUERY
+QUESTION_SET_FIELDS = {
+    'id': 'qs.id',
+    'name': 'qs.name',
+    'description': 'qs.description',
+    'uploaded_by': 'qs.uploaded_by',
+    'created_at': 'qs.created_at',
+    'total_questions': 'qs.total_questions',
+    'tags': 'qs.tags',
+    'is_deleted': 'qs.is_deleted',
+    'google_drive_id': 'qs.google_drive_id',
+    'content_hash': 'qs.content_hash',
+    'deleted_at': 'qs.deleted_at',
+    'uploaded_by_username': 'u.username',
+    'questions_attempted': 'COALESCE(progress.questions_attempted, 0)',
+    'directly_opened': 'so.id IS NOT NULL',
+    'last_opened': 'so.opened_at',
+}
+
+# Select list of QUESTION_SETS_QUERY without `fields`
+QUESTION_SETS_COLUMNS = '''qs.*, u.username as uploaded_by_username,
+           COALESCE(progress.questions_attempted, 0) as questions_attempted,
+           so.id IS NOT NULL as directly_opened,
+           so.opened_at as last_opened'''
+
+# Active sets, newest first, with the current user's progress. Joins whose
+# fields are not selected are skipped by the planner (join removal).
+# Format with columns (QUESTION_SETS_COLUMNS or a select_list of QUESTION_SET_FIELDS).
+# Params: user_id (progress), user_id (opens)
+QUESTION_SETS_QUERY = '''
+    SELECT {columns}
+    FROM question_sets qs
+    LEFT JOIN users u ON qs.uploaded_by = u.id
+    LEFT JOIN (
+        SELECT q.set_id, COUNT(*) as questions_attempted
+        FROM user_progress up
+        JOIN questions q ON q.id = up.question_id
+        WHERE up.user_id = %s AND up.attempted = true
+        GROUP BY q.set_id
+    ) progress ON progress.set_id = qs.id
+    LEFT JOIN set_opens so ON so.set_id = qs.id AND so.user_id = %s
+    WHERE qs.is_deleted = false
+    ORDER BY qs.created_at DESC
+'''
+
 
 @sets_bp.route('/upload-tsv', methods=['POST'])
 @token_required
@@ -121,34 +170,34 @@ def get_question_sets():
     Query Parameters:
         limit (int, optional): Maximum number of sets to return
         offset (int, optional): Number of sets to skip (default: 0)
+        fields (str, optional): Comma-separated set fields to return
+            (see QUESTION_SET_FIELDS; default: all)
 
     Returns:
         JSON response with list of question sets including progress info
     """
+    try:
+        fields = parse_fields(request.args.get('fields'), QUESTION_SET_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     conn = None
     try:
         # Optional pagination parameters (backward compatible - no limit by default)
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', default=0, type=int)
 
-        conn = get_db()
+        conn = get_read_db(request.current_user)
         cur = conn.cursor()
+        etag = user_etag('question-sets', request.current_user, get_data_versions(cur)['catalog'], fields)
+        unchanged = not_modified(etag)
+        if unchanged:
+            cur.close()
+            return unchanged
 
         # Build query with optional LIMIT and OFFSET
-        query = '''
-            SELECT qs.*, u.username as uploaded_by_username,
-                   COUNT(up.id) FILTER (WHERE up.user_id = %s AND up.attempted = true) as questions_attempted,
-                   so.id IS NOT NULL as directly_opened,
-                   so.opened_at as last_opened
-            FROM question_sets qs
-            LEFT JOIN users u ON qs.uploaded_by = u.id
-            LEFT JOIN questions q ON q.set_id = qs.id
-            LEFT JOIN user_progress up ON up.question_id = q.id
-            LEFT JOIN set_opens so ON so.set_id = qs.id AND so.user_id = %s
-            WHERE qs.is_deleted = false
-            GROUP BY qs.id, u.username, so.id, so.opened_at
-            ORDER BY qs.created_at DESC
-        '''
+        columns = QUESTION_SETS_COLUMNS if fields is None else select_list(fields, QUESTION_SET_FIELDS)
+        query = QUESTION_SETS_QUERY.format(columns=columns)
         params = [request.current_user['id'], request.current_user['id']]
 
         # Add pagination if limit is specified
@@ -159,7 +208,7 @@ def get_question_sets():
         cur.execute(query, params)
         sets = cur.fetchall()
         cur.close()
-        return jsonify({'sets': sets})
+        return with_etag(jsonify({'sets': sets}), etag)
     except Exception as e:
         logger.error(f"Error fetching question sets: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -189,7 +238,8 @@ def mark_set_opened(set_id):
             VALUES (%s, %s, CURRENT_TIMESTAMP)
             ON CONFLICT (user_id, set_id) DO UPDATE SET opened_at = CURRENT_TIMESTAMP
         ''', (request.current_user['id'], set_id))
-        conn.commit()
+        mark_user_write(cur, request.current_user['id'])
+        commit_user_write(conn, request.current_user['id'])
         cur.close()
         return jsonify({'success': True})
     except Exception as e:
@@ -236,8 +286,11 @@ def rename_question_set(set_id):
 
         # Update name
         cur.execute('UPDATE question_sets SET name = %s WHERE id = %s', (new_name.strip(), set_id))
-        conn.commit()
+        mark_user_write(cur, request.current_user['id'])
+        bump_data_version(cur)
+        commit_user_write(conn, request.current_user['id'])
         cur.close()
+        bump_generation()
 
         return jsonify({'success': True})
     except Exception as e:
@@ -256,6 +309,9 @@ def delete_question_set(set_id):
     """
     Soft delete a question set (only the owner can delete).
 
+    The set and its questions are purged for good once the grace period
+    (PURGE_GRACE_PERIOD_DAYS) has passed; see services/reaper.py.
+
     Args:
         set_id (int): ID of the question set
 
@@ -272,9 +328,12 @@ def delete_question_set(set_id):
             return jsonify({'error': 'Question set not found'}), 404
         if question_set['uploaded_by'] != request.current_user['id']:
             return jsonify({'error': 'Unauthorized'}), 403
-        cur.execute('UPDATE question_sets SET is_deleted = true WHERE id = %s', (set_id,))
-        conn.commit()
+        cur.execute('UPDATE question_sets SET is_deleted = true, deleted_at = now() WHERE id = %s', (set_id,))
+        mark_user_write(cur, request.current_user['id'])
+        bump_data_version(cur)
+        commit_user_write(conn, request.current_user['id'])
         cur.close()
+        bump_generation()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -4,16 +4,103 @@ Statistics and Missed Questions Routes
 Handles user statistics, streak tracking, and missed questions management.
 """
 import logging
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 from flask import Blueprint, request, jsonify
 
 from auth import token_required
-from services.database import get_db, return_db
+from services.database import get_read_db, return_db, pipeline
+from services.etags import get_data_versions, make_etag, user_etag, not_modified, with_etag
+from services.leaderboard import LEADERBOARD_BOARDS, LEADERBOARD_NAME
+from services.rollup import ROLLUP_NAME
 
 logger = logging.getLogger(__name__)
 
 stats_bp = Blueprint('stats', __name__, url_prefix='/api')
 
+# Missed questions not yet exported to Anki, newest first. Params: user_id
+MISSED_QUESTIONS_QUERY = '''
+    SELECT q.*, mq.added_at, qs.name as set_name
+    FROM missed_questions mq
+    JOIN questions q ON mq.question_id = q.id
+    JOIN question_sets qs ON q.set_id = qs.id
+    WHERE mq.user_id = %s
+    AND mq.exported_to_anki = false
+    AND qs.is_deleted = false
+    ORDER BY mq.added_at DESC
+'''
+
+# Answers per day or week from the rollup table, plus events the rollup has
+# not reached yet (a short range scan at the end of attempt_events).
+# Params: user_id, from, to, rollup name, user_id, from, to, granularity ('day'/'week')
+HISTORY_QUERY = '''
+    WITH days AS (
+        SELECT stat_date, attempted, correct, legacy_attempted
+        FROM user_daily_stats
+        WHERE user_id = %s AND stat_date BETWEEN %s AND %s
+        UNION ALL
+        SELECT e.recorded_at::date, COUNT(*), COUNT(*) FILTER (WHERE e.correct), 0
+        FROM attempt_events e
+        WHERE e.id > (SELECT COALESCE(MAX(last_event_id), 0) FROM rollup_state WHERE name = %s)
+        AND e.user_id = %s
+        AND e.recorded_at >= %s AND e.recorded_at < %s + 1
+        GROUP BY e.recorded_at::date
+    )
+    SELECT date_trunc(%s, stat_date)::date AS period,
+           SUM(attempted)::integer AS tracked,
+           SUM(correct)::integer AS correct,
+           SUM(legacy_attempted)::integer AS legacy_attempted
+    FROM days
+    GROUP BY 1
+    ORDER BY 1
+'''
+
+# What a user's history depends on besides data_version: the database's date
+# (the default range ends today) and the user's latest event not yet rolled
+# up, which HISTORY_QUERY already counts. Params: rollup name, user_id
+HISTORY_VERSIONS_QUERY = '''
+    SELECT CURRENT_DATE AS today,
+           (SELECT MAX(e.id) FROM attempt_events e
+            WHERE e.id > (SELECT COALESCE(MAX(last_event_id), 0) FROM rollup_state WHERE name = %s)
+            AND e.user_id = %s) AS pending_event_id
+'''
+
+# Per-round accuracy rows of active sets. Params: user_id
+BREAKDOWN_QUERY = '''
+    SELECT s.set_id, qs.name as set_name, s.round_no, s.attempted, s.correct
+    FROM user_set_round_stats s
+    JOIN question_sets qs ON qs.id = s.set_id
+    WHERE s.user_id = %s
+    AND s.attempted > 0
+    AND qs.is_deleted = false
+'''
+
+# Top of one board from the snapshot (index range scan on the rank column).
+# Format with rank_column (see LEADERBOARD_BOARDS). Params: limit
+LEADERBOARD_TOP_QUERY = '''
+    SELECT l.{rank_column} AS rank, u.username, l.streak, l.practiced_week, l.accuracy
+    FROM leaderboard l
+    JOIN users u ON u.id = l.user_id
+    WHERE l.{rank_column} IS NOT NULL
+    ORDER BY l.{rank_column}, l.user_id
+    LIMIT %s
+'''
+
+# The caller's snapshot row and when the snapshot was built. Params: user_id, rollup name
+LEADERBOARD_ME_QUERY = '''
+    SELECT s.updated_at AS computed_at, l.*
+    FROM rollup_state s
+    LEFT JOIN leaderboard l ON l.user_id = %s
+    WHERE s.name = %s
+'''
+
+BREAKDOWN_ORDERS = ('name', 'weakest')
+
+HISTORY_GRANULARITIES = ('day', 'week')
+HISTORY_DEFAULT_DAYS = 30
+
+LEADERBOARD_DEFAULT_SIZE = 10
+LEADERBOARD_MAX_SIZE = 100
+
 
 @stats_bp.route('/stats', methods=['GET'])
 @token_required
@@ -34,28 +121,45 @@ def get_stats():
     conn = None
     cur = None
     try:
-        conn = get_db()
+        conn = get_read_db(request.current_user)
         cur = conn.cursor()
+        versions = get_data_versions(cur)
+        etag = user_etag('stats', request.current_user, versions['catalog'], versions['today'])
+        unchanged = not_modified(etag)
+        if unchanged:
+            cur.close()
+            return unchanged
+        streak_cur = conn.cursor()
+
+        # Both queries go out in one round trip on psycopg3
+        with pipeline(conn):
+            # Optimized: Single query with CTE to get all stats at once
+            cur.execute('''
+                WITH active_questions AS (
+                    SELECT q.id
+                    FROM questions q
+                    JOIN question_sets qs ON q.set_id = qs.id
+                    WHERE qs.is_deleted = false
+                )
+                SELECT
+                    COUNT(DISTINCT aq.id) as total_questions,
+                    COUNT(DISTINCT up.id) FILTER (WHERE up.attempted = true) as attempted,
+                    COUNT(DISTINCT up.id) FILTER (WHERE up.correct = true) as correct,
+                    COUNT(DISTINCT mq.id) as missed,
+                    COUNT(DISTINCT b.id) as bookmarks
+                FROM active_questions aq
+                LEFT JOIN user_progress up ON aq.id = up.question_id AND up.user_id = %s
+                LEFT JOIN missed_questions mq ON aq.id = mq.question_id AND mq.user_id = %s
+                LEFT JOIN bookmarks b ON aq.id = b.question_id AND b.user_id = %s
+            ''', (request.current_user['id'], request.current_user['id'], request.current_user['id']))
 
-        # Optimized: Single query with CTE to get all stats at once
-        cur.execute('''
-            WITH active_questions AS (
-                SELECT q.id
-                FROM questions q
-                JOIN question_sets qs ON q.set_id = qs.id
-                WHERE qs.is_deleted = false
-            )
-            SELECT
-                COUNT(DISTINCT aq.id) as total_questions,
-                COUNT(DISTINCT up.id) FILTER (WHERE up.attempted = true) as attempted,
-                COUNT(DISTINCT up.id) FILTER (WHERE up.correct = true) as correct,
-                COUNT(DISTINCT mq.id) as missed,
-                COUNT(DISTINCT b.id) as bookmarks
-            FROM active_questions aq
-            LEFT JOIN user_progress up ON aq.id = up.question_id AND up.user_id = %s
-            LEFT JOIN missed_questions mq ON aq.id = mq.question_id AND mq.user_id = %s
-            LEFT JOIN bookmarks b ON aq.id = b.question_id AND b.user_id = %s
-        ''', (request.current_user['id'], request.current_user['id'], request.current_user['id']))
+            # Activity dates for the daily streak
+            streak_cur.execute('''
+                SELECT activity_date
+                FROM daily_activity
+                WHERE user_id = %s
+                ORDER BY activity_date DESC
+            ''', (request.current_user['id'],))
 
         stats = cur.fetchone()
         total_questions = stats['total_questions']
@@ -65,17 +169,13 @@ def get_stats():
         bookmarks = stats['bookmarks']
 
         # Calculate daily streak
-        cur.execute('''
-            SELECT activity_date
-            FROM daily_activity
-            WHERE user_id = %s
-            ORDER BY activity_date DESC
-        ''', (request.current_user['id'],))
-        activity_dates = [row['activity_date'] for row in cur.fetchall()]
+        activity_dates = [row['activity_date'] for row in streak_cur.fetchall()]
+        streak_cur.close()
 
         streak = 0
         if activity_dates:
-            current_date = datetime.now().date()
+            # Activity dates are the database's CURRENT_DATE
+            current_date = versions['today']
             # Check if user practiced today or yesterday (to keep streak alive)
             if activity_dates[0] == current_date or activity_dates[0] == current_date - timedelta(days=1):
                 streak = 1
@@ -91,7 +191,7 @@ def get_stats():
         if cur:
             cur.close()
 
-        return jsonify({
+        return with_etag(jsonify({
             'total_questions': total_questions,
             'attempted': attempted,
             'correct': correct,
@@ -99,7 +199,7 @@ def get_stats():
             'bookmarks': bookmarks,
             'accuracy': round((correct / attempted * 100) if attempted > 0 else 0, 1),
             'streak': streak
-        })
+        }), etag)
     except Exception as e:
         logger.error(f"Error fetching stats: {str(e)}")
         if conn:
@@ -110,6 +210,247 @@ def get_stats():
             return_db(conn)
 
 
+@stats_bp.route('/stats/history', methods=['GET'])
+@token_required
+def get_stats_history():
+    """
+    Get answers over time for charting.
+
+    Query params:
+        from (str, optional): First day, YYYY-MM-DD (default: 29 days before `to`)
+        to (str, optional): Last day, YYYY-MM-DD (default: today)
+        granularity (str, optional): 'day' (default) or 'week' (weeks start on Monday)
+
+    Returns:
+        JSON response with `history`, one entry per period with activity:
+        - date: First day of the period
+        - attempted: Answers given
+        - correct: Correct answers, or null for answers given before
+          correctness was recorded per answer
+        - accuracy: Percentage correct among answers with known correctness
+    """
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in HISTORY_GRANULARITIES:
+        return jsonify({'error': "granularity must be 'day' or 'week'"}), 400
+    try:
+        to_date = date.fromisoformat(request.args['to']) if 'to' in request.args else None
+        from_date = date.fromisoformat(request.args['from']) if 'from' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates in YYYY-MM-DD format'}), 400
+
+    conn = None
+    try:
+        conn = get_read_db(request.current_user)
+        user_id = request.current_user['id']
+        cur = conn.cursor()
+        cur.execute(HISTORY_VERSIONS_QUERY, (ROLLUP_NAME, user_id))
+        versions = cur.fetchone()
+        # The range defaults to the last days up to today
+        to_date = to_date or versions['today']
+        from_date = from_date or to_date - timedelta(days=HISTORY_DEFAULT_DAYS - 1)
+        if from_date > to_date:
+            cur.close()
+            return jsonify({'error': 'from must not be after to'}), 400
+
+        etag = user_etag('stats-history', request.current_user, versions['today'], versions['pending_event_id'])
+        unchanged = not_modified(etag)
+        if unchanged:
+            cur.close()
+            return unchanged
+        cur.execute(HISTORY_QUERY, (
+            user_id, from_date, to_date,
+            ROLLUP_NAME, user_id, from_date, to_date,
+            granularity
+        ))
+        rows = cur.fetchall()
+        cur.close()
+
+        history = []
+        for row in rows:
+            tracked = row['tracked']
+            history.append({
+                'date': row['period'].isoformat(),
+                'attempted': tracked + row['legacy_attempted'],
+                'correct': row['correct'] if tracked else None,
+                'accuracy': round(row['correct'] / tracked * 100, 1) if tracked else None,
+            })
+
+        return with_etag(jsonify({
+            'from': from_date.isoformat(),
+            'to': to_date.isoformat(),
+            'granularity': granularity,
+            'history': history
+        }), etag)
+    except Exception as e:
+        logger.error(f"Error fetching stats history: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            return_db(conn)
+
+
+def _accuracy(correct, attempted):
+    return round(correct / attempted * 100, 1) if attempted else 0
+
+
+@stats_bp.route('/stats/breakdown', methods=['GET'])
+@token_required
+def get_stats_breakdown():
+    """
+    Get accuracy per question set and per round.
+
+    Reads the precomputed user_set_round_stats rows of the user, so the
+    cost grows with the number of rounds practiced, not with progress rows.
+
+    Query params:
+        order (str, optional): 'name' (default) sorts sets by name and rounds
+            by round; 'weakest' sorts sets and rounds by accuracy, lowest first
+        min_attempted (int, optional): With order=weakest, sets and rounds with
+            fewer attempted questions go last (default: 3)
+
+    Returns:
+        JSON response with `sets`, each with set_id, set_name, attempted,
+        correct, accuracy and `rounds` (round_no, attempted, correct, accuracy;
+        round_no is null for questions without a round)
+    """
+    order = request.args.get('order', 'name')
+    if order not in BREAKDOWN_ORDERS:
+        return jsonify({'error': "order must be 'name' or 'weakest'"}), 400
+    min_attempted = request.args.get('min_attempted', 3, type=int)
+
+    conn = None
+    try:
+        conn = get_read_db(request.current_user)
+        cur = conn.cursor()
+        etag = user_etag('stats-breakdown', request.current_user, get_data_versions(cur)['catalog'])
+        unchanged = not_modified(etag)
+        if unchanged:
+            cur.close()
+            return unchanged
+
+        cur.execute(BREAKDOWN_QUERY, (request.current_user['id'],))
+        rows = cur.fetchall()
+        cur.close()
+
+        sets = {}
+        for row in rows:
+            question_set = sets.setdefault(row['set_id'], {
+                'set_id': row['set_id'],
+                'set_name': row['set_name'],
+                'attempted': 0,
+                'correct': 0,
+                'rounds': []
+            })
+            question_set['attempted'] += row['attempted']
+            question_set['correct'] += row['correct']
+            question_set['rounds'].append({
+                'round_no': row['round_no'] or None,
+                'attempted': row['attempted'],
+                'correct': row['correct'],
+                'accuracy': _accuracy(row['correct'], row['attempted'])
+            })
+
+        breakdown = list(sets.values())
+        for question_set in breakdown:
+            question_set['accuracy'] = _accuracy(question_set['correct'], question_set['attempted'])
+
+        if order == 'weakest':
+            def weakest_first(area):
+                # Small samples last, then lowest accuracy, then larger samples first
+                return (area['attempted'] < min_attempted, area['accuracy'], -area['attempted'])
+            breakdown.sort(key=weakest_first)
+            for question_set in breakdown:
+                question_set['rounds'].sort(key=weakest_first)
+        else:
+            breakdown.sort(key=lambda item: item['set_name'].lower())
+            for question_set in breakdown:
+                question_set['rounds'].sort(key=lambda item: item['round_no'] or '')
+
+        return with_etag(jsonify({'sets': breakdown}), etag)
+    except Exception as e:
+        logger.error(f"Error fetching stats breakdown: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            return_db(conn)
+
+
+@stats_bp.route('/leaderboard', methods=['GET'])
+@token_required
+def get_leaderboard():
+    """
+    Get the top users of a leaderboard and the caller's own position.
+
+    Served from the snapshot built by services/leaderboard.py, so results
+    can be a few minutes old.
+
+    Query params:
+        board (str, optional): 'streak' (default), 'week' (questions
+            practiced since Monday) or 'accuracy'
+        limit (int, optional): Number of top entries (default: 10, max: 100)
+
+    Returns:
+        JSON response with:
+        - board: The board requested
+        - computed_at: When the snapshot was built (null before the first build)
+        - top: Entries with rank, username, streak, practiced_week and accuracy
+        - me: The caller's rank, streak, practiced_week, attempted and
+          accuracy, or null if they have no activity yet; rank is null when
+          not on this board
+    """
+    board = request.args.get('board', 'streak')
+    if board not in LEADERBOARD_BOARDS:
+        return jsonify({'error': f"board must be one of: {', '.join(LEADERBOARD_BOARDS)}"}), 400
+    limit = request.args.get('limit', LEADERBOARD_DEFAULT_SIZE, type=int)
+    if not 1 <= limit <= LEADERBOARD_MAX_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {LEADERBOARD_MAX_SIZE}'}), 400
+    rank_column = LEADERBOARD_BOARDS[board]
+
+    conn = None
+    try:
+        conn = get_read_db(request.current_user)
+        top_cur = conn.cursor()
+        # Built from the snapshot alone: changes only when it is rebuilt
+        etag = make_etag('leaderboard', request.current_user['id'], get_data_versions(top_cur)['leaderboard'])
+        unchanged = not_modified(etag)
+        if unchanged:
+            top_cur.close()
+            return unchanged
+        me_cur = conn.cursor()
+
+        with pipeline(conn):
+            top_cur.execute(LEADERBOARD_TOP_QUERY.format(rank_column=rank_column), (limit,))
+            me_cur.execute(LEADERBOARD_ME_QUERY, (request.current_user['id'], LEADERBOARD_NAME))
+
+        top = top_cur.fetchall()
+        state = me_cur.fetchone()
+        top_cur.close()
+        me_cur.close()
+
+        me = None
+        if state and state['user_id'] is not None:
+            me = {
+                'rank': state[rank_column],
+                'streak': state['streak'],
+                'practiced_week': state['practiced_week'],
+                'attempted': state['attempted'],
+                'accuracy': state['accuracy'],
+            }
+
+        return with_etag(jsonify({
+            'board': board,
+            'computed_at': state['computed_at'].isoformat() if state else None,
+            'top': top,
+            'me': me
+        }), etag)
+    except Exception as e:
+        logger.error(f"Error fetching leaderboard: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            return_db(conn)
+
+
 @stats_bp.route('/missed-questions', methods=['GET'])
 @token_required
 def get_missed_questions():
@@ -121,21 +462,18 @@ def get_missed_questions():
     """
     conn = None
     try:
-        conn = get_db()
+        conn = get_read_db(request.current_user)
         cur = conn.cursor()
-        cur.execute('''
-            SELECT q.*, mq.added_at, qs.name as set_name
-            FROM missed_questions mq
-            JOIN questions q ON mq.question_id = q.id
-            JOIN question_sets qs ON q.set_id = qs.id
-            WHERE mq.user_id = %s
-            AND mq.exported_to_anki = false
-            AND qs.is_deleted = false
-            ORDER BY mq.added_at DESC
-        ''', (request.current_user['id'],))
+        etag = user_etag('missed-questions', request.current_user, get_data_versions(cur)['catalog'])
+        unchanged = not_modified(etag)
+        if unchanged:
+            cur.close()
+            return unchanged
+
+        cur.execute(MISSED_QUESTIONS_QUERY, (request.current_user['id'],))
         questions = cur.fetchall()
         cur.close()
-        return jsonify({'missed_questions': questions})
+        return with_etag(jsonify({'missed_questions': questions}), etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -1,12 +1,38 @@
 """Business logic services for the Quiz App backend"""
-from .database import get_db, return_db, cleanup_connection_pool
+from .database import (
+    get_db,
+    get_primary_db,
+    get_read_db,
+    return_db,
+    shared_connection,
+    mark_user_write,
+    commit_user_write,
+    pipeline,
+    tuple_cursor,
+    server_cursor,
+    fetch_rows,
+    Rows,
+    cleanup_connection_pool,
+    DB_ERRORS,
+)
 from .tsv_parser import parse_and_save_set, count_valid_questions
 
 __all__ = [
     # Database
     'get_db',
+    'get_primary_db',
+    'get_read_db',
     'return_db',
+    'shared_connection',
+    'mark_user_write',
+    'commit_user_write',
+    'pipeline',
+    'tuple_cursor',
+    'server_cursor',
+    'fetch_rows',
+    'Rows',
     'cleanup_connection_pool',
+    'DB_ERRORS',
     # TSV Parser
     'parse_and_save_set',
     'count_valid_questions',
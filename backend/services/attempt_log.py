@@ -0,0 +1,130 @@
+"""
+Attempt Event Log
+
+Every answer is appended to attempt_events. services/rollup.py later folds
+the events into per-day aggregates and, for events recorded in 'events'
+mode, into user_progress and daily_activity.
+
+In 'direct' mode (PROGRESS_WRITE_MODE) update_progress writes the event in
+its own transaction with append_attempt_event(). In 'events' mode the event
+is buffered in memory by record_attempt() and written with one multi-row
+INSERT per ATTEMPT_EVENT_BATCH_SIZE events or every
+ATTEMPT_EVENT_FLUSH_SECONDS, so answering never updates a hot row in place.
+Buffered events are lost if the process is killed before a flush.
+
+Writers hold a shared advisory lock while inserting events; the rollup
+briefly takes it exclusively to find an id below which every event has
+committed (ids are assigned before commit, so they commit out of order).
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+
+from config import ATTEMPT_EVENT_BATCH_SIZE, ATTEMPT_EVENT_BUFFER_LIMIT
+from services.database import get_db, return_db, DB_ERRORS
+
+logger = logging.getLogger(__name__)
+
+ATTEMPT_EVENTS_LOCK_ID = 72_611_003  # Arbitrary key for pg_advisory_xact_lock(_shared)
+
+# Multi-row insert from parallel arrays: one statement whatever the batch size.
+# Times are sent in UTC and stored in the database's time zone, like
+# CURRENT_TIMESTAMP in direct mode, so both modes bucket days the same way.
+INSERT_EVENTS_QUERY = '''
+    INSERT INTO attempt_events (user_id, question_id, attempted, correct, recorded_at)
+    SELECT * FROM unnest(%s::integer[], %s::integer[], %s::boolean[], %s::boolean[], %s::timestamptz[])
+'''
+
+# Events waiting to be written, as (user_id, question_id, attempted, correct, recorded_at)
+_buffer = []
+_buffer_lock = threading.Lock()
+# Serializes flushes so events are inserted in the order they were recorded
+_flush_lock = threading.Lock()
+
+
+def append_attempt_event(cur, user_id, question_id, attempted, correct, applied=True):
+    """
+    Append one event inside the caller's transaction.
+
+    Args:
+        cur: Cursor on the connection performing the write
+        user_id (int): ID of the user who answered
+        question_id (int): ID of the question answered
+        attempted (bool): Whether the question was attempted
+        correct (bool): Whether the answer was correct (None if not marked)
+        applied (bool): True if the caller also updated user_progress and
+            daily_activity, so the rollup only folds it into aggregates
+    """
+    cur.execute('SELECT pg_advisory_xact_lock_shared(%s)', (ATTEMPT_EVENTS_LOCK_ID,))
+    cur.execute('''
+        INSERT INTO attempt_events (user_id, question_id, attempted, correct, applied)
+        VALUES (%s, %s, %s, %s, %s)
+    ''', (user_id, question_id, attempted, correct, applied))
+
+
+def record_attempt(user_id, question_id, attempted, correct):
+    """
+    Buffer an event for a batched insert ('events' mode).
+
+    Flushes in the calling thread once ATTEMPT_EVENT_BATCH_SIZE events are
+    waiting; otherwise the periodic flush writes it.
+
+    Args:
+        user_id (int): ID of the user who answered
+        question_id (int): ID of the question answered
+        attempted (bool): Whether the question was attempted
+        correct (bool): Whether the answer was correct (None if not marked)
+    """
+    with _buffer_lock:
+        _buffer.append((user_id, question_id, attempted, correct, datetime.now(timezone.utc)))
+        full = len(_buffer) >= ATTEMPT_EVENT_BATCH_SIZE
+    if full:
+        flush_attempt_events()
+
+
+def flush_attempt_events():
+    """
+    Write all buffered events, ATTEMPT_EVENT_BATCH_SIZE rows per INSERT.
+
+    If the database is unavailable the events go back to the buffer (up to
+    ATTEMPT_EVENT_BUFFER_LIMIT; beyond that the oldest are dropped).
+
+    Returns:
+        int: Number of events written
+    """
+    with _flush_lock:
+        with _buffer_lock:
+            events = _buffer[:]
+            _buffer.clear()
+        if not events:
+            return 0
+
+        written = 0
+        conn = None
+        try:
+            conn = get_db()
+            cur = conn.cursor()
+            for start in range(0, len(events), ATTEMPT_EVENT_BATCH_SIZE):
+                batch = events[start:start + ATTEMPT_EVENT_BATCH_SIZE]
+                cur.execute('SELECT pg_advisory_xact_lock_shared(%s)', (ATTEMPT_EVENTS_LOCK_ID,))
+                cur.execute(INSERT_EVENTS_QUERY, [list(column) for column in zip(*batch)])
+                conn.commit()
+                written += len(batch)
+            cur.close()
+        except DB_ERRORS as e:
+            logger.error(f"Failed to write {len(events) - written} attempt event(s): {str(e)}")
+            _requeue(events[written:])
+        finally:
+            if conn:
+                return_db(conn)
+        return written
+
+
+def _requeue(events):
+    """Put unwritten events back at the front of the buffer."""
+    with _buffer_lock:
+        _buffer[:0] = events
+        overflow = len(_buffer) - ATTEMPT_EVENT_BUFFER_LIMIT
+        if overflow > 0:
+            del _buffer[:overflow]
+            logger.error(f"Attempt event buffer full, dropped {overflow} oldest event(s)")
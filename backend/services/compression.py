@@ -0,0 +1,249 @@
+"""
+Response Compression
+
+JSON responses are compressed with the best encoding the client accepts
+(zstd, then brotli, then gzip) once they reach COMPRESSION_MIN_BYTES.
+
+- compress_response() runs after every request and compresses the body at
+  the COMPRESSION_*_LEVEL levels, which favour speed.
+- compress_cached() is for bodies that are identical for every request
+  with the same key (immutable set content, the public catalog): each
+  encoding is compressed once more at the maximum level on a background
+  thread, and that variant is kept (in the shared store when enabled, else
+  in a per-process LRU bounded by COMPRESSION_CACHE_BYTES). Until it is
+  ready, requests get the body compressed at the per-request level, so a
+  large body never stalls a request for a slow maximum-level compression.
+  For MessagePack clients the body is re-encoded once per key and kept
+  the same way, rather than decoded and packed again on every request.
+
+Compressed responses carry a weak ETag: the bytes differ per encoding,
+but the representation is the same, and If-None-Match compares weakly.
+
+brotli and zstandard are optional; without them only gzip is offered.
+"""
+import gzip
+import logging
+import queue
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+from config import (
+    COMPRESSION_MIN_BYTES,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_LEVEL,
+    COMPRESSION_ZSTD_LEVEL,
+    COMPRESSION_CACHE_BYTES,
+)
+from services.json_provider import JSON_MIMETYPE, MSGPACK_MIMETYPE, json_to_msgpack, wants_msgpack
+from services.shared_store import shared_store_enabled, get_payload, put_payload
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'application/msgpack', 'text/plain', 'text/html', 'text/csv',
+}
+
+
+def _gzip(data, level):
+    # mtime=0: the same input always compresses to the same bytes
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data, level):
+    return brotli.compress(data, quality=level, mode=brotli.MODE_TEXT)
+
+
+def _zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# encoding -> (compress function, per-request level, level for cached variants),
+# in order of preference
+_CODECS = OrderedDict()
+if zstandard is not None:
+    _CODECS['zstd'] = (_zstd, COMPRESSION_ZSTD_LEVEL, 19)
+if brotli is not None:
+    _CODECS['br'] = (_brotli, COMPRESSION_BROTLI_LEVEL, 11)
+_CODECS['gzip'] = (_gzip, COMPRESSION_GZIP_LEVEL, 9)
+
+ENCODINGS = list(_CODECS)
+
+# '<key>:<encoding>' -> compressed body and '<key>:msgpack' -> MessagePack
+# body, least recently used first
+_variants = OrderedDict()
+_variants_bytes = 0
+_variants_lock = threading.Lock()
+
+# Cached variants waiting for their maximum-level compression: jobs are
+# (variant key, encoding, body, generation), one per key at a time
+_recompress_queue = queue.Queue()
+_recompress_pending = set()
+_recompress_lock = threading.Lock()
+_recompress_thread = None
+
+
+def negotiate_encoding(response):
+    """
+    Pick the encoding to send a response with.
+
+    Args:
+        response (flask.Response): Complete, not yet encoded response
+
+    Returns:
+        str: Content-Encoding to apply, or None to send the body as-is
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return None
+    # Caches must keep compressed and uncompressed variants apart
+    response.vary.add('Accept-Encoding')
+    if (response.content_length or 0) < COMPRESSION_MIN_BYTES:
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def _encode(response, encoding, body):
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def compress_response(response):
+    """
+    Compress a response for the client (after_request hook).
+
+    Args:
+        response (flask.Response): Response to send
+
+    Returns:
+        flask.Response: The same response, compressed if worthwhile
+    """
+    encoding = negotiate_encoding(response)
+    if encoding is None:
+        return response
+    compress, level, _ = _CODECS[encoding]
+    return _encode(response, encoding, compress(response.get_data(), level))
+
+
+def _get_local(key):
+    with _variants_lock:
+        body = _variants.get(key)
+        if body is not None:
+            _variants.move_to_end(key)
+        return body
+
+
+def _put_local(key, body):
+    global _variants_bytes
+    if len(body) > COMPRESSION_CACHE_BYTES:
+        return
+    with _variants_lock:
+        previous = _variants.pop(key, None)
+        if previous is not None:
+            _variants_bytes -= len(previous)
+        _variants[key] = body
+        _variants_bytes += len(body)
+        while _variants_bytes > COMPRESSION_CACHE_BYTES:
+            _, evicted = _variants.popitem(last=False)
+            _variants_bytes -= len(evicted)
+
+
+def _get_variant(key):
+    return get_payload(key) if shared_store_enabled() else _get_local(key)
+
+
+def _put_variant(key, body, generation):
+    if shared_store_enabled():
+        put_payload(key, body, generation)
+    else:
+        _put_local(key, body)
+
+
+def _msgpack_variant(response, key, generation):
+    """Send a cacheable JSON body as MessagePack, re-encoding it once per key."""
+    body = _get_variant(key)
+    if body is None:
+        body = json_to_msgpack(response.get_data())
+        _put_variant(key, body, generation)
+    response.set_data(bytes(body))
+    response.mimetype = MSGPACK_MIMETYPE
+    # Caches must keep JSON and MessagePack variants apart
+    response.vary.add('Accept')
+    return response
+
+
+def compress_cached(response, key, generation=None):
+    """
+    Compress a cacheable response, reusing the stored variant if any.
+
+    Args:
+        response (flask.Response): Response whose body is fully determined by key
+        key (str): Cache key of the body; include every version it depends on
+        generation (int, optional): Shared store generation the key belongs to
+
+    Returns:
+        flask.Response: The same response, compressed if worthwhile
+    """
+    # Re-encode for MessagePack clients first: after compression it is too late
+    if response.mimetype == JSON_MIMETYPE and not response.direct_passthrough and wants_msgpack():
+        key = f'{key}:msgpack'
+        response = _msgpack_variant(response, key, generation)
+    encoding = negotiate_encoding(response)
+    if encoding is None:
+        return response
+
+    compress, level, _ = _CODECS[encoding]
+    variant_key = f'{key}:{encoding}'
+    body = _get_variant(variant_key)
+    if body is None:
+        data = response.get_data()
+        body = compress(data, level)
+        _schedule_recompress(variant_key, encoding, data, generation)
+    # WSGI servers expect bytes (shared store payloads are memoryviews)
+    return _encode(response, encoding, bytes(body))
+
+
+def _schedule_recompress(variant_key, encoding, data, generation):
+    """Queue a body for compression at the maximum level, unless it already is."""
+    global _recompress_thread
+    if not shared_store_enabled() and COMPRESSION_CACHE_BYTES <= 0:
+        return
+    with _recompress_lock:
+        if variant_key in _recompress_pending:
+            return
+        _recompress_pending.add(variant_key)
+        if _recompress_thread is None:
+            _recompress_thread = threading.Thread(target=_recompress_loop, name='recompress', daemon=True)
+            _recompress_thread.start()
+    _recompress_queue.put((variant_key, encoding, data, generation))
+
+
+def _recompress_loop():
+    """Compress queued bodies at the maximum level and keep the variants."""
+    while True:
+        variant_key, encoding, data, generation = _recompress_queue.get()
+        try:
+            compress, _, level = _CODECS[encoding]
+            # Another worker may have stored it in the meantime
+            if not shared_store_enabled() or get_payload(variant_key) is None:
+                _put_variant(variant_key, compress(data, level), generation)
+        except Exception as e:
+            logger.error(f"Failed to recompress {variant_key}: {str(e)}")
+        finally:
+            with _recompress_lock:
+                _recompress_pending.discard(variant_key)
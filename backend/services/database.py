@@ -1,66 +1,462 @@
 """Database connection management"""
+import contextvars
+import itertools
 import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
 
-from config import DATABASE_URL, DB_POOL_MIN_CONN, DB_POOL_MAX_CONN
+from config import (
+    DATABASE_URL,
+    DATABASE_REPLICA_URLS,
+    DB_POOL_MIN_CONN,
+    DB_POOL_MAX_CONN,
+    DB_BACKEND,
+    DB_PREPARE_THRESHOLD,
+    REPLICA_MAX_LAG_SECONDS,
+    REPLICA_LAG_CHECK_INTERVAL,
+)
 
 logger = logging.getLogger(__name__)
 
-# Global connection pool
-connection_pool = None
+USING_PSYCOPG3 = DB_BACKEND == 'psycopg3'
 
-try:
-    connection_pool = psycopg2.pool.ThreadedConnectionPool(
+# Exceptions raised by the active driver, for use in `except` clauses
+if USING_PSYCOPG3:
+    import psycopg
+    DB_ERRORS = (psycopg2.Error, psycopg.Error)
+else:
+    DB_ERRORS = (psycopg2.Error,)
+
+
+class Psycopg3ConnectionPool:
+    """
+    psycopg 3 connection pool exposing the psycopg2 pool interface.
+
+    Connections return rows as dicts (like RealDictCursor) and prepare
+    frequently executed queries server-side, so Postgres skips parsing and
+    planning on repeat calls.
+    """
+
+    def __init__(self, minconn, maxconn, dsn, prepare_threshold):
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+
+        self._pool = ConnectionPool(
+            conninfo=dsn,
+            min_size=minconn,
+            max_size=maxconn,
+            kwargs={'row_factory': dict_row, 'prepare_threshold': prepare_threshold},
+            open=True
+        )
+
+    def getconn(self):
+        return self._pool.getconn()
+
+    def putconn(self, conn):
+        self._pool.putconn(conn)
+
+    def closeall(self):
+        self._pool.close()
+
+
+class Replica:
+    """
+    A read replica with its own pool and last observed replication state.
+
+    Attributes:
+        name (str): Label used in logs (DSNs contain credentials)
+        pool: Connection pool for this replica
+        replayed_through (datetime): Primary commit time the replica had replayed
+            up to when last probed (None until the first successful probe)
+        replayed_lsn (int): WAL position (bytes) the replica had replayed at
+            the last probe, for read-your-writes (None until probed)
+        lag_seconds (float): Replication lag at the last probe
+        checked_at (float): time.monotonic() of the last probe
+    """
+
+    def __init__(self, name, pool_):
+        self.name = name
+        self.pool = pool_
+        self.replayed_through = None
+        self.replayed_lsn = None
+        self.lag_seconds = float('inf')
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+def _create_pool(dsn):
+    """Create a connection pool for the configured driver."""
+    if USING_PSYCOPG3:
+        return Psycopg3ConnectionPool(
+            minconn=DB_POOL_MIN_CONN,
+            maxconn=DB_POOL_MAX_CONN,
+            dsn=dsn,
+            prepare_threshold=DB_PREPARE_THRESHOLD
+        )
+    return psycopg2.pool.ThreadedConnectionPool(
         minconn=DB_POOL_MIN_CONN,
         maxconn=DB_POOL_MAX_CONN,
-        dsn=DATABASE_URL
+        dsn=dsn
     )
-    logger.info("Database connection pool created successfully")
+
+
+# Global connection pool
+connection_pool = None
+
+try:
+    connection_pool = _create_pool(DATABASE_URL)
+    logger.info(f"Database connection pool created successfully ({DB_BACKEND})")
 except Exception as e:
     logger.error(f"Failed to create connection pool: {str(e)}")
     raise
 
+# Read replica pools (empty when DATABASE_REPLICA_URLS is not set)
+replicas = []
+for _index, _replica_url in enumerate(DATABASE_REPLICA_URLS):
+    try:
+        replicas.append(Replica(f"replica-{_index}", _create_pool(_replica_url)))
+        logger.info(f"Read replica pool replica-{_index} created successfully")
+    except Exception as e:
+        # A missing replica only costs capacity; reads fall back to the primary
+        logger.error(f"Failed to create pool for replica-{_index}: {str(e)}")
+
+# Connections handed out by get_read_db(), mapped to the pool they came from
+_read_connections = {}
+_read_connections_lock = threading.Lock()
+_next_replica = 0
+_next_replica_lock = threading.Lock()
+
+# (connection, snapshot) handed out by get_db() and get_read_db() inside shared_connection()
+_shared_connection = contextvars.ContextVar('shared_connection', default=None)
+
 
 def get_db():
     """
     Get database connection from pool.
 
     Returns:
-        connection: PostgreSQL connection with RealDictCursor factory
+        connection: PostgreSQL connection whose cursors return dict rows
+    """
+    shared = _shared_connection.get()
+    if shared is not None:
+        return shared[0]
+    return get_primary_db()
+
+
+def get_primary_db():
+    """
+    Get a connection to the primary, even inside shared_connection().
+
+    For reads whose result outlives the request (e.g. payloads put in the
+    shared store), which must not come from a lagging replica or from a
+    batch's snapshot.
+
+    Returns:
+        connection: PostgreSQL connection with dict rows; release with return_db()
     """
     try:
         conn = connection_pool.getconn()
-        # Set cursor factory for this connection
-        conn.cursor_factory = RealDictCursor
+        if not USING_PSYCOPG3:
+            # Set cursor factory for this connection
+            conn.cursor_factory = RealDictCursor
         return conn
     except Exception as e:
         logger.error(f"Failed to get database connection: {str(e)}")
         raise
 
 
+def get_read_db(user=None):
+    """
+    Get a read-only database connection, preferring a read replica.
+
+    A replica is used only if its replication lag is within
+    REPLICA_MAX_LAG_SECONDS and it has replayed the WAL of the user's latest
+    write (users.last_write_lsn), so users always read their own writes. Otherwise
+    the primary is used. Either way the transaction runs as READ ONLY.
+
+    Args:
+        user (dict, optional): Authenticated user row (request.current_user);
+            None for guest requests
+
+    Returns:
+        connection: PostgreSQL connection with dict rows; release with return_db()
+    """
+    global _next_replica
+    shared = _shared_connection.get()
+    if shared is not None:
+        return shared[0]
+    last_write_lsn = user.get('last_write_lsn') if user else None
+
+    if replicas:
+        with _next_replica_lock:
+            start = _next_replica
+            _next_replica = (start + 1) % len(replicas)
+        for offset in range(len(replicas)):
+            replica = replicas[(start + offset) % len(replicas)]
+            if not _replica_is_fresh(replica, last_write_lsn):
+                continue
+            try:
+                conn = replica.pool.getconn()
+            except Exception as e:
+                logger.warning(f"Could not get connection from {replica.name}: {str(e)}")
+                continue
+            return _checkout_read_connection(conn, replica.pool)
+
+    return _checkout_read_connection(get_db(), connection_pool)
+
+
+def _checkout_read_connection(conn, pool_):
+    """Put a connection in read-only mode and remember which pool owns it."""
+    if not USING_PSYCOPG3:
+        conn.cursor_factory = RealDictCursor
+    _set_read_only(conn, True)
+    with _read_connections_lock:
+        _read_connections[id(conn)] = pool_
+    return conn
+
+
+def _set_read_only(conn, read_only):
+    """Make new transactions start with BEGIN READ ONLY (no extra round trip)."""
+    if USING_PSYCOPG3:
+        conn.read_only = read_only
+    else:
+        conn.set_session(readonly=read_only)
+
+
+def _set_repeatable_read(conn, repeatable_read):
+    """Make new transactions REPEATABLE READ (one snapshot) or the server default."""
+    if USING_PSYCOPG3:
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ if repeatable_read else None
+    else:
+        conn.set_session(isolation_level='REPEATABLE READ' if repeatable_read else 'DEFAULT')
+
+
+@contextmanager
+def shared_connection(user=None, snapshot=False):
+    """
+    Serve every get_db() and get_read_db() in the block from one connection.
+
+    For running several read-only handlers in one request (/api/batch).
+    The connection comes from get_read_db(), so writes fail. return_db()
+    ends a handler's transaction but keeps the connection, which goes back
+    to the pool when the block exits.
+
+    Args:
+        user (dict, optional): Authenticated user, as for get_read_db()
+        snapshot (bool): Run the whole block in one REPEATABLE READ
+            transaction, so every handler sees the same data
+
+    Yields:
+        connection: The shared connection
+    """
+    conn = get_read_db(user)
+    token = None
+    try:
+        if snapshot:
+            _set_repeatable_read(conn, True)
+        token = _shared_connection.set((conn, snapshot))
+        yield conn
+    finally:
+        if token is not None:
+            _shared_connection.reset(token)
+        try:
+            if snapshot and not conn.closed:
+                conn.rollback()
+                _set_repeatable_read(conn, False)
+        finally:
+            return_db(conn)
+
+
+def _replica_is_fresh(replica, last_write_lsn):
+    """
+    Check whether a replica is recent enough to serve a read.
+
+    Args:
+        replica (Replica): Replica to check (probed at most every REPLICA_LAG_CHECK_INTERVAL)
+        last_write_lsn (int): WAL position after the user's latest write, if any
+
+    Returns:
+        bool: True if the replica can serve the read
+    """
+    _probe_replica(replica)
+    if replica.replayed_through is None or replica.lag_seconds > REPLICA_MAX_LAG_SECONDS:
+        return False
+    if last_write_lsn is not None and (replica.replayed_lsn is None or replica.replayed_lsn < last_write_lsn):
+        return False
+    return True
+
+
+def _probe_replica(replica):
+    """Refresh a replica's replication state if the last probe is too old."""
+    if time.monotonic() - replica.checked_at < REPLICA_LAG_CHECK_INTERVAL:
+        return
+    # Only one request probes; others use the previous state meanwhile
+    if not replica.lock.acquire(blocking=False):
+        return
+
+    conn = None
+    try:
+        conn = replica.pool.getconn()
+        cur = conn.cursor() if USING_PSYCOPG3 else conn.cursor(cursor_factory=RealDictCursor)
+        # An idle primary produces no new WAL, so a caught-up replica counts as current
+        cur.execute('''
+            SELECT CASE
+                       WHEN NOT pg_is_in_recovery()
+                            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+                       THEN now()
+                       ELSE pg_last_xact_replay_timestamp()
+                   END AS replayed_through,
+                   now() AS probed_at,
+                   (CASE
+                        WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+                        ELSE pg_current_wal_insert_lsn()
+                    END - '0/0'::pg_lsn)::bigint AS replayed_lsn
+        ''')
+        state = cur.fetchone()
+        cur.close()
+        conn.rollback()
+
+        replica.replayed_through = state['replayed_through']
+        replica.replayed_lsn = state['replayed_lsn']
+        if state['replayed_through'] is None:
+            replica.lag_seconds = float('inf')
+        else:
+            replica.lag_seconds = (state['probed_at'] - state['replayed_through']).total_seconds()
+    except Exception as e:
+        logger.warning(f"Replication lag probe failed for {replica.name}: {str(e)}")
+        replica.replayed_through = None
+        replica.replayed_lsn = None
+        replica.lag_seconds = float('inf')
+    finally:
+        replica.checked_at = time.monotonic()
+        if conn:
+            try:
+                replica.pool.putconn(conn)
+            except Exception as e:
+                logger.error(f"Failed to return connection to {replica.name}: {str(e)}")
+        replica.lock.release()
+
+
+def mark_user_write(cur, user_id):
+    """
+    Record that a user changed data.
+
+    Bumps the user's data_version (part of the ETags of their responses,
+    see services/etags.py). Runs inside the caller's transaction, so it
+    commits with the write itself; commit that transaction with
+    commit_user_write().
+
+    Args:
+        cur: Cursor on the connection performing the write
+        user_id (int | list[int]): ID of the user whose data changed, or a
+            list of IDs for writes on behalf of several users
+    """
+    cur.execute('''
+        UPDATE users SET data_version = data_version + 1
+        WHERE id = ANY(%s)
+    ''', (_user_ids(user_id),))
+
+
+def commit_user_write(conn, user_id):
+    """
+    Commit a write and record its WAL position for read-your-writes routing.
+
+    A transaction's WAL position is only known once it has committed, so
+    it is recorded in a second, short transaction (only when replicas are
+    configured). get_read_db() skips replicas that have not replayed up
+    to users.last_write_lsn.
+
+    Args:
+        conn: Connection with the write's open transaction
+        user_id (int | list[int]): ID of the user who wrote, or a list of IDs
+    """
+    conn.commit()
+    user_ids = _user_ids(user_id)
+    if not replicas or not user_ids:
+        return
+    cur = conn.cursor()
+    # The insert position is past the commit record that was just written
+    cur.execute('''
+        UPDATE users SET last_write_lsn = (pg_current_wal_insert_lsn() - '0/0'::pg_lsn)::bigint
+        WHERE id = ANY(%s)
+    ''', (user_ids,))
+    cur.close()
+    conn.commit()
+
+
+def _user_ids(user_id):
+    return list(user_id) if isinstance(user_id, (list, tuple, set)) else [user_id]
+
+
 def return_db(conn):
     """
     Return database connection to pool.
 
-    Performs rollback before returning to ensure clean state.
+    Performs rollback before returning to ensure clean state. Connections
+    from get_read_db() go back to the pool they came from with read-only
+    mode cleared.
 
     Args:
         conn: Database connection to return
     """
+    shared = _shared_connection.get()
+    if shared is not None and conn is shared[0]:
+        # Kept for the rest of the shared_connection() block; a snapshot
+        # stays one transaction across handlers
+        if not shared[1] and not conn.closed:
+            conn.rollback()
+        return
+
     if conn:
+        with _read_connections_lock:
+            read_pool = _read_connections.pop(id(conn), None)
         try:
             # Rollback any pending transaction before returning
             if not conn.closed:
                 conn.rollback()
-            connection_pool.putconn(conn)
+                if read_pool is not None:
+                    _set_read_only(conn, False)
+            (read_pool or connection_pool).putconn(conn)
         except Exception as e:
             logger.error(f"Failed to return connection to pool: {str(e)}")
 
 
+def pipeline(conn):
+    """
+    Send the statements executed inside the block in a single round trip.
+
+    With psycopg3 this enters pipeline mode; results are available once the
+    pipeline syncs (on commit, on fetch, or when the block exits). With
+    psycopg2 it is a no-op and statements run one at a time.
+
+    Use a separate cursor per statement whose result is needed afterwards.
+
+    Usage:
+        with pipeline(conn):
+            cur.execute(...)
+            other_cur.execute(...)
+            conn.commit()
+
+    Args:
+        conn: Database connection from get_db()
+
+    Returns:
+        context manager
+    """
+    if USING_PSYCOPG3:
+        return conn.pipeline()
+    return nullcontext()
+
+
 def cleanup_connection_pool():
-    """Close connection pool on shutdown to prevent connection leaks"""
+    """Close connection pools on shutdown to prevent connection leaks"""
     global connection_pool
     if connection_pool:
         try:
@@ -68,3 +464,138 @@ def cleanup_connection_pool():
             logger.info("Database connection pool closed successfully")
         except Exception as e:
             logger.error(f"Error closing connection pool: {str(e)}")
+    for replica in replicas:
+        try:
+            replica.pool.closeall()
+        except Exception as e:
+            logger.error(f"Error closing {replica.name} pool: {str(e)}")
+
+
+class Rows:
+    """
+    Query results as plain tuples plus their column names.
+
+    Cheaper than dict rows on large reads: one tuple per row and one shared
+    column list instead of a dict with its own keys per row. Iterating yields
+    named-tuple rows (row.id, row[0], row._asdict()); the JSON provider
+    encodes a Rows as a list of objects straight from the tuples.
+
+    Attributes:
+        columns (tuple[str]): Column names, in row order
+        tuples (list[tuple]): The rows
+    """
+
+    __slots__ = ('columns', 'tuples')
+
+    def __init__(self, columns, tuples):
+        self.columns = columns
+        self.tuples = tuples
+
+    def __len__(self):
+        return len(self.tuples)
+
+    def __iter__(self):
+        return map(row_type(self.columns)._make, self.tuples)
+
+    def dicts(self):
+        """Rows as dicts, like the default cursors return."""
+        return [dict(zip(self.columns, row)) for row in self.tuples]
+
+    def by_column(self, dictionary=()):
+        """
+        Rows in column-oriented layout: one list of values per column.
+
+        Args:
+            dictionary (iterable[str]): Columns to dictionary-encode: their
+                values are replaced by indexes into a list of the distinct
+                values, in order of first appearance
+
+        Returns:
+            dict: columns (names), data (column -> values) and
+            dictionaries (column -> distinct values)
+        """
+        if self.tuples:
+            data = dict(zip(self.columns, map(list, zip(*self.tuples))))
+        else:
+            data = {column: [] for column in self.columns}
+        dictionaries = {}
+        for column in dictionary:
+            if column in data:
+                indexes = {}
+                data[column] = [indexes.setdefault(value, len(indexes)) for value in data[column]]
+                dictionaries[column] = list(indexes)
+        return {'columns': list(self.columns), 'data': data, 'dictionaries': dictionaries}
+
+
+# Column names -> named-tuple row class
+_row_types = {}
+
+
+def row_type(columns):
+    """
+    Get the row class for a column list (created once per distinct list).
+
+    Args:
+        columns (tuple[str]): Column names
+
+    Returns:
+        type: namedtuple class; columns that are not valid identifiers
+        are renamed to _<index>
+    """
+    row_class = _row_types.get(columns)
+    if row_class is None:
+        row_class = _row_types.setdefault(columns, namedtuple('Row', columns, rename=True))
+    return row_class
+
+
+def tuple_cursor(conn):
+    """
+    Open a cursor that returns rows as tuples instead of dicts.
+
+    Args:
+        conn: Database connection from get_db() or get_read_db()
+
+    Returns:
+        cursor: Cursor for fetch_rows()
+    """
+    if USING_PSYCOPG3:
+        from psycopg.rows import tuple_row
+        return conn.cursor(row_factory=tuple_row)
+    return conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+
+
+_server_cursor_ids = itertools.count(1)
+
+
+def server_cursor(conn):
+    """
+    Open a named (server-side) cursor returning tuples.
+
+    Rows stay in Postgres until fetched with fetchmany(), so large results
+    are read in batches instead of all at once. Needs an open transaction,
+    which every get_db()/get_read_db() connection starts on first use.
+
+    Args:
+        conn: Database connection from get_db() or get_read_db()
+
+    Returns:
+        cursor: Named cursor; its description is set after the first fetch
+    """
+    name = f'stream_{next(_server_cursor_ids)}'
+    if USING_PSYCOPG3:
+        from psycopg.rows import tuple_row
+        return conn.cursor(name, row_factory=tuple_row)
+    return conn.cursor(name, cursor_factory=psycopg2.extensions.cursor)
+
+
+def fetch_rows(cur):
+    """
+    Fetch the remaining rows of a tuple_cursor() query.
+
+    Args:
+        cur: Cursor from tuple_cursor() with an executed query
+
+    Returns:
+        Rows: The rows and their column names
+    """
+    return Rows(tuple(column.name for column in cur.description), cur.fetchall())
@@ -0,0 +1,122 @@
+"""
+ETags and Conditional GET
+
+Read endpoints derive a strong ETag from version counters of the data the
+response is built from, and answer If-None-Match with 304 Not Modified
+before running their queries:
+- users.data_version: the user's own data (bumped by mark_user_write)
+- data_versions 'catalog': sets created, renamed, deleted or purged
+- rollup_state: global aggregates (difficulty, leaderboard), which change
+  when a rollup or refresh runs
+- content_hash: the immutable content of a set
+
+Direct-mode answers bump the user's data_version like any other write.
+With PROGRESS_WRITE_MODE=events they bump it when the rollup applies them,
+so responses revalidate one rollup later.
+"""
+import hashlib
+
+from flask import current_app, request
+
+from services.json_provider import JSON_FORMAT_VERSION, response_mimetype
+from services.leaderboard import LEADERBOARD_NAME
+from services.rollup import ROLLUP_NAME
+
+CATALOG_VERSION = 'catalog'
+
+# Personalised responses: cache, but revalidate every time
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+PUBLIC_CACHE_CONTROL = 'public, no-cache'
+
+# Shared data versions in one round trip; today is the database's date, which
+# the day columns (daily_activity, user_daily_stats) are bucketed by.
+# Params: rollup name, leaderboard name
+DATA_VERSIONS_QUERY = f'''
+    SELECT (SELECT version FROM data_versions WHERE name = '{CATALOG_VERSION}') AS catalog,
+           (SELECT last_event_id FROM rollup_state WHERE name = %s) AS answers,
+           (SELECT updated_at FROM rollup_state WHERE name = %s) AS leaderboard,
+           CURRENT_DATE AS today
+'''
+
+
+def get_data_versions(cur):
+    """
+    Read the shared data versions.
+
+    Args:
+        cur: Cursor returning dict rows, on the connection serving the request
+
+    Returns:
+        dict: catalog, answers (last event folded by the rollup) and
+        leaderboard (time of the last snapshot) versions, and today (the
+        database's date, for responses that change at midnight)
+    """
+    cur.execute(DATA_VERSIONS_QUERY, (ROLLUP_NAME, LEADERBOARD_NAME))
+    return cur.fetchone()
+
+
+def bump_data_version(cur, name=CATALOG_VERSION):
+    """
+    Bump a shared data version inside the caller's transaction.
+
+    Run it just before committing: the row stays locked until then.
+    """
+    cur.execute('UPDATE data_versions SET version = version + 1 WHERE name = %s', (name,))
+
+
+def make_etag(*parts):
+    """
+    Build an opaque strong ETag value (unquoted) from version parts.
+
+    Args:
+        *parts: Endpoint name and the versions the response depends on
+
+    Returns:
+        str: ETag value
+    """
+    # Old ETags stop matching when the JSON encoding changes; JSON and
+    # MessagePack are different representations
+    key = '|'.join(str(part) for part in (JSON_FORMAT_VERSION, response_mimetype()) + parts)
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def user_etag(name, user, *parts):
+    """ETag of a response built from the user's own data (and parts)."""
+    return make_etag(name, user['id'], user['data_version'], *parts)
+
+
+def not_modified(etag, cache_control=PRIVATE_CACHE_CONTROL):
+    """
+    Answer a conditional GET whose representation has not changed.
+
+    Args:
+        etag (str): Current ETag of the resource
+        cache_control (str): Cache-Control of the resource
+
+    Returns:
+        flask.Response: 304 response if If-None-Match matches, else None
+    """
+    # Weak comparison: compressed responses carry the weak form of the ETag
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def with_etag(response, etag, cache_control=PRIVATE_CACHE_CONTROL):
+    """
+    Attach validators to a 200 response.
+
+    Args:
+        response (flask.Response): Response to send
+        etag (str): ETag of the resource
+        cache_control (str): Cache-Control of the resource
+
+    Returns:
+        flask.Response: The same response
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,53 @@
+"""
+Field Projection
+
+List endpoints accept `fields=a,b,c` to return only those fields of each
+item, e.g. a list screen asking for just what it renders. Each endpoint
+maps the field names it offers to SQL select-list expressions; with
+`fields` the query selects only those, so unused joins and wide text
+columns are neither read nor encoded, and the items carry only those keys.
+`id` is always included.
+"""
+
+
+def parse_fields(fields, available):
+    """
+    Validate a `fields` query parameter.
+
+    Args:
+        fields (str): Comma-separated field names, or None for every field
+        available (dict): Field name -> SQL expression, for this endpoint
+
+    Returns:
+        tuple[str]: Requested fields, `id` first and without duplicates,
+        or None if fields is None
+
+    Raises:
+        ValueError: If a field is not available
+    """
+    if fields is None:
+        return None
+    names = ['id']
+    for name in fields.split(','):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in available:
+            raise ValueError(f"Unknown field '{name}'. fields must be among: {', '.join(available)}")
+        names.append(name)
+    return tuple(names)
+
+
+def select_list(fields, available):
+    """
+    Build the SQL select list of a projection.
+
+    Args:
+        fields (tuple[str]): Fields from parse_fields()
+        available (dict): Field name -> SQL expression, for this endpoint
+
+    Returns:
+        str: Select list, one `<expression> as <field>` per field
+    """
+    # Safe to format into SQL: names were checked against available
+    return ', '.join(f'{available[name]} as {name}' for name in fields)
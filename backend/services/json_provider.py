@@ -0,0 +1,260 @@
+"""
+JSON Provider
+
+Registered as app.json, so jsonify() and every cached body go through it.
+With orjson installed, encoding runs in C; otherwise the stdlib encoder
+produces the same output.
+
+Values beyond plain JSON are encoded as Flask's default provider does:
+- datetime/date: HTTP date (RFC 822, e.g. "Mon, 19 Oct 2026 06:30:58 GMT");
+  naive datetimes (the database's TIMESTAMP columns) are taken as UTC
+- Decimal: string, keeping the database's precision
+- UUID, dataclasses: string and object
+
+Rows results (services.database.fetch_rows) encode as a list of objects
+straight from their tuples; dumps_rows() does the same for bare tuples.
+
+Clients that rank `application/msgpack` above `application/json` in Accept
+get MessagePack instead, with the same values (dates and decimals are
+strings there too, and map keys are strings as in JSON). jsonify() encodes
+it directly, and bodies spliced from encoded fragments (question lists,
+batches) are spliced from MessagePack fragments instead. Cached JSON bodies
+are re-encoded once per cache key (services/compression.py); anything else
+still built as JSON bytes is re-encoded per request by msgpack_response().
+msgpack is optional; without it every response is JSON.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+from itertools import repeat
+
+from flask import current_app, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from services.database import Rows
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Bump when the encoding of values changes: part of ETags and of the keys
+# of encoded payloads kept in caches and the shared store.
+# 1: Flask's default provider; 2: ISO 8601 dates (withdrawn);
+# 3: HTTP dates again, as in 1
+JSON_FORMAT_VERSION = 3
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+
+def _default(o):
+    """Encode values the encoder does not handle itself."""
+    if isinstance(o, Rows):
+        return _row_dicts(o.columns, o.tuples)
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _row_dicts(columns, rows):
+    # Pairing is done in C (dict(zip)); measured faster than encoding values one by one
+    return list(map(dict, map(zip, repeat(columns), rows)))
+
+
+def _json_key(key):
+    """A map key as JSON writes it (OPT_NON_STR_KEYS / the stdlib encoder)."""
+    if isinstance(key, str):
+        return key
+    if isinstance(key, bool) or key is None:
+        return json.dumps(key)
+    return str(key)
+
+
+_CONTAINERS = (dict, list, tuple)
+
+
+def _str_keys(obj):
+    """
+    Give dicts with non-string keys (e.g. overlays keyed by question ID)
+    string keys, as JSON does. Dicts that need no change are not copied.
+    """
+    if type(obj) is dict:
+        if any(type(key) is not str for key in obj):
+            return {_json_key(key): _str_keys(value) for key, value in obj.items()}
+        for value in obj.values():
+            if type(value) in _CONTAINERS:
+                return {key: _str_keys(value) for key, value in obj.items()}
+        return obj
+    if type(obj) in (list, tuple):
+        return [_str_keys(value) for value in obj]
+    return obj
+
+
+def wants_msgpack():
+    """
+    Check whether the client prefers MessagePack over JSON.
+
+    Returns:
+        bool: True if msgpack is installed and Accept ranks
+        application/msgpack above application/json
+    """
+    return (msgpack is not None and has_request_context()
+            and request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE)
+
+
+def response_mimetype():
+    """Mimetype the current request's JSON responses are sent as."""
+    return MSGPACK_MIMETYPE if wants_msgpack() else JSON_MIMETYPE
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, with byte, row and MessagePack encoders."""
+
+    default = staticmethod(_default)
+
+    def dumps_bytes(self, obj):
+        """Encode to UTF-8 bytes (compact, for cached bodies)."""
+        return json.dumps(obj, default=_default, ensure_ascii=self.ensure_ascii,
+                          sort_keys=self.sort_keys, separators=(',', ':')).encode('utf-8')
+
+    def dumps_rows(self, columns, rows):
+        """
+        Encode tuple rows as a JSON array of objects.
+
+        Args:
+            columns (list[str]): Column names, in row order
+            rows (list[tuple]): Rows from a tuple cursor
+
+        Returns:
+            bytes: The encoded array
+        """
+        return self.dumps_bytes(_row_dicts(columns, rows))
+
+    def dumps_lines(self, columns, rows):
+        """Encode tuple rows as NDJSON: one object per line."""
+        return b''.join([self.dumps_bytes(row) + b'\n' for row in _row_dicts(columns, rows)])
+
+    def dumps_msgpack(self, obj):
+        """Encode to MessagePack, with the values and keys the JSON encoding would have."""
+        return msgpack.packb(_str_keys(obj), default=_default)
+
+    def dumps_msgpack_fields(self, obj):
+        """
+        Encode a dict's key/value pairs as MessagePack, without the map header.
+
+        Args:
+            obj (dict): Fields to encode
+
+        Returns:
+            bytes: The pairs, to splice into a map after msgpack_map_header()
+        """
+        return b''.join([msgpack.packb(_json_key(key)) + self.dumps_msgpack(value) for key, value in obj.items()])
+
+    def response(self, *args, **kwargs):
+        if wants_msgpack():
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self.dumps_msgpack(obj), mimetype=MSGPACK_MIMETYPE)
+        return super().response(*args, **kwargs)
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """JSON provider backed by orjson."""
+
+    def _options(self, indent=False):
+        # Dates go through _default, which keeps Flask's HTTP date format;
+        # integer keys: e.g. overlays keyed by question ID
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=_default, option=self._options())
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if wants_msgpack():
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=_default, option=self._options(indent))
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def msgpack_map_header(length):
+    """MessagePack header of a map with `length` pairs."""
+    return msgpack.Packer().pack_map_header(length)
+
+
+def msgpack_array_header(length):
+    """MessagePack header of an array with `length` items."""
+    return msgpack.Packer().pack_array_header(length)
+
+
+def json_to_msgpack(data):
+    """
+    Re-encode a JSON document as MessagePack.
+
+    Args:
+        data (bytes): Encoded JSON
+
+    Returns:
+        bytes: The same values as MessagePack
+    """
+    # Decoded JSON has string keys and plain values only: no conversion needed
+    return msgpack.packb(current_app.json.loads(data))
+
+
+def msgpack_response(response):
+    """
+    Re-encode a JSON body as MessagePack if the client prefers it (after_request hook).
+
+    Args:
+        response (flask.Response): Response to send
+
+    Returns:
+        flask.Response: The same response
+    """
+    if msgpack is None:
+        return response
+    if (response.mimetype == JSON_MIMETYPE and not response.is_streamed and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers and wants_msgpack()):
+        response.set_data(json_to_msgpack(response.get_data()))
+        response.mimetype = MSGPACK_MIMETYPE
+    if response.status_code == 304 or response.mimetype in (JSON_MIMETYPE, MSGPACK_MIMETYPE):
+        # Caches must keep JSON and MessagePack variants apart
+        response.vary.add('Accept')
+    return response
+
+
+def init_json_provider(app):
+    """
+    Register the fastest available JSON provider on the app.
+
+    Args:
+        app (Flask): Application to configure
+    """
+    provider_class = OrjsonProvider if orjson is not None else StdlibJSONProvider
+    app.json = provider_class(app)
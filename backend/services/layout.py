@@ -0,0 +1,57 @@
+"""
+Question List Layouts
+
+Question lists are arrays of objects by default (`layout=rows`), which
+repeat every key in every question. With `layout=columns` they are sent
+column by column instead:
+
+    {"columns": ["id", "round_no", ...],
+     "data": {"id": [1, 2, ...], "round_no": [0, 0, ...], ...},
+     "dictionaries": {"round_no": [1], ...}}
+
+Columns with few distinct values (DICTIONARY_COLUMNS) are dictionary
+encoded: their data holds indexes into dictionaries[column], which lists
+each distinct value once, in order of first appearance.
+"""
+
+ROWS_LAYOUT = 'rows'
+COLUMNS_LAYOUT = 'columns'
+
+# Values accepted by the `layout` query parameter
+LAYOUTS = (ROWS_LAYOUT, COLUMNS_LAYOUT)
+
+# Repeated across the questions of a list: sent once per distinct value
+DICTIONARY_COLUMNS = ('set_id', 'set_name', 'round_no')
+
+
+def parse_layout(layout):
+    """
+    Validate a `layout` query parameter.
+
+    Args:
+        layout (str): Parameter value: None, 'rows' or 'columns'
+
+    Returns:
+        str: The layout, ROWS_LAYOUT by default
+
+    Raises:
+        ValueError: If layout is not a supported value
+    """
+    if layout is None:
+        return ROWS_LAYOUT
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of: {', '.join(LAYOUTS)}")
+    return layout
+
+
+def question_columns(rows):
+    """
+    Lay out question rows column by column.
+
+    Args:
+        rows (Rows): Questions from fetch_rows()
+
+    Returns:
+        dict: columns, data and dictionaries (see module docstring)
+    """
+    return rows.by_column(DICTIONARY_COLUMNS)
@@ -0,0 +1,175 @@
+"""
+Leaderboard Snapshot
+
+The leaderboard table holds every active user's streak, questions
+practiced this week and accuracy, with precomputed ranks. Ranking all
+users is an aggregate over daily_activity and user_set_round_stats, so it
+never runs per request: refresh_leaderboard() rebuilds the snapshot in one
+transaction (readers keep seeing the previous snapshot until it commits).
+
+A refresh is due once the snapshot is LEADERBOARD_MAX_AGE_SECONDS old or
+LEADERBOARD_REFRESH_EVENTS answers have been logged since the last one.
+rollup_state (name 'leaderboard') records when the snapshot was built and
+the last attempt event it had seen.
+
+Run from the command line (python refresh_leaderboard.py) or in-process:
+every LEADERBOARD_INTERVAL_SECONDS the app checks whether a refresh is due.
+"""
+import logging
+
+from config import LEADERBOARD_MAX_AGE_SECONDS, LEADERBOARD_REFRESH_EVENTS, LEADERBOARD_MIN_ATTEMPTED
+from services.database import get_db, return_db, DB_ERRORS
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_NAME = 'leaderboard'
+LEADERBOARD_LOCK_ID = 72_611_005  # Arbitrary key for pg_try_advisory_lock
+
+# Rank column of each board
+LEADERBOARD_BOARDS = {
+    'streak': 'streak_rank',
+    'week': 'week_rank',
+    'accuracy': 'accuracy_rank',
+}
+
+# Params: rollup name, rollup name
+REFRESH_DUE_QUERY = '''
+    SELECT COALESCE((SELECT MAX(id) FROM attempt_events), 0) AS latest_event_id,
+           (SELECT last_event_id FROM rollup_state WHERE name = %s) AS last_event_id,
+           (SELECT EXTRACT(EPOCH FROM now() - updated_at) FROM rollup_state WHERE name = %s) AS age_seconds
+'''
+
+# Rebuild the snapshot from the per-day and per-round aggregates.
+# Streaks: consecutive dates share activity_date - row_number, so each run of
+# days forms one group; only a run reaching today or yesterday counts.
+# Params: LEADERBOARD_MIN_ATTEMPTED, LEADERBOARD_MIN_ATTEMPTED
+REFRESH_QUERY = '''
+    WITH days AS (
+        SELECT user_id, activity_date, questions_practiced,
+               activity_date - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY activity_date)::integer AS run
+        FROM daily_activity
+        WHERE activity_date <= current_date
+    ),
+    streaks AS (
+        SELECT user_id, COUNT(*)::integer AS streak
+        FROM days
+        GROUP BY user_id, run
+        HAVING MAX(activity_date) >= current_date - 1
+    ),
+    weeks AS (
+        SELECT user_id, SUM(questions_practiced)::integer AS practiced_week
+        FROM days
+        WHERE activity_date >= date_trunc('week', current_date)::date
+        GROUP BY user_id
+    ),
+    answers AS (
+        SELECT s.user_id, SUM(s.attempted)::integer AS attempted, SUM(s.correct)::integer AS correct
+        FROM user_set_round_stats s
+        JOIN question_sets qs ON qs.id = s.set_id
+        WHERE qs.is_deleted = false
+        GROUP BY s.user_id
+        HAVING SUM(s.attempted) > 0
+    ),
+    scores AS (
+        SELECT u.id AS user_id,
+               COALESCE(st.streak, 0) AS streak,
+               COALESCE(w.practiced_week, 0) AS practiced_week,
+               COALESCE(a.attempted, 0) AS attempted,
+               COALESCE(a.correct, 0) AS correct,
+               round(a.correct * 100.0 / a.attempted, 1) AS accuracy
+        FROM users u
+        LEFT JOIN streaks st ON st.user_id = u.id
+        LEFT JOIN weeks w ON w.user_id = u.id
+        LEFT JOIN answers a ON a.user_id = u.id
+        WHERE st.user_id IS NOT NULL OR w.user_id IS NOT NULL OR a.user_id IS NOT NULL
+    )
+    INSERT INTO leaderboard (user_id, streak, practiced_week, attempted, correct, accuracy,
+                             streak_rank, week_rank, accuracy_rank)
+    SELECT user_id, streak, practiced_week, attempted, correct, accuracy,
+           CASE WHEN streak > 0 THEN RANK() OVER (ORDER BY streak DESC) END,
+           CASE WHEN practiced_week > 0 THEN RANK() OVER (ORDER BY practiced_week DESC) END,
+           -- Users below the minimum sort after everyone ranked for accuracy
+           CASE WHEN attempted >= %s THEN
+               RANK() OVER (ORDER BY attempted >= %s DESC, accuracy DESC NULLS LAST) END
+    FROM scores
+'''
+
+
+def _refresh_due(cur):
+    """
+    Check the snapshot's age and the answers logged since it was built.
+
+    Returns:
+        tuple: (True if a refresh is due, latest attempt event id)
+    """
+    cur.execute(REFRESH_DUE_QUERY, (LEADERBOARD_NAME, LEADERBOARD_NAME))
+    state = cur.fetchone()
+    latest_event_id = state['latest_event_id']
+    if state['last_event_id'] is None:
+        return True, latest_event_id
+    due = (
+        state['age_seconds'] >= LEADERBOARD_MAX_AGE_SECONDS
+        or latest_event_id - state['last_event_id'] >= LEADERBOARD_REFRESH_EVENTS
+    )
+    return due, latest_event_id
+
+
+def refresh_leaderboard(force=False):
+    """
+    Rebuild the leaderboard snapshot if a refresh is due.
+
+    Only one process refreshes at a time (advisory lock); others return
+    immediately.
+
+    Args:
+        force (bool): Rebuild even if the snapshot is still fresh
+
+    Returns:
+        int: Number of users ranked, or None if no refresh ran
+    """
+    conn = None
+    locked = False
+    try:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('SELECT pg_try_advisory_lock(%s) AS locked', (LEADERBOARD_LOCK_ID,))
+        locked = cur.fetchone()['locked']
+        conn.commit()
+        if not locked:
+            cur.close()
+            return None
+
+        try:
+            due, latest_event_id = _refresh_due(cur)
+            if not (due or force):
+                conn.rollback()
+                return None
+
+            cur.execute('DELETE FROM leaderboard')
+            cur.execute(REFRESH_QUERY, (LEADERBOARD_MIN_ATTEMPTED, LEADERBOARD_MIN_ATTEMPTED))
+            ranked = cur.rowcount
+            cur.execute('''
+                INSERT INTO rollup_state (name, last_event_id, updated_at) VALUES (%s, %s, now())
+                ON CONFLICT (name) DO UPDATE
+                SET last_event_id = EXCLUDED.last_event_id, updated_at = EXCLUDED.updated_at
+            ''', (LEADERBOARD_NAME, latest_event_id))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+        logger.info(f"Refreshed leaderboard: {ranked} user(s)")
+        return ranked
+    finally:
+        if conn:
+            if locked:
+                try:
+                    cur = conn.cursor()
+                    cur.execute('SELECT pg_advisory_unlock(%s)', (LEADERBOARD_LOCK_ID,))
+                    conn.commit()
+                    cur.close()
+                except DB_ERRORS as e:
+                    logger.error(f"Failed to release leaderboard lock: {str(e)}")
+            return_db(conn)
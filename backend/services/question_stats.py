@@ -0,0 +1,70 @@
+"""
+Question Difficulty
+
+question_stats counts every logged answer per question across all users
+(repeat answers by the same user included). The rollup folds each batch
+of attempt events into it with one increment per question, so popular
+questions are not updated on every answer.
+
+The SQL fragments below add the counters and the difficulty estimate to
+question queries (which must alias questions as q) and sort by them.
+"""
+
+# Field name -> expression; questions nobody has answered yet get difficulty 0.5
+DIFFICULTY_FIELDS = {
+    'global_attempts': 'COALESCE(qst.attempts, 0)',
+    'global_correct': 'COALESCE(qst.correct, 0)',
+    'difficulty': 'COALESCE(qst.difficulty, 0.5)',
+}
+DIFFICULTY_EXPRESSION = DIFFICULTY_FIELDS['difficulty']
+
+# Select list entries
+DIFFICULTY_COLUMNS = ',\n'.join(f'{expression} as {name}' for name, expression in DIFFICULTY_FIELDS.items())
+
+DIFFICULTY_JOIN = 'LEFT JOIN question_stats qst ON qst.question_id = q.id'
+
+# Values accepted by the `order` query parameter -> sort direction
+DIFFICULTY_ORDERS = {
+    'hardest': 'DESC',
+    'easiest': 'ASC',
+}
+
+# Rollup step: every answer in the batch
+ROLLUP_QUESTION_STATS_STEP = '''
+    INSERT INTO question_stats (question_id, attempts, correct)
+    SELECT b.question_id,
+           COUNT(*) FILTER (WHERE b.attempted),
+           COUNT(*) FILTER (WHERE b.attempted AND b.correct)
+    FROM rollup_batch b
+    JOIN questions q ON q.id = b.question_id
+    GROUP BY b.question_id
+    ON CONFLICT (question_id)
+    DO UPDATE SET
+        attempts = question_stats.attempts + EXCLUDED.attempts,
+        correct = question_stats.correct + EXCLUDED.correct
+'''
+
+
+def difficulty_order_by(order, default, difficulty='difficulty'):
+    """
+    Build the ORDER BY list for an `order` query parameter.
+
+    Args:
+        order (str): Parameter value: None, 'hardest' or 'easiest'
+        default (str): ORDER BY list used without a difficulty order; also
+            breaks ties between equally difficult questions
+        difficulty (str): What to sort by: the `difficulty` column of
+            DIFFICULTY_COLUMNS, or DIFFICULTY_EXPRESSION for queries that
+            do not select it
+
+    Returns:
+        str: ORDER BY list
+
+    Raises:
+        ValueError: If order is not a supported value
+    """
+    if order is None:
+        return default
+    if order not in DIFFICULTY_ORDERS:
+        raise ValueError(f"order must be one of: {', '.join(DIFFICULTY_ORDERS)}")
+    return f'{difficulty} {DIFFICULTY_ORDERS[order]}, {default}'
@@ -0,0 +1,233 @@
+"""
+Set Reaper
+
+Permanently deletes question sets that were soft-deleted more than
+PURGE_GRACE_PERIOD_DAYS ago, together with their questions and every row
+that depends on them.
+
+Work is split into short transactions of at most PURGE_BATCH_SIZE questions
+each, run with a lock_timeout, so a purge never holds locks for long or
+queues behind user traffic. A set that cannot be finished in one run is
+picked up again by the next one. Each purged set is logged in set_purges
+with the number of rows removed per table; counts are added in the same
+transaction as each batch, so they stay exact across interrupted runs.
+
+Run from the command line (python purge_sets.py) or in-process by setting
+PURGE_INTERVAL_SECONDS.
+"""
+import json
+import logging
+import time
+
+from config import (
+    PURGE_GRACE_PERIOD_DAYS,
+    PURGE_BATCH_SIZE,
+    PURGE_LOCK_TIMEOUT_MS,
+    PURGE_BATCH_PAUSE_SECONDS,
+)
+from services.database import get_db, return_db, DB_ERRORS
+from services.etags import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+PURGE_LOCK_ID = 72_611_002  # Arbitrary key for pg_try_advisory_lock
+
+# Tables whose rows reference questions.id, deleted batch by batch
+QUESTION_DEPENDENT_TABLES = ('user_progress', 'missed_questions', 'bookmarks', 'question_stats')
+
+# Tables whose rows reference question_sets.id, deleted with the set itself
+SET_DEPENDENT_TABLES = ('set_instructions', 'set_opens', 'user_set_round_stats')
+
+CANDIDATES_QUERY = '''
+    SELECT id, name, uploaded_by, deleted_at
+    FROM question_sets
+    WHERE is_deleted = true
+    AND deleted_at < now() - make_interval(secs => %s)
+    ORDER BY deleted_at
+    LIMIT %s
+'''
+
+
+# Adds a batch's per-table counts to the set's purge log row.
+# Params: set_id, set_name, uploaded_by, deleted_at, rows_deleted (JSON), completed
+RECORD_PURGE_QUERY = '''
+    INSERT INTO set_purges (set_id, set_name, uploaded_by, deleted_at, rows_deleted, purged_at)
+    VALUES (%s, %s, %s, %s, %s::jsonb, CASE WHEN %s THEN now() END)
+    ON CONFLICT (set_id) DO UPDATE SET
+        rows_deleted = (
+            SELECT jsonb_object_agg(
+                key,
+                COALESCE((set_purges.rows_deleted ->> key)::bigint, 0)
+                + COALESCE((EXCLUDED.rows_deleted ->> key)::bigint, 0)
+            )
+            FROM jsonb_object_keys(set_purges.rows_deleted || EXCLUDED.rows_deleted) AS key
+        ),
+        purged_at = COALESCE(EXCLUDED.purged_at, set_purges.purged_at)
+    RETURNING rows_deleted
+'''
+
+
+def find_purgeable_sets(cur, grace_period_days=PURGE_GRACE_PERIOD_DAYS, limit=100):
+    """
+    List soft-deleted sets whose grace period has passed, oldest first.
+
+    Args:
+        cur: Cursor returning dict rows
+        grace_period_days (float): Days a set stays recoverable after deletion
+        limit (int): Maximum number of sets to return
+
+    Returns:
+        list[dict]: Rows with id, name, uploaded_by and deleted_at
+    """
+    cur.execute(CANDIDATES_QUERY, (grace_period_days * 86400, limit))
+    return cur.fetchall()
+
+
+def _record_purge(cur, question_set, counts, completed=False):
+    """
+    Add a batch's row counts to the set's purge log, in the batch's transaction.
+
+    Returns:
+        dict: Rows deleted per table by every batch of the set so far
+    """
+    cur.execute(RECORD_PURGE_QUERY, (
+        question_set['id'], question_set['name'], question_set['uploaded_by'],
+        question_set['deleted_at'], json.dumps(counts), completed
+    ))
+    return cur.fetchone()['rows_deleted']
+
+
+def _purge_question_batch(conn, question_set):
+    """
+    Delete one batch of a set's questions and their dependent rows.
+
+    Returns:
+        bool: True if a batch was deleted, False if the set has no questions left
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SET LOCAL lock_timeout = '{int(PURGE_LOCK_TIMEOUT_MS)}ms'")
+        cur.execute(
+            'SELECT id FROM questions WHERE set_id = %s ORDER BY id LIMIT %s',
+            (question_set['id'], PURGE_BATCH_SIZE)
+        )
+        question_ids = [row['id'] for row in cur.fetchall()]
+        if not question_ids:
+            conn.rollback()
+            return False
+
+        counts = {}
+        for table in QUESTION_DEPENDENT_TABLES:
+            cur.execute(f'DELETE FROM {table} WHERE question_id = ANY(%s)', (question_ids,))
+            counts[table] = cur.rowcount
+        cur.execute('DELETE FROM questions WHERE id = ANY(%s)', (question_ids,))
+        counts['questions'] = cur.rowcount
+        _record_purge(cur, question_set, counts)
+        conn.commit()
+        return True
+    finally:
+        cur.close()
+
+
+def _purge_set_row(conn, question_set):
+    """
+    Delete the set's own dependent rows and the set, and complete its purge log.
+
+    Returns:
+        dict: Rows deleted per table by every batch of the set
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SET LOCAL lock_timeout = '{int(PURGE_LOCK_TIMEOUT_MS)}ms'")
+        counts = {}
+        for table in SET_DEPENDENT_TABLES:
+            cur.execute(f'DELETE FROM {table} WHERE set_id = %s', (question_set['id'],))
+            counts[table] = cur.rowcount
+        cur.execute(
+            'DELETE FROM question_sets WHERE id = %s AND is_deleted = true',
+            (question_set['id'],)
+        )
+        counts['question_sets'] = cur.rowcount
+        total = _record_purge(cur, question_set, counts, completed=True)
+        bump_data_version(cur)
+        conn.commit()
+        return total
+    finally:
+        cur.close()
+
+
+def purge_set(conn, question_set):
+    """
+    Permanently delete one soft-deleted set in bounded batches.
+
+    Args:
+        conn: Database connection from get_db()
+        question_set (dict): Row from find_purgeable_sets()
+
+    Returns:
+        dict: Rows deleted per table, including by earlier interrupted runs
+
+    Raises:
+        DB_ERRORS: If a batch fails (e.g. lock_timeout); batches committed
+            before the failure stay deleted and counted
+    """
+    while _purge_question_batch(conn, question_set):
+        time.sleep(PURGE_BATCH_PAUSE_SECONDS)
+    return _purge_set_row(conn, question_set)
+
+
+def purge_deleted_sets(grace_period_days=PURGE_GRACE_PERIOD_DAYS, max_sets=100):
+    """
+    Purge every soft-deleted set past its grace period.
+
+    Only one process purges at a time (advisory lock); others return
+    immediately. A set whose batch fails is left for the next run.
+
+    Args:
+        grace_period_days (float): Days a set stays recoverable after deletion
+        max_sets (int): Maximum number of sets to purge in this run
+
+    Returns:
+        list[dict]: One {'set_id', 'rows_deleted'} entry per purged set
+    """
+    purged = []
+    conn = None
+    locked = False
+    try:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('SELECT pg_try_advisory_lock(%s) AS locked', (PURGE_LOCK_ID,))
+        locked = cur.fetchone()['locked']
+        conn.commit()
+        if not locked:
+            logger.info("Set purge already running elsewhere, skipping")
+            return purged
+
+        candidates = find_purgeable_sets(cur, grace_period_days, max_sets)
+        conn.commit()
+        cur.close()
+
+        for question_set in candidates:
+            try:
+                counts = purge_set(conn, question_set)
+            except DB_ERRORS as e:
+                conn.rollback()
+                logger.warning(f"Purge of set {question_set['id']} interrupted, will retry: {str(e)}")
+                break
+            purged.append({'set_id': question_set['id'], 'rows_deleted': counts})
+            logger.info(f"Purged set {question_set['id']}: {counts}")
+
+        if purged:
+            logger.info(f"Purged {len(purged)} soft-deleted set(s)")
+        return purged
+    finally:
+        if conn:
+            if locked:
+                try:
+                    cur = conn.cursor()
+                    cur.execute('SELECT pg_advisory_unlock(%s)', (PURGE_LOCK_ID,))
+                    conn.commit()
+                    cur.close()
+                except DB_ERRORS as e:
+                    logger.error(f"Failed to release purge lock: {str(e)}")
+            return_db(conn)
@@ -0,0 +1,199 @@
+"""
+Attempt Event Rollup
+
+Folds new rows of attempt_events into aggregate tables, ROLLUP_BATCH_SIZE
+events per transaction. rollup_state records the last event folded, so
+each event is counted exactly once.
+
+Each batch is copied into a temporary table (rollup_batch) and every
+statement in ROLLUP_STEPS reads from it:
+- user_daily_stats and question_stats get every event
+- user_progress, user_set_round_stats and daily_activity get only events
+  not applied when they were recorded ('events' mode)
+
+Events for questions or users deleted in the meantime are skipped.
+
+Run from the command line (python rollup_events.py) or in-process every
+ROLLUP_INTERVAL_SECONDS.
+"""
+import logging
+
+from config import ROLLUP_BATCH_SIZE
+from services.attempt_log import ATTEMPT_EVENTS_LOCK_ID
+from services.database import get_db, return_db, mark_user_write, commit_user_write, DB_ERRORS
+from services.question_stats import ROLLUP_QUESTION_STATS_STEP
+from services.round_stats import ROLLUP_ROUND_STATS_STEP
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'attempt_events'
+ROLLUP_LOCK_ID = 72_611_004  # Arbitrary key for pg_try_advisory_lock
+
+# Statements folding rollup_batch into the aggregate tables, run in order
+ROLLUP_STEPS = [
+    # Answers per user per day
+    '''
+    INSERT INTO user_daily_stats (user_id, stat_date, attempted, correct)
+    SELECT b.user_id, b.recorded_at::date, COUNT(*), COUNT(*) FILTER (WHERE b.correct)
+    FROM rollup_batch b
+    JOIN users u ON u.id = b.user_id
+    GROUP BY b.user_id, b.recorded_at::date
+    ON CONFLICT (user_id, stat_date)
+    DO UPDATE SET
+        attempted = user_daily_stats.attempted + EXCLUDED.attempted,
+        correct = user_daily_stats.correct + EXCLUDED.correct
+    ''',
+    # Answers per question across all users (difficulty)
+    ROLLUP_QUESTION_STATS_STEP,
+    # Latest answer and attempt count per question
+    '''
+    INSERT INTO user_progress (user_id, question_id, attempted, correct, attempt_count, last_attempted)
+    SELECT DISTINCT ON (b.user_id, b.question_id)
+           b.user_id, b.question_id, b.attempted, b.correct,
+           COUNT(*) OVER (PARTITION BY b.user_id, b.question_id),
+           b.recorded_at
+    FROM rollup_batch b
+    JOIN users u ON u.id = b.user_id
+    JOIN questions q ON q.id = b.question_id
+    WHERE NOT b.applied
+    ORDER BY b.user_id, b.question_id, b.id DESC
+    ON CONFLICT (user_id, question_id)
+    DO UPDATE SET
+        attempted = EXCLUDED.attempted,
+        correct = EXCLUDED.correct,
+        attempt_count = user_progress.attempt_count + EXCLUDED.attempt_count,
+        last_attempted = GREATEST(user_progress.last_attempted, EXCLUDED.last_attempted)
+    ''',
+    # Accuracy per set and round, for the questions updated above
+    ROLLUP_ROUND_STATS_STEP,
+    # Questions practiced per day, for streaks
+    '''
+    INSERT INTO daily_activity (user_id, activity_date, questions_practiced)
+    SELECT b.user_id, b.recorded_at::date, COUNT(*)
+    FROM rollup_batch b
+    JOIN users u ON u.id = b.user_id
+    WHERE NOT b.applied
+    GROUP BY b.user_id, b.recorded_at::date
+    ON CONFLICT (user_id, activity_date)
+    DO UPDATE SET questions_practiced = daily_activity.questions_practiced + EXCLUDED.questions_practiced
+    ''',
+]
+
+
+def _committed_event_barrier(conn):
+    """
+    Find the highest event id below which every event has committed.
+
+    Waits for in-flight event inserts (which hold the lock shared) to
+    finish; inserts starting afterwards get higher ids.
+    """
+    cur = conn.cursor()
+    cur.execute('SELECT pg_advisory_xact_lock(%s)', (ATTEMPT_EVENTS_LOCK_ID,))
+    cur.execute('SELECT COALESCE(MAX(id), 0) AS max_id FROM attempt_events')
+    barrier = cur.fetchone()['max_id']
+    conn.commit()
+    cur.close()
+    return barrier
+
+
+def _fold_batch(conn, barrier):
+    """
+    Fold the next batch of events up to the barrier in one transaction.
+
+    Returns:
+        tuple: (events folded, True if more events remain below the barrier)
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+            INSERT INTO rollup_state (name, last_event_id) VALUES (%s, 0)
+            ON CONFLICT (name) DO NOTHING
+        ''', (ROLLUP_NAME,))
+        cur.execute('SELECT last_event_id FROM rollup_state WHERE name = %s FOR UPDATE', (ROLLUP_NAME,))
+        last_event_id = cur.fetchone()['last_event_id']
+        if last_event_id >= barrier:
+            conn.rollback()
+            return 0, False
+
+        cur.execute('''
+            SELECT MAX(id) AS upper FROM (
+                SELECT id FROM attempt_events
+                WHERE id > %s AND id <= %s
+                ORDER BY id
+                LIMIT %s
+            ) batch
+        ''', (last_event_id, barrier, ROLLUP_BATCH_SIZE))
+        upper = cur.fetchone()['upper'] or barrier
+
+        cur.execute('''
+            CREATE TEMP TABLE rollup_batch ON COMMIT DROP AS
+            SELECT * FROM attempt_events WHERE id > %s AND id <= %s
+        ''', (last_event_id, upper))
+        folded = cur.rowcount
+        cur.execute('ANALYZE rollup_batch')
+
+        for step in ROLLUP_STEPS:
+            cur.execute(step)
+
+        # Every event changes its user's daily stats, and unapplied ones their progress
+        cur.execute('SELECT DISTINCT user_id FROM rollup_batch')
+        written_users = [row['user_id'] for row in cur.fetchall()]
+        if written_users:
+            mark_user_write(cur, written_users)
+
+        cur.execute('''
+            UPDATE rollup_state SET last_event_id = %s, updated_at = now()
+            WHERE name = %s
+        ''', (upper, ROLLUP_NAME))
+        commit_user_write(conn, written_users)
+        return folded, upper < barrier
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def run_rollup():
+    """
+    Fold every committed event not yet rolled up.
+
+    Only one process rolls up at a time (advisory lock); others return
+    immediately.
+
+    Returns:
+        int: Number of events folded
+    """
+    folded = 0
+    conn = None
+    locked = False
+    try:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('SELECT pg_try_advisory_lock(%s) AS locked', (ROLLUP_LOCK_ID,))
+        locked = cur.fetchone()['locked']
+        conn.commit()
+        cur.close()
+        if not locked:
+            return folded
+
+        barrier = _committed_event_barrier(conn)
+        more = True
+        while more:
+            batch_count, more = _fold_batch(conn, barrier)
+            folded += batch_count
+
+        if folded:
+            logger.info(f"Rolled up {folded} attempt event(s)")
+        return folded
+    finally:
+        if conn:
+            if locked:
+                try:
+                    cur = conn.cursor()
+                    cur.execute('SELECT pg_advisory_unlock(%s)', (ROLLUP_LOCK_ID,))
+                    conn.commit()
+                    cur.close()
+                except DB_ERRORS as e:
+                    logger.error(f"Failed to release rollup lock: {str(e)}")
+            return_db(conn)
@@ -0,0 +1,108 @@
+"""
+Per-Round Accuracy Aggregates
+
+user_set_round_stats holds, per user, question set and round, how many
+questions were attempted and how many were last answered correctly.
+
+It is maintained incrementally:
+- update_progress locks the (user, set, round) row, then applies the
+  difference between the question's old and new progress
+- the rollup recomputes the rows touched by events it applies to
+  user_progress ('events' mode)
+
+rebuild_round_stats() recomputes rows from user_progress, for repairs
+after manual data changes.
+"""
+import logging
+
+from services.database import get_db, return_db
+
+logger = logging.getLogger(__name__)
+
+# Recompute the rows for the (user, set, round) keys selected by {keys}
+_RECOMPUTE_QUERY = '''
+    INSERT INTO user_set_round_stats (user_id, set_id, round_no, attempted, correct)
+    SELECT k.user_id, k.set_id, k.round_no,
+           COUNT(*) FILTER (WHERE up.attempted),
+           COUNT(*) FILTER (WHERE up.attempted AND up.correct)
+    FROM ({keys}) k
+    JOIN questions q ON q.set_id = k.set_id AND COALESCE(q.round_no, '') = k.round_no
+    JOIN user_progress up ON up.question_id = q.id AND up.user_id = k.user_id
+    GROUP BY k.user_id, k.set_id, k.round_no
+    ON CONFLICT (user_id, set_id, round_no)
+    DO UPDATE SET attempted = EXCLUDED.attempted, correct = EXCLUDED.correct
+'''
+
+# Rollup step: rows touched by events applied in this batch
+ROLLUP_ROUND_STATS_STEP = _RECOMPUTE_QUERY.format(keys='''
+        SELECT DISTINCT b.user_id, q.set_id, COALESCE(q.round_no, '') AS round_no
+        FROM rollup_batch b
+        JOIN users u ON u.id = b.user_id
+        JOIN questions q ON q.id = b.question_id
+        WHERE NOT b.applied
+''')
+
+# All rows of one user. Params: user_id
+REBUILD_USER_QUERY = _RECOMPUTE_QUERY.format(keys='''
+        SELECT DISTINCT up.user_id, q.set_id, COALESCE(q.round_no, '') AS round_no
+        FROM user_progress up
+        JOIN questions q ON q.id = up.question_id
+        WHERE up.user_id = %s
+''')
+
+
+def rebuild_user_round_stats(conn, user_id):
+    """
+    Recompute one user's rows from user_progress in one transaction.
+
+    Args:
+        conn: Database connection from get_db()
+        user_id (int): ID of the user
+
+    Returns:
+        int: Number of rows written
+    """
+    cur = conn.cursor()
+    try:
+        # Row locks keep update_progress from applying deltas to rows being replaced
+        cur.execute('SELECT 1 FROM user_set_round_stats WHERE user_id = %s FOR UPDATE', (user_id,))
+        cur.execute('DELETE FROM user_set_round_stats WHERE user_id = %s', (user_id,))
+        cur.execute(REBUILD_USER_QUERY, (user_id,))
+        written = cur.rowcount
+        conn.commit()
+        return written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def rebuild_round_stats(user_ids=None):
+    """
+    Recompute user_set_round_stats, one transaction per user.
+
+    Args:
+        user_ids (list[int], optional): Users to rebuild (default: every user)
+
+    Returns:
+        int: Number of rows written
+    """
+    written = 0
+    conn = None
+    try:
+        conn = get_db()
+        if user_ids is None:
+            cur = conn.cursor()
+            cur.execute('SELECT id FROM users ORDER BY id')
+            user_ids = [row['id'] for row in cur.fetchall()]
+            conn.commit()
+            cur.close()
+
+        for user_id in user_ids:
+            written += rebuild_user_round_stats(conn, user_id)
+        logger.info(f"Rebuilt round stats for {len(user_ids)} user(s): {written} row(s)")
+        return written
+    finally:
+        if conn:
+            return_db(conn)
@@ -0,0 +1,42 @@
+"""In-process periodic background jobs"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Set on shutdown so job threads stop waiting for their next run
+_stop_event = threading.Event()
+
+
+def start_periodic(name, interval_seconds, func):
+    """
+    Run a function every interval_seconds on a daemon thread.
+
+    The first run happens one interval after start. Exceptions are logged
+    and the job keeps its schedule. With several worker processes every
+    process runs its own copy, so jobs must tolerate concurrent runs.
+
+    Args:
+        name (str): Thread name, used in logs
+        interval_seconds (float): Seconds between the end of one run and the next
+        func (callable): Job to run, called without arguments
+
+    Returns:
+        threading.Thread: The started thread
+    """
+    def loop():
+        while not _stop_event.wait(interval_seconds):
+            try:
+                func()
+            except Exception as e:
+                logger.error(f"Background job {name} failed: {str(e)}")
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    logger.info(f"Background job {name} scheduled every {interval_seconds}s")
+    return thread
+
+
+def stop_periodic():
+    """Stop all periodic jobs after their current run."""
+    _stop_event.set()
@@ -0,0 +1,351 @@
+"""
+Set Content Cache
+
+A question set's questions and instructions never change once
+parse_and_save_set has committed it, so each process keeps them in an LRU
+cache as already-encoded JSON, keyed by (set_id, content_hash). Practice
+requests then only query the small per-request overlay (progress,
+missed/bookmarked flags, difficulty) and splice it into the cached bytes.
+
+Each question is stored as its encoded JSON object without the closing
+brace, so overlay fields can be appended without decoding it. The cache is
+bounded by the size of the encoded JSON (SET_CONTENT_CACHE_BYTES); the
+least recently used sets are evicted first.
+
+With the shared store enabled (services/shared_store.py), entries are also
+written there and the per-process cache holds views of the shared copy, so
+a set encoded by one worker is a hit for every worker on the host.
+
+For MessagePack clients, the first such request for a set also encodes
+each question's fields as MessagePack and keeps them with the entry
+(counted in its size), and question lists are spliced from those.
+"""
+import logging
+import struct
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+from config import SET_CONTENT_CACHE_BYTES
+from services.json_provider import (
+    JSON_FORMAT_VERSION, MSGPACK_MIMETYPE, wants_msgpack, json_to_msgpack, msgpack_map_header, msgpack_array_header,
+)
+from services.shared_store import get_payload, put_payload
+
+logger = logging.getLogger(__name__)
+
+# Cache key of a set. Params: set_id
+SET_KEY_QUERY = '''
+    SELECT id, content_hash
+    FROM question_sets
+    WHERE id = %s
+'''
+
+# Question columns kept in the cache, listed explicitly: the Postgres-rendered
+# questions document (QUESTIONS_RENDER_MODE=sql) writes the same ones, and both
+# must stay byte for byte identical when columns are added to questions
+CONTENT_FIELD_NAMES = (
+    'id', 'set_id', 'round_no', 'question_no', 'question_text', 'image_url', 'answer_text', 'created_at',
+)
+
+# Static columns of a set's questions. Params: set_id
+SET_QUESTIONS_QUERY = f'''
+    SELECT {', '.join(f'q.{name}' for name in CONTENT_FIELD_NAMES)}
+    FROM questions q
+    WHERE q.set_id = %s
+    ORDER BY q.id
+'''
+
+# Instructions of one set in display order. Params: set_id
+INSTRUCTIONS_QUERY = '''
+    SELECT instruction_text
+    FROM set_instructions
+    WHERE set_id = %s
+    ORDER BY display_order
+'''
+
+# Shared store layout of an entry: header, (id, length) per question, then
+# the instructions and the question fragments back to back
+_PACK_HEADER = struct.Struct('<II')  # question count, instructions length
+_PACK_QUESTION = struct.Struct('<II')  # question id, fragment length
+
+# (set_id, content_hash) -> {'set_id': int, 'content_hash': str, 'questions': {id: bytes},
+#                             'instructions': bytes, 'size': int, and once built 'msgpack': dict}
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _dumps(value):
+    return current_app.json.dumps_bytes(value)
+
+
+def _encode_content(set_id, content_hash, questions, instructions):
+    """Encode a set's rows into a cache entry."""
+    encoded = OrderedDict()
+    for question in questions:
+        # Drop the closing brace; render_questions appends the overlay fields
+        encoded[question['id']] = _dumps(question)[:-1]
+    encoded_instructions = _dumps(instructions)
+    size = sum(len(fragment) for fragment in encoded.values()) + len(encoded_instructions)
+    return {
+        'set_id': set_id,
+        'content_hash': content_hash,
+        'questions': encoded,
+        'instructions': encoded_instructions,
+        'size': size,
+    }
+
+
+def _pack(entry):
+    """Serialize a cache entry for the shared store."""
+    fragments = entry['questions']
+    parts = [_PACK_HEADER.pack(len(fragments), len(entry['instructions']))]
+    parts.extend(_PACK_QUESTION.pack(question_id, len(fragment)) for question_id, fragment in fragments.items())
+    parts.append(entry['instructions'])
+    parts.extend(fragments.values())
+    return b''.join(parts)
+
+
+def _unpack(set_id, content_hash, view):
+    """Rebuild a cache entry whose fragments are slices of a shared store view."""
+    count, instructions_length = _PACK_HEADER.unpack_from(view, 0)
+    table_end = _PACK_HEADER.size + count * _PACK_QUESTION.size
+    instructions = view[table_end:table_end + instructions_length]
+    offset = table_end + instructions_length
+
+    fragments = OrderedDict()
+    for question_id, length in _PACK_QUESTION.iter_unpack(view[_PACK_HEADER.size:table_end]):
+        fragments[question_id] = view[offset:offset + length]
+        offset += length
+    return {
+        'set_id': set_id,
+        'content_hash': content_hash,
+        'questions': fragments,
+        'instructions': instructions,
+        'size': len(view),
+    }
+
+
+def _get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+        return entry
+
+
+def _put(key, entry):
+    global _cache_bytes
+    if entry['size'] > SET_CONTENT_CACHE_BYTES:
+        return
+    with _cache_lock:
+        previous = _cache.pop(key, None)
+        if previous is not None:
+            _cache_bytes -= previous['size']
+        _cache[key] = entry
+        _cache_bytes += entry['size']
+        _evict()
+
+
+def _evict():
+    """Drop least recently used entries until the cache fits (call with _cache_lock held)."""
+    global _cache_bytes
+    while _cache_bytes > SET_CONTENT_CACHE_BYTES:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= evicted['size']
+
+
+def clear_set_content_cache():
+    """Drop every cached set (e.g. after changing the JSON encoder)."""
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def find_set_key(cur, set_id):
+    """
+    Look up a set's cache key.
+
+    Args:
+        cur: Cursor returning dict rows
+        set_id (int): ID of the question set
+
+    Returns:
+        dict: id and content_hash, or None if the set does not exist
+    """
+    cur.execute(SET_KEY_QUERY, (set_id,))
+    return cur.fetchone()
+
+
+def load_set_content(cur, set_id, set_key=None):
+    """
+    Get a set's encoded questions and instructions, from the cache if possible.
+
+    Args:
+        cur: Cursor returning dict rows
+        set_id (int): ID of the question set
+        set_key (dict, optional): Row from find_set_key(), if already fetched
+
+    Returns:
+        dict: Cache entry, or None if the set does not exist
+    """
+    row = set_key if set_key is not None else find_set_key(cur, set_id)
+    if row is None:
+        return None
+
+    key = (row['id'], row['content_hash'])
+    entry = _get(key)
+    if entry is not None:
+        return entry
+
+    shared_key = f'set-content:{JSON_FORMAT_VERSION}:{row["id"]}:{row["content_hash"]}'
+    shared = get_payload(shared_key)
+    if shared is None:
+        cur.execute(SET_QUESTIONS_QUERY, (set_id,))
+        questions = cur.fetchall()
+        cur.execute(INSTRUCTIONS_QUERY, (set_id,))
+        instructions = [instruction['instruction_text'] for instruction in cur.fetchall()]
+
+        entry = _encode_content(row['id'], row['content_hash'], questions, instructions)
+        shared = put_payload(shared_key, _pack(entry))
+    if shared is not None:
+        entry = _unpack(row['id'], row['content_hash'], shared)
+
+    _put(key, entry)
+    return entry
+
+
+def _question_objects(content, columns, rows):
+    """Yield the encoded question objects for overlay rows (first column: id)."""
+    fragments = content['questions']
+    fields = columns[1:]
+    for row in rows:
+        fragment = fragments.get(row[0])
+        if fragment is not None:
+            # Fragments may be memoryviews of the shared store, so join rather than add
+            if fields:
+                yield b''.join((fragment, b',', _dumps(dict(zip(fields, row[1:])))[1:]))
+            else:
+                yield b''.join((fragment, b'}'))
+
+
+def _msgpack_content(content):
+    """
+    Get a cache entry's questions and instructions as MessagePack, building them once.
+
+    Returns:
+        dict: 'questions': {id: (field count, encoded fields without the map
+        header)} and 'instructions': encoded list
+    """
+    global _cache_bytes
+    encoded = content.get('msgpack')
+    if encoded is not None:
+        return encoded
+
+    json_provider = current_app.json
+    questions = {}
+    for question_id, fragment in content['questions'].items():
+        question = json_provider.loads(b''.join((fragment, b'}')))
+        questions[question_id] = (len(question), json_provider.dumps_msgpack_fields(question))
+    encoded = {'questions': questions, 'instructions': json_to_msgpack(bytes(content['instructions']))}
+    size = sum(len(fields) for _, fields in questions.values()) + len(encoded['instructions'])
+
+    with _cache_lock:
+        # Concurrent requests may both build it; only the first one is kept and counted
+        if 'msgpack' in content:
+            return content['msgpack']
+        content['msgpack'] = encoded
+        if _cache.get((content['set_id'], content['content_hash'])) is content:
+            content['size'] += size
+            _cache_bytes += size
+            _evict()
+    return encoded
+
+
+def _msgpack_questions(content, overlay):
+    """Splice overlay rows into a set's MessagePack questions: {'instructions', 'questions'} body."""
+    encoded = _msgpack_content(content)
+    questions = encoded['questions']
+    fields = overlay.columns[1:]
+    dumps_fields = current_app.json.dumps_msgpack_fields
+    parts = []
+    for row in overlay.tuples:
+        question = questions.get(row[0])
+        if question is not None:
+            field_count, question_fields = question
+            parts.append(b''.join((msgpack_map_header(field_count + len(fields)), question_fields,
+                                   dumps_fields(dict(zip(fields, row[1:]))))))
+    return b''.join((msgpack_map_header(2), current_app.json.dumps_msgpack('instructions'), encoded['instructions'],
+                     current_app.json.dumps_msgpack('questions'), msgpack_array_header(len(parts)), *parts))
+
+
+def render_questions(content, overlay):
+    """
+    Build a {'questions': [...], 'instructions': [...]} JSON response.
+
+    Args:
+        content (dict): Entry from load_set_content(), or None for an unknown set
+        overlay (Rows): Per-request fields of each question, in response
+            order; the first column is the question's `id`
+
+    Returns:
+        flask.Response: The JSON response, or MessagePack if the client prefers it
+    """
+    if wants_msgpack():
+        if content is None:
+            body = current_app.json.dumps_msgpack({'questions': [], 'instructions': []})
+        else:
+            body = _msgpack_questions(content, overlay)
+        return current_app.response_class(body, mimetype=MSGPACK_MIMETYPE)
+    if content is None:
+        body = _dumps({'questions': [], 'instructions': []})
+    else:
+        questions = _question_objects(content, overlay.columns, overlay.tuples)
+        body = b''.join((b'{"instructions":', content['instructions'],
+                         b',"questions":[', b','.join(questions), b']}'))
+    return current_app.response_class(body, mimetype=current_app.json.mimetype)
+
+
+def render_instructions_line(content):
+    """First NDJSON line of a streamed question list: {"instructions": [...]}."""
+    instructions = content['instructions'] if content is not None else b'[]'
+    return b''.join((b'{"instructions":', instructions, b'}\n'))
+
+
+def render_question_lines(content, columns, rows):
+    """
+    Encode a batch of overlay rows as NDJSON question lines.
+
+    Args:
+        content (dict): Entry from load_set_content(), or None for an unknown set
+        columns (tuple[str]): Overlay column names; the first is `id`
+        rows (list[tuple]): Overlay rows, in response order
+
+    Returns:
+        bytes: One question object per line
+    """
+    if content is None:
+        return b''
+    return b''.join([question + b'\n' for question in _question_objects(content, columns, rows)])
+
+
+def render_set_content(set_id, content):
+    """
+    Build the JSON response for a set's content alone, without per-user fields.
+
+    Args:
+        set_id (int): ID of the question set
+        content (dict): Entry from load_set_content()
+
+    Returns:
+        flask.Response: JSON with set_id, content_hash, questions and instructions
+    """
+    questions = b'},'.join(content['questions'].values())
+    body = b''.join((b'{"content_hash":', _dumps(content['content_hash']),
+                     b',"instructions":', content['instructions'],
+                     b',"questions":[', questions, b'}' if questions else b'',
+                     b'],"set_id":', _dumps(set_id), b'}'))
+    return current_app.response_class(body, mimetype=current_app.json.mimetype)
@@ -0,0 +1,280 @@
+"""
+Shared Content Store
+
+A directory of immutable payload files shared by every worker process on
+the host (SHARED_STORE_DIR, ideally on tmpfs such as /dev/shm). A payload
+is written once, atomically, and read through mmap: each worker maps the
+same page-cache pages instead of holding its own copy, and a payload
+cached by one worker is a hit for all of them.
+
+Layout:
+- entries/<sha256 of key>: one payload per file
+- index: one line per payload (key, file name, size, generation or -),
+  oldest first; payloads beyond SHARED_STORE_MAX_BYTES are evicted oldest
+  first (FIFO), and stale generational payloads are dropped
+- generation: two 8-byte counters: the catalog generation, bumped by
+  bump_generation() when sets are created, renamed or deleted, and the
+  index version, bumped whenever the index is rewritten
+- lock: flock()ed while writing
+
+Payloads that depend on the set catalog are stored under keys containing
+the current generation, so bumping it invalidates them for every worker
+at once. Unlinking a file is safe while workers still have it mapped.
+
+Each process keeps its mappings in an LRU of at most SHARED_STORE_MAX_BYTES
+mapped bytes, and unmaps payloads that left the index (evicted or stale)
+once it sees the index version change, so deleted files do not stay
+mapped.
+
+The store is disabled when SHARED_STORE_DIR is empty.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import SHARED_STORE_DIR, SHARED_STORE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Catalog generation, index version
+_COUNTERS = struct.Struct('<QQ')
+_GENERATION_OFFSET = 0
+_INDEX_VERSION_OFFSET = 8
+
+# Per-process mappings, least recently used first: key -> memoryview
+_views = OrderedDict()
+_views_bytes = 0
+_views_index_version = None
+_views_lock = threading.Lock()
+_counters_map = None
+
+
+def shared_store_enabled():
+    return bool(SHARED_STORE_DIR)
+
+
+def _path(*parts):
+    return os.path.join(SHARED_STORE_DIR, *parts)
+
+
+def _entry_name(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+@contextmanager
+def _write_lock():
+    # POSIX only; imported here so the app still runs on Windows with the store disabled
+    import fcntl
+
+    os.makedirs(_path('entries'), exist_ok=True)
+    with open(_path('lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _counters_view():
+    """Map the shared counters, creating (or extending) the file if needed."""
+    global _counters_map
+    if _counters_map is None:
+        with _views_lock:
+            if _counters_map is None:
+                with _write_lock():
+                    with open(_path('generation'), 'a+b') as f:
+                        size = os.fstat(f.fileno()).st_size
+                        if size < _COUNTERS.size:
+                            f.write(b'\0' * (_COUNTERS.size - size))
+                            f.flush()
+                        _counters_map = mmap.mmap(f.fileno(), _COUNTERS.size)
+    return _counters_map
+
+
+def _read_counter(offset):
+    return struct.unpack_from('<Q', _counters_view(), offset)[0]
+
+
+def _bump_counter(view, offset):
+    """Increment a shared counter (with the write lock held)."""
+    value = struct.unpack_from('<Q', view, offset)[0] + 1
+    struct.pack_into('<Q', view, offset, value)
+    view.flush()
+    return value
+
+
+def current_generation():
+    """
+    Read the catalog generation (a read from shared memory, no system call).
+
+    Returns:
+        int: Current generation, or 0 if the store is disabled
+    """
+    if not shared_store_enabled():
+        return 0
+    return _read_counter(_GENERATION_OFFSET)
+
+
+def _read_index():
+    """Parse the index into a list of (key, name, size, generation) tuples."""
+    entries = []
+    try:
+        with open(_path('index'), encoding='utf-8') as f:
+            for line in f:
+                key, name, size, generation = line.rstrip('\n').split('\t')
+                entries.append((key, name, int(size), None if generation == '-' else int(generation)))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _write_index(view, entries):
+    """Replace the index and bump its version (with the write lock held)."""
+    tmp = _path('index.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for key, name, size, generation in entries:
+            f.write(f"{key}\t{name}\t{size}\t{'-' if generation is None else generation}\n")
+    os.replace(tmp, _path('index'))
+    _bump_counter(view, _INDEX_VERSION_OFFSET)
+
+
+def _remove(entries):
+    for _, name, _, _ in entries:
+        try:
+            os.unlink(_path('entries', name))
+        except FileNotFoundError:
+            pass
+
+
+def bump_generation():
+    """
+    Invalidate every generational payload (call after committing a change
+    to the set catalog). Payloads of older generations are deleted.
+    """
+    if not shared_store_enabled():
+        return
+    try:
+        view = _counters_view()
+        with _write_lock():
+            generation = _bump_counter(view, _GENERATION_OFFSET)
+
+            entries = _read_index()
+            stale = [entry for entry in entries if entry[3] is not None and entry[3] < generation]
+            if stale:
+                _write_index(view, [entry for entry in entries if entry not in stale])
+                _remove(stale)
+    except OSError as e:
+        logger.error(f"Failed to bump shared store generation: {str(e)}")
+
+
+def _drop_view(key):
+    # Called with _views_lock held; the mapping closes once callers release it
+    global _views_bytes
+    view = _views.pop(key)
+    _views_bytes -= view.nbytes
+
+
+def _sync_views():
+    """Unmap payloads that are no longer in the index."""
+    global _views_index_version
+    # Read the version before the index: a rewrite in between is seen next time
+    index_version = _read_counter(_INDEX_VERSION_OFFSET)
+    if index_version == _views_index_version:
+        return
+    live = {entry[0] for entry in _read_index()}
+    with _views_lock:
+        for view_key in [k for k in _views if k not in live]:
+            _drop_view(view_key)
+        _views_index_version = index_version
+
+
+def get_payload(key):
+    """
+    Look up a payload.
+
+    Args:
+        key (str): Payload key
+
+    Returns:
+        memoryview: Read-only view of the mapped payload, or None if absent
+    """
+    global _views_bytes
+    if not shared_store_enabled():
+        return None
+
+    _sync_views()
+    with _views_lock:
+        cached = _views.get(key)
+        if cached is not None:
+            _views.move_to_end(key)
+            return cached
+
+    try:
+        with open(_path('entries', _entry_name(key)), 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        # ValueError: empty file, which is never written
+        return None
+    except OSError as e:
+        logger.error(f"Failed to map shared store entry {key}: {str(e)}")
+        return None
+
+    view = memoryview(mapped)
+    with _views_lock:
+        if key in _views:
+            _drop_view(key)
+        _views[key] = view
+        _views_bytes += view.nbytes
+        # Keep at least the view just mapped
+        while _views_bytes > SHARED_STORE_MAX_BYTES and len(_views) > 1:
+            _drop_view(next(iter(_views)))
+    return view
+
+
+def put_payload(key, data, generation=None):
+    """
+    Store a payload (first writer wins) and return a mapped view of it.
+
+    Args:
+        key (str): Payload key; include the generation for catalog payloads
+        data (bytes): Payload, not empty
+        generation (int, optional): Generation the payload belongs to; it is
+            deleted once the generation is bumped past it
+
+    Returns:
+        memoryview: View of the stored payload, or None if it could not be
+        stored (the caller keeps using its own copy)
+    """
+    if not shared_store_enabled() or not data or len(data) > SHARED_STORE_MAX_BYTES:
+        return None
+
+    name = _entry_name(key)
+    try:
+        view = _counters_view()
+        with _write_lock():
+            if not os.path.exists(_path('entries', name)):
+                tmp = _path('entries', f'{name}.tmp')
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, _path('entries', name))
+
+                entries = _read_index()
+                entries.append((key, name, len(data), generation))
+                total = sum(entry[2] for entry in entries)
+                evicted = []
+                while total > SHARED_STORE_MAX_BYTES:
+                    oldest = entries.pop(0)
+                    evicted.append(oldest)
+                    total -= oldest[2]
+                _write_index(view, entries)
+                _remove(evicted)
+    except OSError as e:
+        logger.error(f"Failed to write shared store entry {key}: {str(e)}")
+        return None
+
+    return get_payload(key)
@@ -0,0 +1,114 @@
+"""
+Request Coalescing (single-flight)
+
+When a popular set is shared, many guests ask for the same public data at
+the same moment. single_flight() lets identical concurrent reads in a
+worker share one computation: the first caller for a key runs it, callers
+that arrive while it is in flight wait for it and get the same result
+(typically the encoded body) instead of running the same queries again.
+
+Results are not kept once the computation finishes; caching is left to
+the set content cache and the shared store. Keys must name everything the
+result depends on: route, normalized parameters and data versions.
+
+Coalescing is per process, between the threads of a worker (e.g. gunicorn
+--threads); sync workers serve one request at a time and never coalesce.
+A caller waits at most SINGLE_FLIGHT_WAIT_SECONDS, then computes the
+result itself, so one stuck computation cannot hold up every caller.
+"""
+import logging
+import threading
+
+from config import SINGLE_FLIGHT_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# key -> _Call in flight
+_calls = {}
+_calls_lock = threading.Lock()
+
+# name -> {'executions': int, 'coalesced': int, 'timed_out': int}
+_stats = {}
+
+
+class _Call:
+    """A computation in flight and, once done, its outcome."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _count(name, counter):
+    # Called with _calls_lock held
+    stats = _stats.setdefault(name, {'executions': 0, 'coalesced': 0, 'timed_out': 0})
+    stats[counter] += 1
+
+
+def single_flight(name, key, compute):
+    """
+    Run compute() once for all concurrent callers with the same key.
+
+    Args:
+        name (str): What is computed, for the metrics (e.g. the endpoint)
+        key (str): Identity of the result; include every input and version
+        compute (callable): () -> result, run by the first caller, and by
+            callers whose wait times out
+
+    Returns:
+        The result of compute(), shared by every caller that waited for it
+
+    Raises:
+        Exception: Whatever compute() raised, in the caller that ran it and
+        in every caller that waited for it
+    """
+    key = f'{name}:{key}'
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+            _count(name, 'executions')
+        else:
+            _count(name, 'coalesced')
+
+    if not leader:
+        if call.done.wait(SINGLE_FLIGHT_WAIT_SECONDS):
+            if call.error is not None:
+                raise call.error
+            return call.result
+        logger.warning(f"single_flight {name}: waited {SINGLE_FLIGHT_WAIT_SECONDS}s, computing locally")
+        with _calls_lock:
+            _count(name, 'timed_out')
+        return compute()
+
+    try:
+        call.result = compute()
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            del _calls[key]
+        call.done.set()
+
+
+def single_flight_stats():
+    """
+    Coalescing metrics of this process.
+
+    Returns:
+        dict: in_flight (computations running now) and, per name,
+        executions (computations run), coalesced (callers that shared
+        another caller's computation instead of running their own) and
+        timed_out (coalesced callers that gave up waiting and ran their own)
+    """
+    with _calls_lock:
+        return {
+            'in_flight': len(_calls),
+            'by_name': {name: dict(stats) for name, stats in _stats.items()},
+        }
@@ -0,0 +1,69 @@
+"""
+Streaming Responses
+
+Clients that send `Accept: application/x-ndjson` get large question lists
+as newline-delimited JSON, one object per line. Rows are read from a
+server-side cursor STREAM_BATCH_SIZE at a time and each batch is sent as
+soon as it is encoded, so worker memory stays flat however large the
+result, and the first rows reach the client before the last are read.
+
+Streamed responses are not compressed (see services/compression.py).
+"""
+import logging
+
+from flask import current_app, request, stream_with_context
+
+from config import STREAM_BATCH_SIZE
+from services.database import return_db
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson():
+    """
+    Check whether the client prefers NDJSON over a JSON document.
+
+    Returns:
+        bool: True if Accept ranks application/x-ndjson above application/json
+    """
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def stream_rows(conn, cur, render_batch, head=None):
+    """
+    Build a response that streams the rows of a server_cursor() query.
+
+    The response takes over conn: it is returned to the pool when the
+    stream ends or the client goes away, so the caller must not return it.
+
+    Args:
+        conn: Connection the cursor belongs to
+        cur: Cursor from server_cursor() with the query executed
+        render_batch (callable): (columns, rows) -> bytes, the NDJSON lines of a batch
+        head (bytes, optional): Lines to send before the rows
+
+    Returns:
+        flask.Response: Streamed NDJSON response (Vary: Accept)
+    """
+    def generate():
+        try:
+            if head:
+                yield head
+            while True:
+                rows = cur.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield render_batch(tuple(column.name for column in cur.description), rows)
+            cur.close()
+        except Exception as e:
+            # Headers are already sent: the client sees a truncated stream
+            logger.error(f"Error while streaming rows: {str(e)}")
+
+    # render_batch may need the app (app.json), which is gone once the view returns
+    response = current_app.response_class(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    # Runs when the server closes the response, even if streaming never started
+    response.call_on_close(lambda: return_db(conn))
+    response.vary.add('Accept')
+    return response
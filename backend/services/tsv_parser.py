@@ -15,10 +15,18 @@ from config import (
     TIMEOUT_THRESHOLD_SECONDS,
     PARTIAL_UPLOAD_MISSING_PERCENTAGE
 )
-from services.database import get_db, return_db
+from services.database import get_db, return_db, mark_user_write, commit_user_write
+from services.etags import bump_data_version
+from services.shared_store import bump_generation
 
 logger = logging.getLogger(__name__)
 
+# Active set with identical content from the same uploader. Params: content_hash, user_id
+DUPLICATE_SET_QUERY = '''
+    SELECT id, total_questions FROM question_sets
+    WHERE content_hash = %s AND uploaded_by = %s AND is_deleted = false
+'''
+
 
 def count_valid_questions(content):
     """
@@ -101,10 +109,7 @@ def parse_and_save_set(content, set_name, description, user_id, tags='', google_
     try:
         # 2. Check for DUPLICATES
         # Check if THIS user has already uploaded this EXACT content
-        cur.execute('''
-            SELECT id, total_questions FROM question_sets
-            WHERE content_hash = %s AND uploaded_by = %s AND is_deleted = false
-        ''', (content_hash, user_id))
+        cur.execute(DUPLICATE_SET_QUERY, (content_hash, user_id))
 
         existing = cur.fetchone()
         if existing:
@@ -256,7 +261,11 @@ def parse_and_save_set(content, set_name, description, user_id, tags='', google_
 
         # 10. Update total question count
         cur.execute('UPDATE question_sets SET total_questions = %s WHERE id = %s', (question_count, set_id))
-        conn.commit()
+        mark_user_write(cur, user_id)
+        bump_data_version(cur)
+        commit_user_write(conn, user_id)
+        # The public set list cached in the shared store is now outdated
+        bump_generation()
 
         # Calculate processing time
         processing_time = time.time() - start_time
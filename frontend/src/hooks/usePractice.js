@@ -51,7 +51,7 @@ export function usePractice(session, setAppNotification = () => {}) {
         setSetsOpenedThisSession(prev => [...prev, set.id]);
       }
 
-      const data = await api.getQuestions(set.id);
+      const data = await api.getQuestions(set.id, set.content_hash);
       setQuestions(data.questions);
       setSetInstructions(data.instructions || []);
       setShowInstructions(false); // Reset when starting new practice
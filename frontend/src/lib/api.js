@@ -139,8 +139,26 @@ export const api = {
     return response.json();
   },
 
-  async getQuestions(setId) {
+  async getQuestions(setId, contentHash = null) {
     const authenticated = await isAuthenticated();
+    if (authenticated && contentHash) {
+      // Shared content (cached by the browser and CDNs per content hash) plus the small per-user overlay
+      const [content, { overlay }] = await Promise.all([
+        this.getSetContent(setId, contentHash),
+        this.getProgressOverlay(setId),
+      ]);
+      const questions = content.questions.map((question) => {
+        const state = overlay[question.id] || {};
+        return {
+          ...question,
+          attempted: state.attempted ?? null,
+          correct: state.correct ?? null,
+          is_missed: state.missed || false,
+          is_bookmarked: state.bookmarked || false,
+        };
+      });
+      return { questions, instructions: content.instructions };
+    }
     const endpoint = authenticated
       ? `/api/question-sets/${setId}/questions`
       : `/api/public/question-sets/${setId}/questions`;
@@ -150,6 +168,21 @@ export const api = {
     return response.json();
   },
 
+  async getSetContent(setId, contentHash) {
+    const response = await fetchWithWakeDetection(
+      `${API_URL}/api/public/question-sets/${setId}/content?v=${encodeURIComponent(contentHash)}`
+    );
+    if (!response.ok) throw new Error('Failed to fetch questions');
+    return response.json();
+  },
+
+  async getProgressOverlay(setId) {
+    const headers = await getAuthHeaders();
+    const response = await fetchWithWakeDetection(`${API_URL}/api/question-sets/${setId}/overlay`, { headers });
+    if (!response.ok) throw new Error('Failed to fetch progress');
+    return response.json();
+  },
+
   async updateProgress(questionId, attempted, correct) {
     const headers = await getAuthHeaders();
     const response = await fetchWithWakeDetection(`${API_URL}/api/questions/${questionId}/progress`, {
@@ -195,6 +228,24 @@ export const api = {
     return response.json();
   },
 
+  async getStatsHistory({ from, to, granularity = 'day' } = {}) {
+    const headers = await getAuthHeaders();
+    const params = new URLSearchParams({ granularity });
+    if (from) params.set('from', from);
+    if (to) params.set('to', to);
+    const response = await fetchWithWakeDetection(`${API_URL}/api/stats/history?${params}`, { headers });
+    if (!response.ok) throw new Error('Failed to fetch stats history');
+    return response.json();
+  },
+
+  async getLeaderboard(board = 'streak', limit = 10) {
+    const headers = await getAuthHeaders();
+    const params = new URLSearchParams({ board, limit });
+    const response = await fetchWithWakeDetection(`${API_URL}/api/leaderboard?${params}`, { headers });
+    if (!response.ok) throw new Error('Failed to fetch leaderboard');
+    return response.json();
+  },
+
   async getMixedQuestions(filter = 'all') {
     const authenticated = await isAuthenticated();
     const endpoint = authenticated
@@ -51,6 +51,13 @@ class DatabaseSchemaTests:
             'set_instructions': ['id', 'set_id', 'instruction_text', 'display_order', 'created_at'],
             'daily_activity': ['id', 'user_id', 'activity_date', 'questions_practiced'],
             'set_opens': ['user_id', 'set_id', 'opened_at'],
+            'set_purges': ['set_id', 'set_name', 'deleted_at', 'purged_at', 'rows_deleted'],
+            'attempt_events': ['id', 'user_id', 'question_id', 'attempted', 'correct', 'applied', 'recorded_at'],
+            'user_daily_stats': ['user_id', 'stat_date', 'attempted', 'correct'],
+            'user_set_round_stats': ['user_id', 'set_id', 'round_no', 'attempted', 'correct'],
+            'question_stats': ['question_id', 'attempts', 'correct', 'difficulty'],
+            'leaderboard': ['user_id', 'streak', 'practiced_week', 'accuracy', 'streak_rank', 'week_rank', 'accuracy_rank'],
+            'data_versions': ['name', 'version'],
         }
 
     def run_all(self):
@@ -91,8 +98,7 @@ class DatabaseSchemaTests:
                 ))
                 return
 
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             # Check if all expected tables are mentioned in CREATE TABLE statements
             tables_found = 0
@@ -113,9 +119,7 @@ class DatabaseSchemaTests:
     def test_users_table_structure(self):
         """Test users table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['id', 'supabase_user_id', 'email', 'username', 'created_at']
 
@@ -145,9 +149,7 @@ class DatabaseSchemaTests:
     def test_question_sets_table_structure(self):
         """Test question_sets table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['id', 'name', 'description', 'uploaded_by', 'total_questions',
                               'is_deleted', 'content_hash']
@@ -176,9 +178,7 @@ class DatabaseSchemaTests:
     def test_questions_table_structure(self):
         """Test questions table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['id', 'set_id', 'question_text', 'answer_text']
 
@@ -206,9 +206,7 @@ class DatabaseSchemaTests:
     def test_user_progress_table_structure(self):
         """Test user_progress table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['user_id', 'question_id', 'attempted', 'correct', 'attempt_count']
 
@@ -236,9 +234,7 @@ class DatabaseSchemaTests:
     def test_missed_questions_table_structure(self):
         """Test missed_questions table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['user_id', 'question_id']
 
@@ -266,9 +262,7 @@ class DatabaseSchemaTests:
     def test_bookmarks_table_structure(self):
         """Test bookmarks table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['user_id', 'question_id']
 
@@ -296,9 +290,7 @@ class DatabaseSchemaTests:
     def test_set_instructions_table_structure(self):
         """Test set_instructions table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['set_id', 'instruction_text', 'display_order']
 
@@ -326,9 +318,7 @@ class DatabaseSchemaTests:
     def test_daily_activity_table_structure(self):
         """Test daily_activity table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['user_id', 'activity_date', 'questions_practiced']
 
@@ -356,9 +346,7 @@ class DatabaseSchemaTests:
     def test_set_opens_table_structure(self):
         """Test set_opens table has required columns"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             required_columns = ['user_id', 'set_id', 'opened_at']
 
@@ -386,9 +374,7 @@ class DatabaseSchemaTests:
     def test_foreign_key_relationships(self):
         """Test that foreign key relationships are defined"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             # Expected foreign keys
             expected_fks = [
@@ -418,9 +404,7 @@ class DatabaseSchemaTests:
     def test_unique_constraints(self):
         """Test that unique constraints are defined"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             # Expected unique constraints
             expected_unique = [
@@ -446,9 +430,7 @@ class DatabaseSchemaTests:
     def test_index_definitions(self):
         """Test that indexes are defined for performance"""
         try:
-            db_file = project_root / "backend" / "database.py"
-            with open(db_file, 'r') as f:
-                schema_content = f.read()
+            schema_content = self._read_schema()
 
             # Check for CREATE INDEX statements
             has_indexes = 'CREATE INDEX' in schema_content
@@ -461,6 +443,12 @@ class DatabaseSchemaTests:
         except Exception as e:
             self.results.append(TestResult("Indexes defined for performance", False, str(e)))
 
+    def _read_schema(self):
+        """Read database.py plus the versioned migration files that define the schema"""
+        backend_dir = project_root / "backend"
+        sources = [backend_dir / "database.py"] + sorted((backend_dir / "migrations").glob("*.sql"))
+        return "\n".join(path.read_text() for path in sources)
+
     def _extract_table_section(self, schema_content, table_name):
         """Extract the CREATE TABLE section for a specific table"""
         try:
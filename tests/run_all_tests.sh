@@ -92,6 +92,78 @@ else
     echo -e "${YELLOW}⚠ Database schema test file not found (skipping)${NC}\n"
 fi
 
+# Test 1.4: Read Path Tests
+if [ -f "$SCRIPT_DIR/backend/test_read_paths.py" ]; then
+    echo -e "${YELLOW}1.4 Running read path tests...${NC}\n"
+    python3 "$SCRIPT_DIR/backend/test_read_paths.py"
+    READ_EXIT=$?
+
+    if [ $READ_EXIT -eq 0 ]; then
+        echo -e "\n${GREEN}✓ Read path tests passed${NC}\n"
+        PASSED_TESTS=$((PASSED_TESTS + 1))
+    else
+        echo -e "\n${RED}✗ Read path tests failed (exit code: $READ_EXIT)${NC}\n"
+        FAILED_TESTS=$((FAILED_TESTS + 1))
+    fi
+    TOTAL_TESTS=$((TOTAL_TESTS + 1))
+else
+    echo -e "${YELLOW}⚠ Read path test file not found (skipping)${NC}\n"
+fi
+
+# Test 1.5: Migration Tests
+if [ -f "$SCRIPT_DIR/backend/test_migrations.py" ]; then
+    echo -e "${YELLOW}1.5 Running migration tests...${NC}\n"
+    python3 "$SCRIPT_DIR/backend/test_migrations.py"
+    MIGRATION_EXIT=$?
+
+    if [ $MIGRATION_EXIT -eq 0 ]; then
+        echo -e "\n${GREEN}✓ Migration tests passed${NC}\n"
+        PASSED_TESTS=$((PASSED_TESTS + 1))
+    else
+        echo -e "\n${RED}✗ Migration tests failed (exit code: $MIGRATION_EXIT)${NC}\n"
+        FAILED_TESTS=$((FAILED_TESTS + 1))
+    fi
+    TOTAL_TESTS=$((TOTAL_TESTS + 1))
+else
+    echo -e "${YELLOW}⚠ Migration test file not found (skipping)${NC}\n"
+fi
+
+# Test 1.6: Background Job Tests
+if [ -f "$SCRIPT_DIR/backend/test_background_jobs.py" ]; then
+    echo -e "${YELLOW}1.6 Running background job tests...${NC}\n"
+    python3 "$SCRIPT_DIR/backend/test_background_jobs.py"
+    JOBS_EXIT=$?
+
+    if [ $JOBS_EXIT -eq 0 ]; then
+        echo -e "\n${GREEN}✓ Background job tests passed${NC}\n"
+        PASSED_TESTS=$((PASSED_TESTS + 1))
+    else
+        echo -e "\n${RED}✗ Background job tests failed (exit code: $JOBS_EXIT)${NC}\n"
+        FAILED_TESTS=$((FAILED_TESTS + 1))
+    fi
+    TOTAL_TESTS=$((TOTAL_TESTS + 1))
+else
+    echo -e "${YELLOW}⚠ Background job test file not found (skipping)${NC}\n"
+fi
+
+# Test 1.7: Encoding Tests
+if [ -f "$SCRIPT_DIR/backend/test_encoding.py" ]; then
+    echo -e "${YELLOW}1.7 Running encoding tests...${NC}\n"
+    python3 "$SCRIPT_DIR/backend/test_encoding.py"
+    ENCODING_EXIT=$?
+
+    if [ $ENCODING_EXIT -eq 0 ]; then
+        echo -e "\n${GREEN}✓ Encoding tests passed${NC}\n"
+        PASSED_TESTS=$((PASSED_TESTS + 1))
+    else
+        echo -e "\n${RED}✗ Encoding tests failed (exit code: $ENCODING_EXIT)${NC}\n"
+        FAILED_TESTS=$((FAILED_TESTS + 1))
+    fi
+    TOTAL_TESTS=$((TOTAL_TESTS + 1))
+else
+    echo -e "${YELLOW}⚠ Encoding test file not found (skipping)${NC}\n"
+fi
+
 # ============================================================================
 # FRONTEND TESTS
 # ============================================================================